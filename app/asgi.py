@@ -17,11 +17,19 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 django_asgi_app = get_asgi_application()
 
-from dashboard.routing import websocket_urlpatterns
+# As rotas importam consumers e models: o Django precisa estar carregado
+# (get_asgi_application acima) antes destes imports
+from checkout import routing as checkout_routing  # noqa: E402
+from dashboard.routing import websocket_urlpatterns  # noqa: E402
+from services import http  # noqa: E402
 
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
-        "websocket": AuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+        "websocket": AuthMiddlewareStack(
+            URLRouter(websocket_urlpatterns + checkout_routing.websocket_urlpatterns)
+        ),
+        # Abre e fecha os clientes httpx compartilhados com o servidor
+        "lifespan": http.lifespan,
     }
 )
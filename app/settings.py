@@ -101,14 +101,19 @@ else:
     }
 
 MIDDLEWARE = [
+    # Primeiro: mede também as consultas de sessão e autenticação
+    "core.middleware.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # Versão assíncrona do WhiteNoise: todos os middlewares precisam suportar
+    # async para as views assíncronas não rodarem em threads sob o uvicorn
+    "core.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "checkout.middleware.OrderEventsMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -147,6 +152,13 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Transações de escrita pegam o lock no BEGIN: com requisições
+            # simultâneas elas aguardam (timeout) em vez de falhar com
+            # "database is locked" ao promover o lock de leitura
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+            # Banco de teste em arquivo: o banco em memória compartilhado entre
+            # threads (cart.tests) falha com "table is locked" sem esperar o timeout
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 
@@ -221,6 +233,80 @@ CALLMEBOT_API_URL = config("CALLMEBOT_API_URL", default=None)
 CALLMEBOT_API_KEY = config("CALLMEBOT_API_KEY", default=None)
 CALLMEBOT_PHONE_NUMBER = config("CALLMEBOT_PHONE_NUMBER", default=None)
 
+# Cliente HTTP compartilhado das integrações (services/http.py)
+HTTP_POOL_SIZE = config("HTTP_POOL_SIZE", default=10, cast=int)
+# Conexões simultâneas por host do cliente assíncrono (views assíncronas)
+HTTP_ASYNC_POOL_SIZE = config("HTTP_ASYNC_POOL_SIZE", default=100, cast=int)
+HTTP_TIMEOUT = (
+    config("HTTP_CONNECT_TIMEOUT", default=3.05, cast=float),
+    config("HTTP_READ_TIMEOUT", default=10.0, cast=float),
+)
+HTTP_MAX_RETRIES = config("HTTP_MAX_RETRIES", default=2, cast=int)
+HTTP_RETRY_BACKOFF = config("HTTP_RETRY_BACKOFF", default=0.3, cast=float)
+HTTP_CIRCUIT_FAILURE_THRESHOLD = config(
+    "HTTP_CIRCUIT_FAILURE_THRESHOLD", default=5, cast=int
+)
+HTTP_CIRCUIT_RESET_SECONDS = config("HTTP_CIRCUIT_RESET_SECONDS", default=30, cast=int)
+
+# Carrinho em cache (cart/engine.py): intervalo máximo entre gravações no banco
+CART_PERSIST_INTERVAL = config("CART_PERSIST_INTERVAL", default=300, cast=int)
+
+# Instrumentação de SQL por requisição (core/middleware.py)
+SQL_INSTRUMENTATION = config("SQL_INSTRUMENTATION", default=True, cast=bool)
+# Header Server-Timing com tempo de banco e número de consultas
+SQL_SERVER_TIMING = config("SQL_SERVER_TIMING", default=DEBUG, cast=bool)
+# Requisições a partir desse tempo entram na amostragem com a SQL no log
+SQL_SLOW_REQUEST_MS = config("SQL_SLOW_REQUEST_MS", default=500, cast=int)
+SQL_SLOW_SAMPLE_RATE = config("SQL_SLOW_SAMPLE_RATE", default=0.1, cast=float)
+# Máximo de consultas por view (nome da URL); excesso gera WARNING no log e
+# falha nos testes com core.testing.assert_within_query_budget
+SQL_QUERY_BUDGETS = {
+    # Loja (catálogo e carrinho em cache: consultas só com o cache frio)
+    "product_list": 4,
+    "add_to_cart": 6,
+    "cart_detail": 4,
+    "checkout:checkout": 4,
+    # Pedido PIX (o caminho mais longo), contando BEGIN/SAVEPOINT do SQLite:
+    # - gravar o carrinho no banco: 5 (7 se um carrinho já gravado mudou)
+    # - ler os itens com os produtos: 1
+    # - pedido + itens + outbox de notificação: 6
+    # - resumo diário do dashboard (on_commit): 4 (6 no 1º pedido do dia)
+    # - pagamento PIX (pedido, Payment, PaymentEvent): 7
+    # - limpar o carrinho e gravar a sessão: 4
+    "POST checkout:checkout": 31,
+    "checkout:check_payment_status": 2,
+    "services:webhook_mercadopago": 4,
+    # Dashboard (sessão e usuário incluídos)
+    "dashboard:dashboard": 10,
+    "dashboard:order_list": 5,
+    "dashboard:order_detail": 6,
+    "dashboard:order_edit": 6,
+    "dashboard:order_fragment": 4,
+    "dashboard:order_create": 4,
+    "dashboard:product_list": 6,
+    "dashboard:category_list": 4,
+}
+
+# Outbox de notificações (comando notification_worker)
+NOTIFICATION_MAX_ATTEMPTS = config("NOTIFICATION_MAX_ATTEMPTS", default=6, cast=int)
+NOTIFICATION_RETRY_BASE_SECONDS = config(
+    "NOTIFICATION_RETRY_BASE_SECONDS", default=30, cast=int
+)
+# Limite de envios por segundo de cada provedor
+NOTIFICATION_RATE_LIMITS = {
+    "callmebot": config("CALLMEBOT_RATE_LIMIT", default=0.5, cast=float),
+    "evolution": config("EVOLUTION_RATE_LIMIT", default=5.0, cast=float),
+}
+
+# Fila de webhooks do Mercado Pago (comando webhook_worker)
+WEBHOOK_MAX_ATTEMPTS = config("WEBHOOK_MAX_ATTEMPTS", default=8, cast=int)
+WEBHOOK_RETRY_BASE_SECONDS = config("WEBHOOK_RETRY_BASE_SECONDS", default=10, cast=int)
+
+# Conciliação dos pagamentos pendentes (comando reconcile_payments)
+RECONCILE_STALE_MINUTES = config("RECONCILE_STALE_MINUTES", default=15, cast=int)
+# Consultas por segundo ao Mercado Pago
+RECONCILE_RATE_LIMIT = config("RECONCILE_RATE_LIMIT", default=5.0, cast=float)
+
 # Authentication settings
 LOGIN_URL = "/dashboard/login/"
 LOGIN_REDIRECT_URL = "/dashboard/"
@@ -247,6 +333,10 @@ CACHES = {
     }
 }
 
+# Sessões lidas do Redis (gravadas também no banco): a loja e o carrinho não
+# precisam consultar django_session a cada requisição
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 # Channels Configuration
 CHANNEL_LAYERS = {
     'default': {
@@ -264,6 +354,8 @@ CACHE_TIMEOUTS = {
     'dashboard_daily': 300,    # 5min
     'dashboard_weekly': 900,   # 15min
     'cart_summary': 1800,      # 30min
+    'payment_state': 30,       # 30s (status do pagamento consultado pelo polling)
+    'order_events': 3600,      # 1h (histórico de eventos para resync do dashboard)
 }
 
 # WhiteNoise configurações apenas para produção
@@ -303,7 +395,8 @@ LOGGING = {
             'style': '{',
         },
         'json': {
-            'format': '{"time": "%(asctime)s", "level": "%(levelname)s", "module": "%(module)s", "message": "%(message)s"}',
+            # Inclui os campos de extra={...} (ex.: métricas de SQL por requisição)
+            '()': 'core.log_formatters.JsonFormatter',
         },
     },
     'handlers': {
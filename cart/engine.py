@@ -0,0 +1,359 @@
+"""
+Carrinho da sessão mantido no cache (Redis), com gravação adiada no banco.
+
+O estado do carrinho ({product_id: quantidade}) fica no cache, em uma chave
+ligada à sessão pelo token "cart_token". Preços, contagem e total vêm do
+snapshot do catálogo (products.catalog), então adicionar, alterar e exibir o
+carrinho não fazem consultas SQL no caso comum.
+
+Cada alteração é feita com um lock do carrinho no cache, relendo o estado
+dentro dele: cliques simultâneos (duplo clique, várias abas) não se perdem.
+
+Cart/CartItem continuam sendo o formato durável. O estado é gravado neles
+(flush) no checkout e, quando há alterações pendentes, no máximo a cada
+settings.CART_PERSIST_INTERVAL segundos. Se o cache falhar, a alteração vai
+direto para o banco com um UPDATE atômico (CartItem.objects.change_quantity);
+sem estado no cache, o carrinho é lido do banco.
+"""
+
+import logging
+import secrets
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from products.catalog import get_catalog
+from products.models import Product
+
+from .models import Cart, CartItem
+
+logger = logging.getLogger("app.cache")
+
+TOKEN_SESSION_KEY = "cart_token"
+CART_ID_SESSION_KEY = "cart_id"
+
+LOCK_TIMEOUT = 5  # segundos
+LOCK_WAIT = 2.0  # segundos aguardando outra alteração do mesmo carrinho
+LOCK_POLL_INTERVAL = 0.01
+
+
+def _state_key(token):
+    return f"cart:state:{token}"
+
+
+def _item_key(product_id):
+    """Chave do produto no estado (JSON só tem chaves texto)"""
+    try:
+        return str(int(product_id))
+    except (TypeError, ValueError):
+        return None
+
+
+class CartLine:
+    """Item do carrinho para exibição (produto serializado do catálogo)"""
+
+    def __init__(self, product, quantity, available=True):
+        self.product = product
+        self.quantity = quantity
+        self.available = available
+
+    @property
+    def subtotal(self):
+        return Decimal(self.product["price"]) * self.quantity
+
+
+class SessionCart:
+    def __init__(self, request):
+        self.session = request.session
+        self._state = None
+        self._catalog = None
+        # Cache indisponível: estado e totais vêm direto do banco
+        self._database_mode = False
+
+    # Estado
+
+    @property
+    def token(self):
+        return self.session.get(TOKEN_SESSION_KEY)
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = self._load()
+        return self._state
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            self._catalog = get_catalog()
+        return self._catalog
+
+    @property
+    def items(self):
+        """{product_id: quantidade} (inclui produtos que saíram do catálogo)"""
+        return {int(pid): qty for pid, qty in self.state["items"].items()}
+
+    def _empty_state(self):
+        return {
+            "items": {},
+            "cart_id": self.session.get(CART_ID_SESSION_KEY),
+            "dirty": False,
+            "flushed_at": time.time(),
+        }
+
+    def _load(self):
+        token = self.token
+        if token:
+            try:
+                state = cache.get(_state_key(token))
+            except Exception as e:
+                logger.warning(f"Cache indisponível ao ler carrinho: {e}")
+                self._database_mode = True
+                state = None
+            if state is not None:
+                return state
+
+        # Sem estado em cache: parte do carrinho durável, se houver
+        state = self._empty_state()
+        if state["cart_id"]:
+            state["items"] = {
+                str(product_id): quantity
+                for product_id, quantity in CartItem.objects.filter(
+                    cart_id=state["cart_id"]
+                ).values_list("product_id", "quantity")
+            }
+            if token:
+                self._state = state
+                self._store()
+        return state
+
+    def _ensure_token(self):
+        if not self.token:
+            self.session[TOKEN_SESSION_KEY] = secrets.token_urlsafe(16)
+
+    def _store(self):
+        """Grava o estado no cache. Retorna False se o cache falhar."""
+        self._ensure_token()
+        try:
+            cache.set(
+                _state_key(self.token), self.state, timeout=settings.SESSION_COOKIE_AGE
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Cache indisponível ao gravar carrinho: {e}")
+            self._database_mode = True
+            return False
+
+    def _flush_due(self):
+        interval = settings.CART_PERSIST_INTERVAL
+        return time.time() - self.state.get("flushed_at", 0) >= interval
+
+    @contextmanager
+    def _locked(self):
+        """
+        Lock do carrinho no cache durante uma alteração. Retorna (yield) False
+        se o cache estiver indisponível.
+        """
+        self._ensure_token()
+        lock_key = f"{_state_key(self.token)}:lock"
+        acquired = False
+        available = True
+        try:
+            deadline = time.monotonic() + LOCK_WAIT
+            while not (acquired := cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)):
+                if time.monotonic() >= deadline:
+                    logger.warning("Lock do carrinho não liberado; alterando sem lock")
+                    break
+                time.sleep(LOCK_POLL_INTERVAL)
+        except Exception as e:
+            logger.warning(f"Cache indisponível ao travar carrinho: {e}")
+            available = False
+
+        try:
+            yield available
+        finally:
+            if acquired:
+                try:
+                    cache.delete(lock_key)
+                except Exception:
+                    pass
+
+    def _change(self, product_id, delta=None, quantity=None):
+        """
+        Altera a quantidade do produto (soma `delta` ou define `quantity`) e
+        retorna a nova quantidade
+        """
+        key = _item_key(product_id)
+        if key is None:
+            return 0
+
+        with self._locked() as available:
+            # Estado relido dentro do lock: inclui alterações concorrentes
+            self._state = None
+            current = self.quantity(key)
+            new_quantity = max(current + delta if delta is not None else quantity, 0)
+            if new_quantity:
+                self.state["items"][key] = new_quantity
+            else:
+                self.state["items"].pop(key, None)
+            self.state["dirty"] = True
+
+            if not available or not self._store():
+                # Sem cache: aplica a diferença no banco com UPDATE atômico
+                self._database_mode = True
+                CartItem.objects.change_quantity(
+                    self._get_or_create_cart().pk, int(key), new_quantity - current
+                )
+            elif self._flush_due():
+                self.flush()
+        return new_quantity
+
+    # Alterações
+
+    def quantity(self, product_id):
+        return self.state["items"].get(_item_key(product_id), 0)
+
+    def add(self, product_id, quantity=1):
+        return self._change(product_id, delta=quantity)
+
+    def set_quantity(self, product_id, quantity):
+        return self._change(product_id, quantity=quantity)
+
+    def remove(self, product_id):
+        self._change(product_id, quantity=0)
+
+    def clear(self):
+        """Esvazia o carrinho (após o checkout), inclusive os itens gravados"""
+        cart_id = self.state.get("cart_id")
+        if cart_id:
+            CartItem.objects.filter(cart_id=cart_id).delete()
+        self.state["items"] = {}
+        self.state["dirty"] = False
+        self._store()
+
+    # Leitura (a partir do snapshot do catálogo)
+
+    def lines(self, include_unavailable=False):
+        """
+        Itens do carrinho com os dados do produto. Produtos fora do catálogo
+        (inativos) só entram com include_unavailable, buscados no banco.
+        """
+        lines = []
+        missing = {}
+        for product_id, quantity in self.items.items():
+            product = self.catalog.get_product(product_id)
+            if product is not None:
+                lines.append(CartLine(product, quantity))
+            else:
+                missing[product_id] = quantity
+
+        if include_unavailable and missing:
+            for product in Product.objects.filter(pk__in=missing):
+                image_url = product.image.url if product.image else ""
+                lines.append(
+                    CartLine(
+                        {
+                            "id": product.id,
+                            "name": product.name,
+                            "price": str(product.price),
+                            "image_url": image_url,
+                        },
+                        missing[product.id],
+                        available=False,
+                    )
+                )
+        return lines
+
+    def summary(self, product_id=None):
+        """
+        Quantidade do item `product_id`, quantidade total e valor total dos
+        itens disponíveis, calculados de uma vez: a partir do snapshot do
+        catálogo ou, sem cache, com uma única consulta (Cart.summary).
+        """
+        cart_id = self.state.get("cart_id")
+        if self._database_mode and cart_id:
+            return Cart(pk=cart_id).summary(product_id)
+
+        count = 0
+        total = Decimal("0.00")
+        for line in self.lines():
+            count += line.quantity
+            total += line.subtotal
+        return {
+            "quantity": self.quantity(product_id) if product_id is not None else 0,
+            "count": count,
+            "total": total,
+        }
+
+    @property
+    def count(self):
+        """Quantidade total de itens disponíveis"""
+        return self.summary()["count"]
+
+    @property
+    def total(self):
+        """Total dos itens disponíveis, com os preços do catálogo"""
+        return self.summary()["total"]
+
+    def is_available(self, product_id):
+        return self.catalog.get_product(product_id) is not None
+
+    # Persistência
+
+    def _get_or_create_cart(self):
+        cart_id = self.state.get("cart_id")
+        cart = Cart.objects.filter(pk=cart_id).first() if cart_id else None
+        if cart is None:
+            cart = Cart.objects.create()
+            self.state["cart_id"] = cart.id
+            self.session[CART_ID_SESSION_KEY] = cart.id
+        return cart
+
+    def flush(self):
+        """
+        Grava o estado em Cart/CartItem e retorna o Cart (None se o carrinho
+        está vazio e nunca foi gravado).
+        """
+        state = self.state
+        items = {pid: qty for pid, qty in self.items.items() if qty > 0}
+        cart_id = state.get("cart_id")
+        if not items and not cart_id:
+            state["dirty"] = False
+            return None
+
+        with transaction.atomic():
+            cart = self._get_or_create_cart()
+
+            existing = {item.product_id: item for item in cart.items.all()}
+            removed = set(existing) - set(items)
+            if removed:
+                cart.items.filter(product_id__in=removed).delete()
+
+            changed = []
+            for product_id, quantity in items.items():
+                item = existing.get(product_id)
+                if item is not None and item.quantity != quantity:
+                    item.quantity = quantity
+                    changed.append(item)
+            if changed:
+                CartItem.objects.bulk_update(changed, ["quantity"])
+
+            new = set(items) - set(existing)
+            if new:
+                # Produtos removidos do banco não podem virar CartItem
+                valid = Product.objects.filter(pk__in=new).values_list("pk", flat=True)
+                CartItem.objects.bulk_create(
+                    [
+                        CartItem(cart=cart, product_id=product_id, quantity=items[product_id])
+                        for product_id in valid
+                    ]
+                )
+
+        state["dirty"] = False
+        state["flushed_at"] = time.time()
+        self._store()
+        return cart
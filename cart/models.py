@@ -1,20 +1,44 @@
-from django.db import models
-from django.db.models import F, Sum
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import DecimalField, F, Q, Sum
 
 from products.models import Product
 
 
 class Cart(models.Model):
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Indexado para o reap_carts encontrar carrinhos abandonados
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         verbose_name = "Carrinho"
         verbose_name_plural = "Carrinhos"
 
+    def summary(self, product_id=None):
+        """
+        Quantidade do item `product_id`, quantidade total e valor total do
+        carrinho (apenas produtos ativos) em uma única consulta
+        """
+        active = Q(product__is_active=True)
+        totals = self.items.aggregate(
+            count=Sum("quantity", filter=active),
+            total=Sum(
+                F("quantity") * F("product__price"),
+                filter=active,
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            quantity=Sum("quantity", filter=Q(product_id=product_id)),
+        )
+        return {
+            "quantity": totals["quantity"] or 0,
+            "count": totals["count"] or 0,
+            "total": totals["total"] or Decimal("0.00"),
+        }
+
     @property
     def total_quantity(self):
         """Return the total quantity of items in the cart (only active products)"""
-        return self.items.filter(product__is_active=True).aggregate(total=Sum("quantity"))["total"] or 0
+        return self.summary()["count"]
 
     @property
     def unique_items_count(self):
@@ -24,19 +48,38 @@ class Cart(models.Model):
     @property
     def total_price(self):
         """Return the total price of all items in the cart (only active products)"""
-        return (
-            self.items.filter(product__is_active=True).aggregate(total=Sum(F("quantity") * F("product__price")))[
-                "total"
-            ]
-            or 0
-        )
+        return self.summary()["total"]
+
+
+class CartItemQuerySet(models.QuerySet):
+    def change_quantity(self, cart_id, product_id, delta):
+        """
+        Soma `delta` à quantidade do item com um UPDATE atômico
+        (quantity = quantity + delta), sem ler e regravar o valor: cliques
+        simultâneos não se perdem. Cria o item se ainda não existe e o remove
+        quando a quantidade chegaria a zero ou menos.
+        """
+        with transaction.atomic():
+            # Serializa as alterações do mesmo carrinho (inserção do item)
+            Cart.objects.select_for_update().filter(pk=cart_id).exists()
+
+            items = self.filter(cart_id=cart_id, product_id=product_id)
+            if delta < 0:
+                # quantity é positiva: o item sai em vez de ficar negativo
+                items.filter(quantity__lte=-delta).delete()
+            updated = items.update(quantity=F("quantity") + delta)
+
+            if not updated and delta > 0:
+                self.create(cart_id=cart_id, product_id=product_id, quantity=delta)
 
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
-    added_at = models.DateTimeField(auto_now_add=True)
+    added_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = CartItemQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
@@ -24,6 +24,11 @@ document.addEventListener("DOMContentLoaded", function () {
     if (cartItem) cartItem.remove();
   }
 
+  function updateCartBadge(count) {
+    const badge = document.querySelector(".cart-badge-header");
+    if (badge && count !== undefined) badge.textContent = count;
+  }
+
   function updateCartTotal(newTotal) {
     const totalSpan = document.querySelector(".cart-total-value");
     if (totalSpan) totalSpan.textContent = "R$ " + Number(newTotal).toFixed(2);
@@ -44,6 +49,7 @@ document.addEventListener("DOMContentLoaded", function () {
         .then((res) => res.json())
         .then((data) => {
           if (data.success) {
+            updateCartBadge(data.cart_count);
             updateQtyValue(btn, data.quantity);
             if (data.cart_total !== undefined) updateCartTotal(data.cart_total);
           }
@@ -66,6 +72,7 @@ document.addEventListener("DOMContentLoaded", function () {
         .then((res) => res.json())
         .then((data) => {
           if (data.success) {
+            updateCartBadge(data.cart_count);
             if (data.quantity > 0) {
               updateQtyValue(btn, data.quantity);
               if (data.cart_total !== undefined)
@@ -95,6 +102,7 @@ document.addEventListener("DOMContentLoaded", function () {
         .then((res) => res.json())
         .then((data) => {
           if (data.success) {
+            updateCartBadge(data.cart_count);
             removeCartItemElement(btn);
             if (data.cart_total !== undefined) updateCartTotal(data.cart_total);
           }
@@ -1 +1,143 @@
-# Create your tests here.
+import threading
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin, in_memory_services, reset_caches
+from products.catalog import invalidate_catalog
+from products.models import Product
+
+from .engine import TOKEN_SESSION_KEY, SessionCart
+from .models import Cart, CartItem
+
+THREADS = 8
+CLICKS = 10
+
+
+def hammer(click, threads=THREADS, clicks=CLICKS):
+    """Executa `click` `clicks` vezes em cada thread, todas ao mesmo tempo"""
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        try:
+            for _ in range(clicks):
+                try:
+                    click()
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return errors
+
+
+@in_memory_services()
+class ConcurrentCartChangesTests(TransactionTestCase):
+    """Cliques simultâneos no mesmo carrinho não podem se perder"""
+
+    def setUp(self):
+        reset_caches()
+        self.product = Product.objects.create(
+            name="Galão 20L", price=Decimal("12.00"), image="products/galao.jpg"
+        )
+
+    def test_change_quantity_keeps_every_increment(self):
+        cart = Cart.objects.create()
+
+        errors = hammer(
+            lambda: CartItem.objects.change_quantity(cart.pk, self.product.pk, 1)
+        )
+
+        self.assertEqual(errors, [])
+        item = CartItem.objects.get(cart=cart, product=self.product)
+        self.assertEqual(item.quantity, THREADS * CLICKS)
+
+    def test_change_quantity_below_zero_removes_item(self):
+        cart = Cart.objects.create()
+        CartItem.objects.change_quantity(cart.pk, self.product.pk, 2)
+
+        CartItem.objects.change_quantity(cart.pk, self.product.pk, -1)
+        self.assertEqual(CartItem.objects.get(cart=cart).quantity, 1)
+
+        CartItem.objects.change_quantity(cart.pk, self.product.pk, -5)
+        self.assertFalse(CartItem.objects.filter(cart=cart).exists())
+
+    def test_session_cart_add_keeps_every_increment(self):
+        token = "carrinho-concorrente"
+
+        def click():
+            # Cada "requisição" tem sua própria sessão com o mesmo token
+            request = SimpleNamespace(session={TOKEN_SESSION_KEY: token})
+            SessionCart(request).add(self.product.pk)
+
+        errors = hammer(click)
+
+        self.assertEqual(errors, [])
+        cart = SessionCart(SimpleNamespace(session={TOKEN_SESSION_KEY: token}))
+        self.assertEqual(cart.quantity(self.product.pk), THREADS * CLICKS)
+
+
+@in_memory_services()
+class CartQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Adicionar ao carrinho e ver o carrinho ficam dentro de SQL_QUERY_BUDGETS"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Produto {index}",
+                    price=Decimal("5.00") + index,
+                    image="products/teste.jpg",
+                )
+                for index in range(5)
+            ]
+        )
+
+    def setUp(self):
+        reset_caches()
+
+    def add(self, product):
+        return self.client.post(reverse("add_to_cart"), {"product_id": product.pk})
+
+    def test_add_to_cart(self):
+        for product in self.products:
+            response = self.add(product)
+            self.assertEqual(response.status_code, 200)
+            self.assertWithinQueryBudget(response)
+
+    def test_add_to_cart_cold_cache(self):
+        self.add(self.products[0])
+        reset_caches()
+        response = self.add(self.products[1])
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_cart_detail(self):
+        for product in self.products:
+            self.add(product)
+        response = self.client.get(reverse("cart_detail"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cart_items"]), len(self.products))
+        self.assertWithinQueryBudget(response)
+
+    def test_cart_detail_with_inactive_product(self):
+        for product in self.products:
+            self.add(product)
+        Product.objects.filter(pk=self.products[0].pk).update(is_active=False)
+        invalidate_catalog()
+        response = self.client.get(reverse("cart_detail"))
+        self.assertEqual(response.status_code, 200)
+        unavailable = [line for line in response.context["cart_items"] if not line.available]
+        self.assertEqual(len(unavailable), 1)
+        self.assertWithinQueryBudget(response)
@@ -1,105 +1,86 @@
 from django.conf import settings
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.generic import TemplateView, View
 
-from products.models import Product
-
-from .models import Cart, CartItem
+from .engine import SessionCart
 
 
 def get_status_debug(request):
     return JsonResponse({"debug": settings.DEBUG})
 
 
+def cart_response(cart, product_id, **extra):
+    """
+    Resposta das ações do carrinho: quantidade do item, quantidade total e
+    valor total, calculados juntos (Cart.summary / SessionCart.summary)
+    """
+    summary = cart.summary(product_id)
+    return JsonResponse(
+        {
+            "success": True,
+            "quantity": summary["quantity"],
+            "cart_count": summary["count"],
+            "cart_total": float(summary["total"]),
+            **extra,
+        }
+    )
+
+
 # AJAX: aumentar quantidade
 @require_POST
 def increase_cart_item(request):
     product_id = request.POST.get("product_id")
-    cart = get_cart(request)
-    item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
+    cart = SessionCart(request)
+    if not cart.quantity(product_id):
+        raise Http404("Item não está no carrinho")
 
     # SEGURANÇA: Verificar se produto ainda está ativo
-    if not item.product.is_active:
+    if not cart.is_available(product_id):
         return JsonResponse({"error": "Produto não está mais disponível"}, status=400)
 
-    item.quantity += 1
-    item.save()
-    cart_total = cart.total_price
-    return JsonResponse(
-        {"success": True, "quantity": item.quantity, "cart_total": float(cart_total)}
-    )
+    cart.add(product_id)
+    return cart_response(cart, product_id)
 
 
 # AJAX: diminuir quantidade
 @require_POST
 def decrease_cart_item(request):
     product_id = request.POST.get("product_id")
-    cart = get_cart(request)
-    item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
+    cart = SessionCart(request)
+    if not cart.quantity(product_id):
+        raise Http404("Item não está no carrinho")
 
     # SEGURANÇA: Verificar se produto ainda está ativo (permite remoção mesmo se inativo)
-    if not item.product.is_active:
+    if not cart.is_available(product_id):
         # Se produto inativo, só permite remoção, não diminuição
-        item.delete()
-        cart_total = cart.total_price
-        return JsonResponse(
-            {"success": True, "quantity": 0, "cart_total": float(cart_total),
-             "message": "Produto removido (não disponível)"}
-        )
-
-    if item.quantity > 1:
-        item.quantity -= 1
-        item.save()
-        cart_total = cart.total_price
-        return JsonResponse(
-            {
-                "success": True,
-                "quantity": item.quantity,
-                "cart_total": float(cart_total),
-            }
-        )
-    else:
-        item.delete()
-        cart_total = cart.total_price
-        return JsonResponse(
-            {"success": True, "quantity": 0, "cart_total": float(cart_total)}
-        )
+        cart.remove(product_id)
+        return cart_response(cart, product_id, message="Produto removido (não disponível)")
+
+    cart.add(product_id, -1)
+    return cart_response(cart, product_id)
 
 
 # AJAX: remover item
 @require_POST
 def remove_cart_item(request):
     product_id = request.POST.get("product_id")
-    cart = get_cart(request)
-    item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
-    item.delete()
-    cart_total = cart.total_price
-    return JsonResponse({"success": True, "cart_total": float(cart_total)})
-
-
-def get_cart(request):
-    cart_id = request.session.get("cart_id")
-    if cart_id:
-        cart, created = Cart.objects.get_or_create(id=cart_id)
-    else:
-        cart = Cart.objects.create()
-        request.session["cart_id"] = cart.id
-    return cart
+    cart = SessionCart(request)
+    if not cart.quantity(product_id):
+        raise Http404("Item não está no carrinho")
+    cart.remove(product_id)
+    return cart_response(cart, product_id)
 
 
 class AddToCartView(View):
     def post(self, request, *args, **kwargs):
         product_id = request.POST.get("product_id")
-        # SEGURANÇA: Só permite adicionar produtos ativos
-        product = get_object_or_404(Product, pk=product_id, is_active=True)
-        cart = get_cart(request)
-        item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-        if not created:
-            item.quantity += 1
-            item.save()
-        return JsonResponse({"success": True, "cart_count": cart.total_quantity})
+        cart = SessionCart(request)
+        # SEGURANÇA: Só permite adicionar produtos ativos (presentes no catálogo)
+        if not cart.is_available(product_id):
+            raise Http404("Produto não encontrado")
+        cart.add(product_id)
+        return cart_response(cart, product_id)
 
 
 class CartDetailView(TemplateView):
@@ -107,11 +88,9 @@ class CartDetailView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart = get_cart(self.request)
-        cart_items = cart.items.select_related("product").all()
-        total = cart.total_price
+        cart = SessionCart(self.request)
         context["cart"] = cart
-        context["cart_items"] = cart_items
-        context["cart_count"] = cart.total_quantity
-        context["cart_total"] = total
+        context["cart_items"] = cart.lines(include_unavailable=True)
+        context["cart_count"] = cart.count
+        context["cart_total"] = cart.total
         return context
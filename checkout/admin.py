@@ -1,12 +1,24 @@
 from django.contrib import admin
 
-from .models import Order, OrderItem
+from .models import Order, OrderItem, Payment, PaymentEvent
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    fields = ("product", "quantity")
+    fields = ("product", "quantity", "unit_price")
+    readonly_fields = ("unit_price",)
+
+
+class PaymentInline(admin.TabularInline):
+    model = Payment
+    extra = 0
+    can_delete = False
+    fields = ("payment_id", "method", "status", "status_detail", "date_approved", "updated_at")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Order)
@@ -18,11 +30,13 @@ class OrderAdmin(admin.ModelAdmin):
         "payment_method",
         "payment_status",
         "status",
+        "items_count",
+        "total_amount",
         "created_at",
     )
     list_filter = ("status", "payment_status", "payment_method", "created_at")
     search_fields = ("customer_name", "phone", "address")
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, PaymentInline]
     readonly_fields = ("created_at", "total_price", "change_amount")
     list_editable = ("payment_status", "status")
     fieldsets = (
@@ -42,6 +56,14 @@ class OrderAdmin(admin.ModelAdmin):
         ("Status e Datas", {"fields": ("status", "created_at")}),
     )
 
+    def get_queryset(self, request):
+        # Contagem de itens anotada no banco, sem uma query por linha
+        return super().get_queryset(request).with_totals()
+
+    @admin.display(description="Itens", ordering="items_count")
+    def items_count(self, obj):
+        return obj.items_count
+
     def get_list_display_links(self, request, list_display):
         """Permite edição inline mas mantém links nos campos especificados"""
         return ("id", "customer_name")
@@ -49,6 +71,52 @@ class OrderAdmin(admin.ModelAdmin):
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ("order", "product", "quantity")
+    list_display = ("order", "product", "quantity", "unit_price")
     search_fields = ("product__name",)
-    fieldsets = ((None, {"fields": ("order", "product", "quantity")}),)
+    readonly_fields = ("unit_price",)
+    fieldsets = ((None, {"fields": ("order", "product", "quantity", "unit_price")}),)
+
+
+class PaymentEventInline(admin.TabularInline):
+    model = PaymentEvent
+    extra = 0
+    can_delete = False
+    fields = ("created_at", "source", "status", "status_detail", "payload")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = (
+        "payment_id",
+        "order",
+        "method",
+        "status",
+        "status_detail",
+        "date_approved",
+        "updated_at",
+    )
+    list_filter = ("status", "method", "provider", "created_at")
+    search_fields = ("payment_id", "order__id")
+    list_select_related = ("order",)
+    inlines = [PaymentEventInline]
+    readonly_fields = (
+        "order",
+        "provider",
+        "payment_id",
+        "method",
+        "status",
+        "status_detail",
+        "transaction_amount",
+        "date_approved",
+        "date_of_expiration",
+        "raw_payload",
+        "created_at",
+        "updated_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,70 @@
+import json
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .models import Order
+from .tokens import check_payment_status_token
+
+
+def payment_status_group(order_id):
+    return f"order_payment_{order_id}"
+
+
+def payment_status_data(order):
+    return {
+        "order_id": order.id,
+        "status": order.status,
+        "payment_status": order.payment_status,
+    }
+
+
+class PaymentStatusConsumer(AsyncWebsocketConsumer):
+    """
+    Canal do cliente na página de aguardando pagamento. Autorizado pelo token
+    assinado gerado em AwaitingPaymentView (?token=...).
+    """
+
+    async def connect(self):
+        self.order_id = self.scope["url_route"]["kwargs"]["order_id"]
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        token = query.get("token", [""])[0]
+
+        if not check_payment_status_token(self.order_id, token):
+            await self.close()
+            return
+
+        self.group_name = payment_status_group(self.order_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # Estado atual, caso o pagamento tenha sido confirmado antes da conexão
+        data = await self.get_payment_status()
+        if data:
+            await self.send(
+                text_data=json.dumps({"type": "payment_status", "data": data})
+            )
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data):
+        # O cliente apenas escuta
+        pass
+
+    # Receber atualização do pagamento (update_order_status)
+    async def payment_status(self, event):
+        await self.send(
+            text_data=json.dumps({"type": "payment_status", "data": event["data"]})
+        )
+
+    @database_sync_to_async
+    def get_payment_status(self):
+        order = (
+            Order.objects.filter(id=self.order_id)
+            .only("id", "status", "payment_status")
+            .first()
+        )
+        return payment_status_data(order) if order else None
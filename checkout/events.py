@@ -0,0 +1,146 @@
+"""
+Publicação dos eventos de pedidos via WebSocket (dashboard e cliente).
+
+- Os eventos só são emitidos depois do commit (transaction.on_commit), então
+  alterações revertidas nunca chegam aos clientes.
+- Dentro de coalesce_order_events() (OrderEventsMiddleware envolve cada
+  requisição), vários saves do mesmo pedido viram uma única mensagem, enviada
+  ao final com o estado final do pedido.
+- A montagem do payload e o group_send rodam em uma thread em segundo plano,
+  sem bloquear a requisição.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+
+from dashboard.utils.order_events import record_order_event
+
+from .consumers import payment_status_data, payment_status_group
+from .snapshots import OrderSnapshot
+
+logger = logging.getLogger("app.events")
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="order-events")
+_pending_events = ContextVar("pending_order_events", default=None)
+
+
+def merge_event_types(current, new):
+    """Tipo do evento resultante de várias alterações do mesmo pedido"""
+    if current is None or current == new or new == "order_deleted":
+        return new
+    if current in ("new_order", "order_deleted"):
+        return current
+    return "order_update"
+
+
+def order_payload(order):
+    """Dados do pedido enviados ao dashboard (pedido ou OrderSnapshot)"""
+    return OrderSnapshot.of(order).payload()
+
+
+def send_order_update(order_id, event_type, order=None):
+    """
+    Publica a mensagem delta do pedido para o dashboard (OrdersConsumer).
+    `order` é o pedido ou seu OrderSnapshot; sem ele, o pedido foi removido.
+    """
+    try:
+        channel_layer = get_channel_layer()
+
+        # Se não há channel layer configurado, apenas ignore
+        if not channel_layer:
+            return
+
+        message = record_order_event(
+            order_id, event_type, order_payload(order) if order else None
+        )
+        if message is None:
+            # Nada mudou desde a última mensagem deste pedido
+            return
+
+        async_to_sync(channel_layer.group_send)(
+            "orders_updates", {"type": "order_delta", "data": message}
+        )
+    except Exception:
+        # Falhas do WebSocket não devem impedir operações normais
+        logger.exception(f"Falha ao publicar evento do pedido #{order_id} via WebSocket")
+
+
+def send_payment_status(order):
+    """
+    Avisa a página de aguardando pagamento do cliente (PaymentStatusConsumer)
+    """
+    try:
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+
+        async_to_sync(channel_layer.group_send)(
+            payment_status_group(order.id),
+            {"type": "payment_status", "data": payment_status_data(order)},
+        )
+    except Exception:
+        # Falhas do WebSocket não devem impedir operações normais
+        logger.exception(f"Falha ao enviar status do pagamento do pedido #{order.id}")
+
+
+def _send_order_event(order_id, event_type):
+    # Lê o estado final do pedido já commitado
+    try:
+        send_order_update(order_id, event_type, OrderSnapshot.load(order_id))
+    finally:
+        # A thread de publicação usa sua própria conexão com o banco
+        connection.close()
+
+
+def run_in_background(func, *args):
+    try:
+        _executor.submit(func, *args)
+    except RuntimeError:
+        # Executor encerrado (desligamento do processo)
+        pass
+
+
+def _emit(order_id, event_type):
+    pending = _pending_events.get()
+    if pending is not None:
+        pending[order_id] = merge_event_types(pending.get(order_id), event_type)
+    else:
+        run_in_background(_send_order_event, order_id, event_type)
+
+
+def publish_order_event(order, event_type):
+    """
+    Agenda o evento do pedido para depois do commit. Dentro de
+    coalesce_order_events() o envio acontece uma vez por pedido, ao final.
+    """
+    transaction.on_commit(partial(_emit, order.pk, event_type))
+
+
+def publish_payment_status(order):
+    """Envia o status do pagamento ao cliente depois do commit"""
+    transaction.on_commit(partial(run_in_background, send_payment_status, order))
+
+
+@contextmanager
+def coalesce_order_events():
+    """Agrupa os eventos de pedidos commitados no bloco (um por pedido)"""
+    if _pending_events.get() is not None:
+        # Já dentro de outro bloco; o mais externo envia
+        yield
+        return
+
+    pending = {}
+    token = _pending_events.set(pending)
+    try:
+        yield
+    finally:
+        _pending_events.reset(token)
+        for order_id, event_type in pending.items():
+            run_in_background(_send_order_event, order_id, event_type)
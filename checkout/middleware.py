@@ -0,0 +1,31 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .events import coalesce_order_events
+
+
+class OrderEventsMiddleware:
+    """
+    Agrupa os eventos de pedidos da requisição: vários saves do mesmo pedido
+    (ex.: list_editable do admin, edição de itens) geram uma única mensagem.
+
+    No modo assíncrono o agrupamento também vale para o ORM chamado em
+    sync_to_async, que herda o contexto (contextvars) da requisição.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with coalesce_order_events():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with coalesce_order_events():
+            return await self.get_response(request)
@@ -0,0 +1,70 @@
+# Generated by Django 5.1 on 2026-10-17 18:04
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def backfill_totals(apps, schema_editor):
+    """
+    Congela o preço unitário dos itens existentes a partir do preço atual do
+    produto e grava o total de cada pedido, para que os pedidos antigos não
+    apareçam com R$ 0. É o único preenchimento: pedidos novos já nascem com o
+    total (Order.objects.create_with_items)
+    """
+    Order = apps.get_model("checkout", "Order")
+    OrderItem = apps.get_model("checkout", "OrderItem")
+    Product = apps.get_model("products", "Product")
+
+    product_price = Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1]
+    items_total = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(total=Sum(F("quantity") * F("unit_price")))
+        .values("total")
+    )
+
+    order_ids = list(
+        Order.objects.filter(items__isnull=False)
+        .distinct()
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        batch = order_ids[start : start + BATCH_SIZE]
+        OrderItem.objects.filter(order_id__in=batch, unit_price__isnull=True).update(
+            unit_price=Subquery(product_price)
+        )
+        Order.objects.filter(pk__in=batch).update(
+            total_amount=Coalesce(
+                Subquery(items_total),
+                Value(Decimal("0.00")),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0002_alter_order_created_at_alter_order_payment_method_and_more'),
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Total do pedido, mantido a cada alteração dos itens', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Preço do produto no momento do pedido', max_digits=8, null=True),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
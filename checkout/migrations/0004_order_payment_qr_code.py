@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0003_order_total_amount_orderitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_qr_code',
+            field=models.TextField(blank=True, help_text='Código PIX copia e cola gerado na criação do pagamento', null=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1 on 2026-10-17 18:22
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia da normalização (utils.utils.normalize_text / core.search) e do SQL do
+# índice no momento desta migração: o backfill não pode mudar se o código da
+# busca mudar depois
+BATCH_SIZE = 2000
+FIELDS = ("customer_name", "phone")
+INDEX_NAME = "checkout_order_search_text_trgm"
+
+
+def normalize_text(value):
+    nfkd = unicodedata.normalize("NFKD", value)
+    no_accent = "".join(c for c in nfkd if not unicodedata.combining(c))
+    no_special = re.sub(r"[^a-zA-Z0-9_]+", "", no_accent.replace(" ", "_"))
+    return no_special.lower()
+
+
+def build_search_text(*values):
+    parts = [normalize_text(str(value)) for value in values if value]
+    return " ".join(part for part in parts if part)
+
+
+def backfill_search_text(apps, schema_editor):
+    """Preenche search_text das linhas existentes"""
+    Order = apps.get_model("checkout", "order")
+    batch = []
+    for obj in Order.objects.only("pk", *FIELDS).iterator(chunk_size=BATCH_SIZE):
+        obj.search_text = build_search_text(*(getattr(obj, field) for field in FIELDS))
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            Order.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ["search_text"])
+
+
+def create_trigram_index(apps, schema_editor):
+    """Índice GIN trigram da coluna de busca (apenas PostgreSQL)"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} "
+        f"ON checkout_order USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0004_order_payment_qr_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Nome e telefone normalizados para a busca (índice trigram no PostgreSQL)', max_length=255),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.1 on 2026-10-17 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Último status conhecido, a partir do status de pagamento gravado no pedido
+ORDER_PAYMENT_STATUS = {
+    "paid": ("approved", "accredited"),
+    "cancelled": ("cancelled", ""),
+    "pending": ("pending", ""),
+}
+
+
+def backfill_payments(apps, schema_editor):
+    """Um Payment para cada pedido que já tem payment_id"""
+    Order = apps.get_model("checkout", "Order")
+    Payment = apps.get_model("checkout", "Payment")
+
+    orders = (
+        Order.objects.exclude(payment_id__isnull=True)
+        .exclude(payment_id="")
+        .values_list("id", "payment_id", "payment_method", "payment_status", "total_amount")
+    )
+    batch = []
+    for order_id, payment_id, method, payment_status, total in orders.iterator(chunk_size=2000):
+        status, status_detail = ORDER_PAYMENT_STATUS.get(payment_status, ("", ""))
+        batch.append(
+            Payment(
+                order_id=order_id,
+                payment_id=payment_id[:64],
+                method=method,
+                status=status,
+                status_detail=status_detail,
+                transaction_amount=total,
+            )
+        )
+        if len(batch) >= 2000:
+            Payment.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Payment.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0005_order_search_text'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='payment_id',
+            field=models.CharField(blank=True, db_index=True, help_text='ID do pagamento no MercadoPago', max_length=255, null=True),
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('mercadopago', 'Mercado Pago')], default='mercadopago', max_length=20)),
+                ('payment_id', models.CharField(help_text='ID do pagamento no provedor', max_length=64)),
+                ('method', models.CharField(choices=[('pix', 'PIX'), ('dinheiro', 'Dinheiro'), ('cartao', 'Cartão')], max_length=20)),
+                ('status', models.CharField(blank=True, max_length=30)),
+                ('status_detail', models.CharField(blank=True, max_length=60)),
+                ('transaction_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('date_approved', models.DateTimeField(blank=True, null=True)),
+                ('date_of_expiration', models.DateTimeField(blank=True, help_text='Vencimento da cobrança (PIX)', null=True)),
+                ('raw_payload', models.JSONField(blank=True, default=dict, help_text='Última resposta do provedor')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='checkout.order')),
+            ],
+            options={
+                'verbose_name': 'Pagamento',
+                'verbose_name_plural': 'Pagamentos',
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(blank=True, max_length=30)),
+                ('status_detail', models.CharField(blank=True, max_length=60)),
+                ('source', models.CharField(choices=[('checkout', 'Checkout'), ('webhook', 'Webhook'), ('polling', 'Consulta da página de pagamento'), ('reconciliation', 'Reconciliação')], max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='checkout.payment')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Pagamento',
+                'verbose_name_plural': 'Histórico de Pagamentos',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'created_at'], name='checkout_pa_status_2bfc50_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('provider', 'payment_id'), name='unique_provider_payment'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentevent',
+            index=models.Index(fields=['payment', 'created_at'], name='checkout_pa_payment_4db189_idx'),
+        ),
+        migrations.RunPython(backfill_payments, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import timedelta
+from decimal import Decimal
 
-from django.db import models
-from django.db.models import F, Sum
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from core.search import build_search_text, search_queryset
 from products.models import Product
 
+_bulk_order_changes = ContextVar("bulk_order_changes", default=False)
+
+
+def in_bulk_order_changes():
+    return _bulk_order_changes.get()
+
+
+@contextmanager
+def bulk_order_changes():
+    """
+    Agrupa alterações de um pedido e seus itens: enquanto ativo, os signals não
+    recalculam o total nem enviam WebSocket a cada save/delete. Quem agrupa é
+    responsável por gravar o total e publicar um único evento no final.
+    """
+    token = _bulk_order_changes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_order_changes.reset(token)
+
 
 class OrderQuerySet(models.QuerySet):
     def late(self):
@@ -30,6 +56,23 @@ class OrderQuerySet(models.QuerySet):
     def payment_cancelled(self):
         return self.filter(payment_status="cancelled")
 
+    def awaiting_reconciliation(self, minutes):
+        """
+        Pagamentos online (PIX/cartão) ainda pendentes, com payment_id, criados
+        há mais de N minutos: candidatos à conferência com o Mercado Pago
+        (comando reconcile_payments). Usa o índice (payment_method, payment_status).
+        """
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        return (
+            self.filter(
+                payment_method__in=["pix", "cartao"],
+                payment_status="pending",
+                created_at__lt=cutoff,
+            )
+            .exclude(payment_id__isnull=True)
+            .exclude(payment_id="")
+        )
+
     def today(self):
         """Pedidos criados hoje"""
         from datetime import datetime, time
@@ -54,45 +97,78 @@ class OrderQuerySet(models.QuerySet):
     def total_revenue(self):
         """Calcula receita total dos pedidos no queryset de forma otimizada"""
 
-        total = self.aggregate(
-            total_revenue=Sum(F("items__quantity") * F("items__product__price"))
-        )["total_revenue"]
+        total = self.aggregate(total_revenue=Sum("total_amount"))["total_revenue"]
 
         return float(total) if total else 0.0
 
-    def daily_revenue_last_days(self, days):
+    def with_totals(self):
         """
-        Retorna lista com receita diária dos últimos N dias para gráficos
-        Formato: [valor_dia_1, valor_dia_2, ..., valor_dia_N]
+        Anota items_count e items_total (soma de quantidade x preço unitário)
+        calculados no banco. Usa subqueries correlacionadas em vez de JOIN +
+        GROUP BY, então pode ser combinado com filtros e paginação.
         """
-        from collections import defaultdict
-        from decimal import Decimal
+        items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+        return self.annotate(
+            items_count=Coalesce(
+                Subquery(items.annotate(count=Count("pk")).values("count")), 0
+            ),
+            items_total=Coalesce(
+                Subquery(
+                    items.annotate(
+                        total=Sum(
+                            F("quantity") * F("unit_price"),
+                            output_field=DecimalField(max_digits=10, decimal_places=2),
+                        )
+                    ).values("total")
+                ),
+                Decimal("0.00"),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
 
-        # Buscar pedidos dos últimos N dias com agregação otimizada
-        cutoff = timezone.now() - timedelta(days=days)
+    def search(self, query):
+        """Busca por nome do cliente ou telefone (ver core.search)"""
+        return search_queryset(self, query)
 
-        orders_with_totals = (
-            self.filter(created_at__gte=cutoff)
-            .annotate(total=Sum(F("items__quantity") * F("items__product__price")))
-            .values("created_at__date", "total")
-        )
+    def for_list(self):
+        """
+        Apenas as colunas exibidas nas listagens (tabela, cards e admin),
+        com os totais dos itens anotados: número de queries constante,
+        independente do tamanho da página ou da quantidade de itens.
+        """
+        return self.only(*Order.LIST_FIELDS).with_totals()
+
+    def create_with_items(self, items, **fields):
+        """
+        Cria o pedido e seus itens em uma transação, com um INSERT para o pedido
+        (já com o total) e um bulk INSERT para os itens. Publica um único evento
+        "new_order" após o commit.
 
-        # Organizar por data
-        daily_data = defaultdict(lambda: Decimal("0"))
+        items: lista de tuplas (product, quantity)
+        """
+        from .events import publish_order_event
 
-        for order_data in orders_with_totals:
-            date_key = order_data["created_at__date"]
-            if order_data["total"]:
-                daily_data[date_key] += Decimal(str(order_data["total"]))
+        lines = merge_order_lines(items)
+        total = sum(
+            (product.price * quantity for product, quantity in lines), Decimal("0.00")
+        )
 
-        # Gerar lista dos últimos N dias (mesmo se não houver vendas)
-        result = []
-        for i in range(days):
-            target_date = (timezone.now() - timedelta(days=days - 1 - i)).date()
-            # Converter para float para compatibilidade com Chart.js
-            result.append(float(daily_data.get(target_date, Decimal("0"))))
+        with transaction.atomic(), bulk_order_changes():
+            order = self.create(total_amount=total, **fields)
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order=order,
+                        product=product,
+                        quantity=quantity,
+                        unit_price=product.price,
+                    )
+                    for product, quantity in lines
+                ]
+            )
 
-        return result
+        publish_order_event(order, "new_order")
+        return order
 
 
 class Order(models.Model):
@@ -111,6 +187,20 @@ class Order(models.Model):
         ("paid", "Pago"),
         ("cancelled", "Cancelado/Devolvido"),
     ]
+    # Colunas usadas pelas listagens (OrderQuerySet.for_list)
+    LIST_FIELDS = (
+        "id",
+        "customer_name",
+        "phone",
+        "status",
+        "payment_status",
+        "payment_method",
+        "total_amount",
+        "created_at",
+    )
+    # Campos normalizados em search_text (core.search)
+    SEARCH_FIELDS = ("customer_name", "phone")
+
     customer_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=20, db_index=True)
     cpf = models.CharField(max_length=14, blank=True, null=True, help_text="CPF do cliente")
@@ -128,6 +218,7 @@ class Order(models.Model):
         max_length=255,
         null=True,
         blank=True,
+        db_index=True,
         help_text="ID do pagamento no MercadoPago",
     )
     payment_url = models.URLField(
@@ -135,25 +226,116 @@ class Order(models.Model):
         blank=True,
         help_text="URL do pagamento no MercadoPago (para cartão)",
     )
+    payment_qr_code = models.TextField(
+        null=True,
+        blank=True,
+        help_text="Código PIX copia e cola gerado na criação do pagamento",
+    )
+    total_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        help_text="Total do pedido, mantido a cada alteração dos itens",
+    )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True)
+    search_text = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Nome e telefone normalizados para a busca (índice trigram no PostgreSQL)",
+    )
 
     objects = OrderQuerySet.as_manager()
 
     def __str__(self):
         return f"Order #{self.id} - {self.customer_name}"
 
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(
+            *(getattr(self, field) for field in self.SEARCH_FIELDS)
+        )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_FIELDS):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+
     @property
     def total_price(self):
-        return sum(item.quantity * item.product.price for item in self.items.all())
+        return self.total_amount
+
+    def calculate_total(self):
+        """Soma os itens usando o preço unitário congelado de cada um"""
+        return self.items.aggregate(
+            total=Sum(F("quantity") * F("unit_price"))
+        )["total"] or Decimal("0.00")
+
+    def update_total(self):
+        """
+        Recalcula o total a partir dos itens e grava apenas a coluna
+        total_amount, sem disparar o post_save do pedido
+        """
+        total = self.calculate_total()
+        Order.objects.filter(pk=self.pk).update(total_amount=total)
+        self.total_amount = total
+        return total
+
+    def set_items(self, items, event_type="order_update"):
+        """
+        Sincroniza os itens do pedido com a lista recebida usando operações em
+        lote: remove os produtos que saíram, atualiza quantidades e cria os
+        novos. Itens mantidos preservam o preço unitário congelado. Publica um
+        único evento após o commit.
+
+        items: lista de tuplas (product, quantity)
+        """
+        from .events import publish_order_event
+
+        lines = merge_order_lines(items)
+
+        with transaction.atomic(), bulk_order_changes():
+            existing = {item.product_id: item for item in self.items.all()}
+            wanted = {product.pk for product, _ in lines}
+
+            to_create = []
+            to_update = []
+            for product, quantity in lines:
+                item = existing.get(product.pk)
+                if item is None:
+                    to_create.append(
+                        OrderItem(
+                            order=self,
+                            product=product,
+                            quantity=quantity,
+                            unit_price=product.price,
+                        )
+                    )
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    to_update.append(item)
+
+            to_delete = [
+                item.pk for product_id, item in existing.items() if product_id not in wanted
+            ]
+            if to_delete:
+                self.items.filter(pk__in=to_delete).delete()
+            if to_update:
+                OrderItem.objects.bulk_update(to_update, ["quantity"])
+            if to_create:
+                OrderItem.objects.bulk_create(to_create)
+
+            # save() para que os receivers do pedido (resumo diário) vejam o novo total
+            self.total_amount = self.calculate_total()
+            self.save(update_fields=["total_amount"])
+
+        publish_order_event(self, event_type)
 
     @property
     def change_amount(self):
         """Calcula o troco quando o pagamento é em dinheiro"""
-        from decimal import Decimal
-
         if self.payment_method == "dinheiro" and self.cash_value:
-            return max(Decimal("0.00"), self.cash_value - Decimal(str(self.total_price)))
+            return max(Decimal("0.00"), self.cash_value - self.total_price)
         return Decimal("0.00")
 
     @property
@@ -202,14 +384,193 @@ class Order(models.Model):
         ]
 
 
+def merge_order_lines(items):
+    """
+    Normaliza (product, quantity) descartando quantidades inválidas e somando
+    linhas repetidas do mesmo produto, mantendo a ordem de chegada
+    """
+    merged = {}
+    for product, quantity in items:
+        if not quantity or int(quantity) <= 0:
+            continue
+        if product.pk in merged:
+            merged[product.pk] = (product, merged[product.pk][1] + int(quantity))
+        else:
+            merged[product.pk] = (product, int(quantity))
+    return list(merged.values())
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Preço do produto no momento do pedido",
+    )
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
 
+    def save(self, *args, **kwargs):
+        # Congela o preço do produto na criação do item
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Item do Pedido"
         verbose_name_plural = "Itens do Pedido"
+
+
+def _parse_provider_datetime(value):
+    """Datas do Mercado Pago chegam em ISO 8601 (ex.: 2024-05-01T10:00:00.000-04:00)"""
+    if not value:
+        return None
+    try:
+        return parse_datetime(str(value))
+    except ValueError:
+        return None
+
+
+class PaymentQuerySet(models.QuerySet):
+    def for_provider_id(self, payment_id, provider="mercadopago"):
+        """Busca pelo ID do pagamento no provedor (índice único)"""
+        return self.filter(provider=provider, payment_id=str(payment_id))
+
+
+class Payment(models.Model):
+    """
+    Pagamento de um pedido no provedor, identificado pelo ID do provedor.
+
+    Guarda o último status conhecido e o payload bruto da última consulta; cada
+    mudança de status fica registrada em PaymentEvent (histórico auditável).
+    Um pedido pode ter mais de um pagamento (ex.: nova tentativa no cartão).
+    """
+
+    PROVIDER_CHOICES = [
+        ("mercadopago", "Mercado Pago"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="payments")
+    provider = models.CharField(
+        max_length=20, choices=PROVIDER_CHOICES, default="mercadopago"
+    )
+    payment_id = models.CharField(max_length=64, help_text="ID do pagamento no provedor")
+    method = models.CharField(max_length=20, choices=Order.PAYMENT_CHOICES)
+    status = models.CharField(max_length=30, blank=True)
+    status_detail = models.CharField(max_length=60, blank=True)
+    transaction_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    date_approved = models.DateTimeField(null=True, blank=True)
+    date_of_expiration = models.DateTimeField(
+        null=True, blank=True, help_text="Vencimento da cobrança (PIX)"
+    )
+    raw_payload = models.JSONField(
+        default=dict, blank=True, help_text="Última resposta do provedor"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PaymentQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Pagamento"
+        verbose_name_plural = "Pagamentos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "payment_id"], name="unique_provider_payment"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.payment_id} ({self.status or '-'})"
+
+    @classmethod
+    def record(cls, order, payment_id, payment_data, source, provider="mercadopago"):
+        """
+        Cria ou atualiza o pagamento com os dados recebidos do provedor e
+        registra no histórico quando o status muda. Retorna o pagamento.
+
+        source: origem dos dados (checkout, webhook, polling, reconciliation)
+        """
+        payment_data = payment_data or {}
+        fields = {
+            "status": payment_data.get("status") or "",
+            "status_detail": payment_data.get("status_detail") or "",
+            "raw_payload": payment_data,
+        }
+        # Valores ausentes na resposta não apagam os já conhecidos
+        optional = {
+            "transaction_amount": (
+                Decimal(str(payment_data["transaction_amount"]))
+                if payment_data.get("transaction_amount") is not None
+                else None
+            ),
+            "date_approved": _parse_provider_datetime(payment_data.get("date_approved")),
+            "date_of_expiration": _parse_provider_datetime(
+                payment_data.get("date_of_expiration")
+            ),
+        }
+        fields.update({name: value for name, value in optional.items() if value is not None})
+
+        with transaction.atomic():
+            payment, created = cls.objects.select_for_update().get_or_create(
+                provider=provider,
+                payment_id=str(payment_id),
+                defaults={"order": order, "method": order.payment_method, **fields},
+            )
+            changed = created or (payment.status, payment.status_detail) != (
+                fields["status"],
+                fields["status_detail"],
+            )
+            if not created:
+                for name, value in fields.items():
+                    setattr(payment, name, value)
+                payment.save(update_fields=[*fields, "updated_at"])
+
+            if changed:
+                PaymentEvent.objects.create(
+                    payment=payment,
+                    status=fields["status"],
+                    status_detail=fields["status_detail"],
+                    source=source,
+                    payload=payment_data,
+                )
+        return payment
+
+
+class PaymentEvent(models.Model):
+    """Histórico de status de um pagamento (somente inclusão)"""
+
+    SOURCE_CHOICES = [
+        ("checkout", "Checkout"),
+        ("webhook", "Webhook"),
+        ("polling", "Consulta da página de pagamento"),
+        ("reconciliation", "Reconciliação"),
+    ]
+
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name="history")
+    status = models.CharField(max_length=30, blank=True)
+    status_detail = models.CharField(max_length=60, blank=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Histórico de Pagamento"
+        verbose_name_plural = "Histórico de Pagamentos"
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(fields=["payment", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.payment.payment_id}: {self.status}/{self.status_detail} ({self.source})"
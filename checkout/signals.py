@@ -1,85 +1,72 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.db import transaction
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Order, OrderItem
+from dashboard.utils.metrics import invalidate_metrics_cache
 
+from .events import publish_order_event
+from .models import Order, OrderItem, in_bulk_order_changes
 
-def send_order_update(order, event_type):
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
     """
-    Função helper para enviar atualizações via WebSocket
+    Signal chamado quando um pedido é criado ou atualizado
     """
     try:
-        channel_layer = get_channel_layer()
+        # Métricas em cache do dashboard ficam obsoletas após o commit
+        transaction.on_commit(invalidate_metrics_cache)
 
-        # Se não há channel layer configurado, apenas ignore
-        if not channel_layer:
+        # Alterações em lote publicam um único evento ao final
+        if in_bulk_order_changes():
             return
 
-        # Preparar dados do pedido
-        order_data = {
-            "order_id": order.id,
-            "customer_name": order.customer_name,
-            "phone": order.phone,
-            "status": order.status,
-            "payment_status": order.payment_status,
-            "payment_method": order.payment_method,
-            "total_price": float(order.total_price),
-            "created_at": order.created_at.isoformat(),
-            "is_late": order.is_late,
-        }
-
-        # Incluir itens do pedido
-        order_data["items"] = []
-        for item in order.items.select_related("product").all():
-            order_data["items"].append(
-                {
-                    "product_name": item.product.name,
-                    "quantity": item.quantity,
-                    "price": float(item.product.price),
-                }
-            )
-
-        # Enviar mensagem para o grupo
-        async_to_sync(channel_layer.group_send)(
-            "orders_updates", {"type": event_type, "data": order_data}
-        )
-
+        # Evento emitido após o commit (e agrupado por requisição)
+        publish_order_event(instance, "new_order" if created else "order_update")
     except Exception as e:
-        # Falhas do WebSocket não devem impedir operações normais
+        # Não pode falhar o signal - isso impediria o save do webhook
         pass
 
 
-@receiver(post_save, sender=Order)
-def order_saved(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
     """
-    Signal chamado quando um pedido é criado ou atualizado
+    Signal chamado quando um pedido é removido
     """
     try:
-        if created:
-            # Novo pedido criado
-            send_order_update(instance, "new_order")
-        else:
-            # Pedido atualizado
-            send_order_update(instance, "order_update")
+        transaction.on_commit(invalidate_metrics_cache)
+        publish_order_event(instance, "order_deleted")
     except Exception as e:
-        # Não pode falhar o signal - isso impediria o save do webhook
+        # Não pode falhar o signal
         pass
 
 
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def sync_order_total(sender, instance, **kwargs):
+    """
+    Mantém Order.total_amount consistente sempre que um item é criado,
+    alterado ou removido.
+    """
+    # Alterações em lote recalculam o total uma única vez
+    if in_bulk_order_changes():
+        return
+    instance.order.update_total()
+
+
 @receiver(post_save, sender=OrderItem)
 def order_item_saved(sender, instance, created, **kwargs):
     """
     Signal chamado quando um item do pedido é criado ou atualizado
     """
     try:
-        if created:
-            # Novo item adicionado ao pedido
-            send_order_update(instance.order, "order_item_added")
-        else:
-            # Item existente atualizado
-            send_order_update(instance.order, "order_update")
+        if in_bulk_order_changes():
+            return
+
+        transaction.on_commit(invalidate_metrics_cache)
+        publish_order_event(
+            instance.order, "order_item_added" if created else "order_update"
+        )
     except Exception as e:
         # Não pode falhar o signal
         pass
@@ -91,8 +78,11 @@ def order_item_deleted(sender, instance, **kwargs):
     Signal chamado quando um item do pedido é deletado
     """
     try:
-        # Item removido do pedido
-        send_order_update(instance.order, "order_item_removed")
+        if in_bulk_order_changes():
+            return
+
+        transaction.on_commit(invalidate_metrics_cache)
+        publish_order_event(instance.order, "order_item_removed")
     except Exception as e:
         # Não pode falhar o signal
         pass
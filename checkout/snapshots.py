@@ -0,0 +1,154 @@
+"""
+Retrato somente leitura de um pedido e seus itens, carregado uma vez.
+
+As mensagens de notificação (services.notification_templates), o payload do
+WebSocket (checkout.events.order_payload) e a cobrança no Mercado Pago
+(checkout.views.acreate_payment_charge) leem do mesmo snapshot em vez de
+percorrer order.items (e o produto de cada item) a cada uso:
+
+- OrderSnapshot.from_lines(order, lines): no checkout, a partir dos produtos
+  já em memória (nenhuma consulta);
+- OrderSnapshot.from_order(order): usa os itens já carregados por
+  prefetch_related("items__product") ou busca as linhas em uma consulta;
+- OrderSnapshot.load(order_id): pedido + itens em duas consultas.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+PAYMENT_METHOD_LABELS = dict(Order.PAYMENT_CHOICES)
+PAYMENT_STATUS_LABELS = dict(Order.PAYMENT_STATUS_CHOICES)
+
+
+class OrderLine:
+    """Item do pedido com o nome do produto e o preço congelado"""
+
+    __slots__ = ("product_id", "product_name", "quantity", "unit_price")
+
+    def __init__(self, product_id, product_name, quantity, unit_price):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.quantity = quantity
+        self.unit_price = unit_price
+
+
+class OrderSnapshot:
+    FIELDS = (
+        "id",
+        "customer_name",
+        "phone",
+        "cpf",
+        "address",
+        "status",
+        "payment_status",
+        "payment_method",
+        "cash_value",
+        "total_amount",
+        "created_at",
+    )
+
+    __slots__ = FIELDS + ("lines",)
+
+    def __init__(self, order, lines):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(order, field))
+        self.lines = tuple(lines)
+
+    @classmethod
+    def of(cls, order):
+        """Aceita um pedido ou um snapshot já montado"""
+        return order if isinstance(order, cls) else cls.from_order(order)
+
+    @classmethod
+    def from_lines(cls, order, lines):
+        """lines: lista de (product, quantity), como em create_with_items"""
+        return cls(
+            order,
+            [
+                OrderLine(product.pk, product.name, quantity, product.price)
+                for product, quantity in lines
+            ],
+        )
+
+    @classmethod
+    def from_order(cls, order):
+        prefetched = getattr(order, "_prefetched_objects_cache", {}).get("items")
+        if prefetched is not None:
+            lines = [
+                OrderLine(item.product_id, item.product.name, item.quantity, item.unit_price)
+                for item in prefetched
+            ]
+        else:
+            lines = [
+                OrderLine(*row)
+                for row in OrderItem.objects.filter(order_id=order.pk)
+                .order_by("id")
+                .values_list("product_id", "product__name", "quantity", "unit_price")
+            ]
+        return cls(order, lines)
+
+    @classmethod
+    def load(cls, order_id):
+        """Snapshot do pedido pelo id, ou None se ele não existe mais"""
+        order = Order.objects.only(*cls.FIELDS).filter(pk=order_id).first()
+        return cls.from_order(order) if order else None
+
+    @property
+    def total_price(self):
+        return self.total_amount
+
+    @property
+    def change_amount(self):
+        if self.payment_method == "dinheiro" and self.cash_value:
+            return max(Decimal("0.00"), self.cash_value - self.total_price)
+        return Decimal("0.00")
+
+    @property
+    def is_late(self):
+        elapsed_time = timezone.now() - self.created_at
+        return (elapsed_time > timedelta(minutes=25)) and self.status == "pending"
+
+    def get_payment_method_display(self):
+        return PAYMENT_METHOD_LABELS.get(self.payment_method, self.payment_method)
+
+    def get_payment_status_display(self):
+        return PAYMENT_STATUS_LABELS.get(self.payment_status, self.payment_status)
+
+    def payload(self):
+        """Dados do pedido enviados ao dashboard (WebSocket)"""
+        return {
+            "order_id": self.id,
+            "customer_name": self.customer_name,
+            "phone": self.phone,
+            "status": self.status,
+            "payment_status": self.payment_status,
+            "payment_method": self.payment_method,
+            "total_price": float(self.total_price),
+            "created_at": self.created_at.isoformat(),
+            "is_late": self.is_late,
+            "items": [
+                {
+                    "product_name": line.product_name,
+                    "quantity": line.quantity,
+                    "price": float(line.unit_price),
+                }
+                for line in self.lines
+            ],
+        }
+
+    def preference_items(self):
+        """Itens no formato da preferência do Mercado Pago (cartão)"""
+        return [
+            {
+                "id": str(line.product_id),
+                "title": line.product_name,
+                "quantity": line.quantity,
+                "currency_id": "BRL",
+                "unit_price": float(line.unit_price),
+            }
+            for line in self.lines
+        ]
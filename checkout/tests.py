@@ -1 +1,131 @@
-# Create your tests here.
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin, in_memory_services, reset_caches
+from products.models import Product
+from services.mercadopago import mp_service
+from services.models import NotificationOutbox
+
+from .models import Order, Payment
+
+PIX_PAYMENT = {
+    "id": 123456789,
+    "status": "pending",
+    "status_detail": "pending_waiting_transfer",
+    "transaction_amount": 31.50,
+    "point_of_interaction": {
+        "transaction_data": {
+            "ticket_url": "https://www.mercadopago.com.br/payments/123456789/ticket",
+            "qr_code": "00020126580014br.gov.bcb.pix",
+        }
+    },
+}
+
+
+class CheckoutFixtureMixin:
+    """Produtos no catálogo e um carrinho com um de cada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Produto {index}",
+                    price=Decimal("5.00") + index,
+                    image="products/teste.jpg",
+                )
+                for index in range(4)
+            ]
+        )
+
+    def setUp(self):
+        reset_caches()
+        for product in self.products:
+            self.client.post(reverse("add_to_cart"), {"product_id": product.pk})
+
+    def place_order(self, payment_method, **data):
+        return self.client.post(
+            reverse("checkout:checkout"),
+            {
+                "name": "Cliente Teste",
+                "phone": "11999999999",
+                "address": "Rua Teste, 1",
+                "payment_method": payment_method,
+                **data,
+            },
+        )
+
+
+@in_memory_services()
+class CheckoutQueryBudgetTests(CheckoutFixtureMixin, QueryBudgetMixin, TestCase):
+    """Checkout e status do pagamento ficam dentro de SQL_QUERY_BUDGETS"""
+
+    def test_checkout_page(self):
+        response = self.client.get(reverse("checkout:checkout"))
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_place_order_with_cash(self):
+        response = self.place_order("dinheiro", cash_value="100,00")
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), len(self.products))
+        self.assertWithinQueryBudget(response)
+
+    def test_place_order_with_pix(self):
+        with patch.object(
+            mp_service, "apay_with_pix", AsyncMock(return_value=PIX_PAYMENT)
+        ):
+            response = self.place_order("pix")
+        order = Order.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("checkout:awaiting_payment", args=[order.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(order.payment_id, str(PIX_PAYMENT["id"]))
+        self.assertTrue(Payment.objects.filter(order=order).exists())
+        self.assertWithinQueryBudget(response)
+
+    def test_check_payment_status(self):
+        with patch.object(
+            mp_service, "apay_with_pix", AsyncMock(return_value=PIX_PAYMENT)
+        ):
+            self.place_order("pix")
+        order = Order.objects.get()
+        Order.objects.filter(pk=order.pk).update(payment_status="paid")
+
+        response = self.client.get(
+            reverse("checkout:check_payment_status", args=[order.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["order_paid"])
+        self.assertWithinQueryBudget(response)
+
+
+@in_memory_services()
+class CashCheckoutTests(CheckoutFixtureMixin, TestCase):
+    """Pedido em dinheiro pelo checkout, com troco calculado em Decimal"""
+
+    def test_change_amount(self):
+        response = self.place_order("dinheiro", cash_value="50,00")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "checkout/success.html")
+
+        order = Order.objects.get()
+        total = sum(product.price for product in self.products)
+        self.assertEqual(order.total_amount, total)
+        self.assertEqual(order.cash_value, Decimal("50.00"))
+        self.assertEqual(order.change_amount, Decimal("50.00") - total)
+
+        notification = NotificationOutbox.objects.get(order=order)
+        self.assertEqual(notification.kind, "new_order")
+        self.assertIn(f"Troco: R$ {Decimal('50.00') - total:.2f}", notification.message)
+
+    def test_cash_value_below_total(self):
+        response = self.place_order("dinheiro", cash_value="1,00")
+        self.assertTemplateUsed(response, "checkout/error.html")
+        self.assertFalse(Order.objects.exists())
@@ -0,0 +1,20 @@
+from django.core import signing
+
+PAYMENT_STATUS_TOKEN_SALT = "checkout.payment_status"
+PAYMENT_STATUS_TOKEN_MAX_AGE = 60 * 60 * 24  # 24h
+
+
+def make_payment_status_token(order_id):
+    """Token assinado que autoriza o acompanhamento do pagamento de um pedido"""
+    return signing.TimestampSigner(salt=PAYMENT_STATUS_TOKEN_SALT).sign(str(order_id))
+
+
+def check_payment_status_token(order_id, token):
+    """Valida o token do pedido (assinatura, pedido e validade)"""
+    try:
+        value = signing.TimestampSigner(salt=PAYMENT_STATUS_TOKEN_SALT).unsign(
+            token, max_age=PAYMENT_STATUS_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == str(order_id)
@@ -1,15 +1,22 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
 
-from cart.views import get_cart
-from services.mercadopago import MercadoPagoService
+from cart.engine import SessionCart
+from services.mercadopago import mp_service
 from services.notifications import (
-    send_order_notifications_with_callmebot,
+    queue_order_notifications,
 )
+from services.payment_state import aget_payment_state, cache_payment_state
 
-from .models import Order, OrderItem
+from .models import Order, Payment, merge_order_lines
+from .snapshots import OrderSnapshot
+from .tokens import make_payment_status_token
 
 
 class CheckoutView(TemplateView):
@@ -17,20 +24,102 @@ class CheckoutView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart = get_cart(self.request)
-        cart_items = cart.items.select_related("product").all()
-        context["cart_total"] = cart.total_price
-        context["cart_items"] = cart_items
-        context["cart_count"] = cart.total_quantity
+        cart = SessionCart(self.request)
+        context["cart_total"] = cart.total
+        context["cart_items"] = cart.lines(include_unavailable=True)
+        context["cart_count"] = cart.count
         return context
 
-    def post(self, request, *args, **kwargs):
-        cart = get_cart(request)
-        cart_items = cart.items.select_related("product").all()
+    async def get(self, request, *args, **kwargs):
+        # Com post assíncrono, todos os handlers da view precisam ser async
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        """
+        Cria o pedido e a cobrança. Banco, sessão e carrinho rodam em
+        sync_to_async; a chamada ao Mercado Pago é aguardada sem ocupar uma
+        thread do servidor.
+        """
+        error_response, order, snapshot, session_cart, context = await sync_to_async(
+            self.place_order
+        )(request)
+        if error_response is not None:
+            return error_response
+
+        try:
+            # Se o pagamento for PIX, cria o pagamento e redireciona
+            if order.payment_method == "pix":
+                try:
+                    payment_data = await acreate_payment_charge(snapshot)
+                    await sync_to_async(self.save_pix_payment)(
+                        order, payment_data, session_cart
+                    )
+                    return redirect("checkout:awaiting_payment", order_id=order.id)
+                except Exception as e:
+                    await order.adelete()
+                    print(f"Erro ao criar pagamento PIX: {e}")
+                    context["error_message"] = (
+                        "Erro ao processar pagamento PIX. Tente novamente."
+                    )
+                    return await sync_to_async(render)(
+                        request, "checkout/error.html", context
+                    )
+
+            if order.payment_method == "cartao":
+                try:
+                    preference_data = await acreate_payment_charge(snapshot)
+                    await sync_to_async(self.save_card_preference)(
+                        order, preference_data, session_cart
+                    )
+                    return redirect("checkout:awaiting_payment", order_id=order.id)
+                except Exception as e:
+                    await order.adelete()
+                    print(f"Erro ao criar pagamento com cartão: {e}")
+                    context["error_message"] = (
+                        "Erro ao processar pagamento com cartão. Tente novamente."
+                    )
+                    return await sync_to_async(render)(
+                        request, "checkout/error.html", context
+                    )
+
+            if order.payment_method == "dinheiro":
+                try:
+                    # Limpa o carrinho
+                    await sync_to_async(session_cart.clear)()
+                    return await sync_to_async(render)(
+                        request, "checkout/success.html", context
+                    )
+                except Exception as e:
+                    await order.adelete()
+                    print(f"Erro ao processar pagamento em dinheiro: {e}")
+                    context["error_message"] = (
+                        "Erro ao finalizar pedido. Tente novamente."
+                    )
+                    return await sync_to_async(render)(
+                        request, "checkout/error.html", context
+                    )
+
+            # Fallback para outros métodos de pagamento
+            return await sync_to_async(self.render_fallback)(request, session_cart)
+
+        except Exception as e:
+            print(f"Error processing order: {e}")
+            return await sync_to_async(render)(request, "checkout/error.html", context)
+
+    def place_order(self, request):
+        """
+        Parte síncrona do checkout: valida o carrinho e grava o pedido.
+        Retorna (resposta de erro ou None, pedido, snapshot, carrinho, contexto).
+        """
+        # O checkout grava o carrinho do cache no banco (Cart/CartItem)
+        session_cart = SessionCart(request)
+        cart = session_cart.flush()
+        # Itens e produtos em uma consulta; filtros e total calculados em memória
+        cart_items = list(cart.items.select_related("product")) if cart is not None else []
 
         # SEGURANÇA: Verificar se há produtos inativos no carrinho
-        inactive_items = cart_items.filter(product__is_active=False)
-        if inactive_items.exists():
+        inactive_items = [item for item in cart_items if not item.product.is_active]
+        if inactive_items:
             context = self.get_context_data()
             context["error_message"] = (
                 "Seu carrinho contém produtos que não estão mais disponíveis. Remova-os antes de continuar."
@@ -38,19 +127,22 @@ class CheckoutView(TemplateView):
             context["inactive_products"] = [
                 item.product.name for item in inactive_items
             ]
-            return render(request, "checkout/error.html", context)
+            return render(request, "checkout/error.html", context), None, None, None, None
 
         # Filtrar apenas produtos ativos para o checkout
-        cart_items = cart_items.filter(product__is_active=True)
+        cart_items = [item for item in cart_items if item.product.is_active]
 
-        if not cart_items.exists():
+        if not cart_items:
             context = self.get_context_data()
             context["error_message"] = (
                 "Seu carrinho está vazio ou todos os produtos estão indisponíveis."
             )
-            return render(request, "checkout/error.html", context)
+            return render(request, "checkout/error.html", context), None, None, None, None
 
-        total = cart.total_price  # Usando a propriedade do modelo
+        # Mesmo cálculo de Cart.total_price, sem nova consulta
+        total = sum(
+            (item.product.price * item.quantity for item in cart_items), Decimal("0.00")
+        )
         name = request.POST.get("name")
         phone = request.POST.get("phone")
         cpf = request.POST.get("cpf", "").strip()
@@ -62,112 +154,73 @@ class CheckoutView(TemplateView):
         # Validação do troco
         if payment_method == "dinheiro":
             try:
-                cash_value = float(cash_value.replace(",", "."))
+                cash_value = Decimal(cash_value.replace(",", "."))
             except Exception:
-                cash_value = 0
+                cash_value = Decimal("0")
             if cash_value < total:
-                return render(request, "checkout/error.html", context)
+                return render(request, "checkout/error.html", context), None, None, None, None
 
         try:
-            # Cria o pedido
-            order = Order.objects.create(
-                customer_name=name,
-                phone=phone,
-                cpf=cpf if cpf else None,
-                address=address,
-                payment_method=payment_method,
-                cash_value=cash_value if payment_method == "dinheiro" else None,
-                payment_status="pending",
-            )
-            for item in cart_items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
+            # Cria o pedido, os itens e a notificação de novo pedido na mesma
+            # transação; o envio é feito pelo notification_worker
+            lines = [(item.product, item.quantity) for item in cart_items]
+            with transaction.atomic():
+                order = Order.objects.create_with_items(
+                    lines,
+                    customer_name=name,
+                    phone=phone,
+                    cpf=cpf if cpf else None,
+                    address=address,
+                    payment_method=payment_method,
+                    cash_value=cash_value if payment_method == "dinheiro" else None,
+                    payment_status="pending",
                 )
-
-            # Envia notificação de novo pedido para todos os métodos de pagamento
-            try:
-                send_order_notifications_with_callmebot(order)
-            except Exception as e:
-                print(f"Erro ao enviar notificação de novo pedido: {e}")
-                # Não interrompe o fluxo se a notificação falhar
-
-            # Se o pagamento for PIX, cria o pagamento e redireciona
-            if payment_method == "pix":
-                try:
-                    payment_data = create_payment_charge(order)
-                    # Salva o ID do pagamento no pedido para rastreamento
-                    order.payment_id = payment_data.get("id")
-                    order.payment_url = (
-                        payment_data.get("point_of_interaction", {})
-                        .get("transaction_data", {})
-                        .get("ticket_url")
-                    )
-                    order.save()
-
-                    # Limpa o carrinho e redireciona para página de aguardar pagamento
-                    cart.items.all().delete()
-                    return redirect("checkout:awaiting_payment", order_id=order.id)
-                except Exception as e:
-                    order.delete()
-                    print(f"Erro ao criar pagamento PIX: {e}")
-                    context["error_message"] = (
-                        "Erro ao processar pagamento PIX. Tente novamente."
-                    )
-                    return render(request, "checkout/error.html", context)
-
-            if payment_method == "cartao":
-                try:
-                    preference_data = create_payment_charge(order)
-                    # Salva a URL de pagamento no pedido, pagamento por preferência não gera ID de pagamento imediato, só depois do pagamento no webhook
-                    order.payment_id = None
-                    order.payment_url = preference_data.get("init_point")
-                    order.save()
-
-                    # Limpa o carrinho e redireciona para página de aguardar pagamento
-                    cart.items.all().delete()
-                    return redirect("checkout:awaiting_payment", order_id=order.id)
-                except Exception as e:
-                    order.delete()
-                    print(f"Erro ao criar pagamento com cartão: {e}")
-                    context["error_message"] = (
-                        "Erro ao processar pagamento com cartão. Tente novamente."
-                    )
-                    return render(request, "checkout/error.html", context)
-
-            if payment_method == "dinheiro":
-                try:
-                    # Limpa o carrinho
-                    cart.items.all().delete()
-                    return render(request, "checkout/success.html", context)
-                except Exception as e:
-                    order.delete()
-                    print(f"Erro ao processar pagamento em dinheiro: {e}")
-                    context["error_message"] = (
-                        "Erro ao finalizar pedido. Tente novamente."
-                    )
-                    return render(request, "checkout/error.html", context)
-
-            # Fallback para outros métodos de pagamento
-            cart.items.all().delete()
-            context = self.get_context_data()
-            return render(request, "checkout/success.html", context)
-
+                # Produtos já em memória: mensagem e cobrança sem consultar os itens
+                snapshot = OrderSnapshot.from_lines(order, merge_order_lines(lines))
+                queue_order_notifications(order, snapshot)
         except Exception as e:
             print(f"Error processing order: {e}")
-            return render(request, "checkout/error.html", context)
+            return render(request, "checkout/error.html", context), None, None, None, None
+
+        return None, order, snapshot, session_cart, context
+
+    def save_pix_payment(self, order, payment_data, session_cart):
+        # Salva o ID do pagamento no pedido para rastreamento
+        order.payment_id = payment_data.get("id")
+        transaction_data = payment_data.get(
+            "point_of_interaction", {}
+        ).get("transaction_data", {})
+        order.payment_url = transaction_data.get("ticket_url")
+        order.payment_qr_code = transaction_data.get("qr_code")
+        order.save(update_fields=["payment_id", "payment_url", "payment_qr_code"])
+        Payment.record(order, order.payment_id, payment_data, source="checkout")
+        cache_payment_state(order.payment_id, payment_data)
+
+        # Limpa o carrinho antes de redirecionar para a página de aguardar pagamento
+        session_cart.clear()
+
+    def save_card_preference(self, order, preference_data, session_cart):
+        # Salva a URL de pagamento no pedido, pagamento por preferência não gera ID de pagamento imediato, só depois do pagamento no webhook
+        order.payment_id = None
+        order.payment_url = preference_data.get("init_point")
+        order.save(update_fields=["payment_id", "payment_url"])
+
+        # Limpa o carrinho antes de redirecionar para a página de aguardar pagamento
+        session_cart.clear()
+
+    def render_fallback(self, request, session_cart):
+        session_cart.clear()
+        context = self.get_context_data()
+        return render(request, "checkout/success.html", context)
 
 
-def create_payment_charge(order: Order) -> dict:
+async def acreate_payment_charge(order: OrderSnapshot) -> dict:
     """
-    Função para criar uma cobrança de pagamento via MercadoPago.
+    Cria a cobrança do pedido no MercadoPago (cliente HTTP assíncrono), a
+    partir do snapshot montado no checkout.
     """
-
-    mp_service = MercadoPagoService()
-
     if order.payment_method == "pix":
-        payment_data = mp_service.pay_with_pix(
+        payment_data = await mp_service.apay_with_pix(
             amount=float(order.total_price),
             payer_email="cliente@exemplo.com",
             payer_cpf=order.cpf if order.cpf else "00000000000",
@@ -177,20 +230,10 @@ def create_payment_charge(order: Order) -> dict:
 
     elif order.payment_method == "cartao":
         # Criar lista de itens para a preferência
-        items = []
-        for item in order.items.all():
-            items.append(
-                {
-                    "id": str(item.product.id),
-                    "title": item.product.name,
-                    "quantity": item.quantity,
-                    "currency_id": "BRL",
-                    "unit_price": float(item.product.price),
-                }
-            )
+        items = order.preference_items()
 
         # Usar o método adequado do serviço MercadoPago
-        preference_data = mp_service.create_preference_with_card(
+        preference_data = await mp_service.acreate_preference_with_card(
             items, order_id=str(order.id)
         )
         return preference_data
@@ -217,6 +260,8 @@ class AwaitingPaymentView(TemplateView):
                 "order": order,
                 "payment_info": payment_info,
                 "ticket_url": ticket_url,
+                # Autoriza o WebSocket de status do pagamento deste pedido
+                "payment_status_token": make_payment_status_token(order.id),
             }
         )
         return context
@@ -226,18 +271,37 @@ def get_payment_info(payment_id: str) -> dict:
     """
     Função para buscar informações de um pagamento
     """
-    mp_service = MercadoPagoService()
     return mp_service.get_payment_info(payment_id)
 
 
+# Status do Mercado Pago equivalente ao status final já gravado no pedido
+FINAL_PAYMENT_STATUS = {
+    "paid": {"status": "approved", "status_detail": "accredited"},
+    "cancelled": {"status": "cancelled", "status_detail": None},
+}
+
+
 @csrf_exempt
-def check_payment_status(request, order_id):
+async def check_payment_status(request, order_id):
     """
     API endpoint para verificar status do pagamento via AJAX (PIX e Cartão)
+
+    Responde a partir do pedido (status final gravado pelo webhook) ou do
+    cache de status do pagamento; o Mercado Pago só é consultado quando o
+    cache vence, sem ocupar uma thread enquanto aguarda a resposta.
     """
     if request.method == "GET":
         try:
-            order = get_object_or_404(Order, id=order_id)
+            order = await aget_object_or_404(
+                Order.objects.only(
+                    "id",
+                    "payment_id",
+                    "payment_status",
+                    "payment_url",
+                    "payment_qr_code",
+                ),
+                id=order_id,
+            )
 
             if not order.payment_id:
                 return JsonResponse(
@@ -247,20 +311,17 @@ def check_payment_status(request, order_id):
                     }
                 )
 
-            payment_info = get_payment_info(order.payment_id)
-
+            payment_state = FINAL_PAYMENT_STATUS.get(order.payment_status)
+            if payment_state is None:
+                payment_state = await aget_payment_state(order.payment_id)
 
             return JsonResponse(
                 {
                     "status": "success",
-                    "payment_status": payment_info.get("status"),
-                    "payment_detail": payment_info.get("status_detail"),
-                    "ticket_url": payment_info.get("point_of_interaction", {})
-                    .get("transaction_data", {})
-                    .get("ticket_url"),
-                    "qr_code": payment_info.get("point_of_interaction", {})
-                    .get("transaction_data", {})
-                    .get("qr_code"),
+                    "payment_status": payment_state.get("status"),
+                    "payment_detail": payment_state.get("status_detail"),
+                    "ticket_url": order.payment_url,
+                    "qr_code": order.payment_qr_code,
                     "order_paid": order.payment_status == "paid",
                 }
             )
@@ -0,0 +1,234 @@
+"""
+Utilitários de cache compartilhados (Redis via django-redis).
+
+- Chaves versionadas por namespace: invalidar um namespace inteiro é apenas
+  incrementar a versão (bump_version), sem precisar apagar chave por chave.
+- get_or_compute protege contra "thundering herd": o valor guarda um prazo de
+  validade "soft" menor que o TTL real; quando vence, só quem conseguir o lock
+  recalcula e os demais continuam servindo o valor anterior. Sem valor
+  nenhum, os demais aguardam o lock por um curto período antes de calcular.
+- aget_or_compute é a versão para views assíncronas (cálculo assíncrono).
+- Com o cache indisponível, qualquer falha (versão, leitura, lock, gravação)
+  só é registrada no log e o valor vem direto de compute().
+- LocalLRUCache guarda valores na memória do processo (sem ida ao Redis nem
+  desserialização), com limite de entradas e prazo de validade.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger("app.cache")
+
+LOCK_TIMEOUT = 30  # segundos
+LOCK_WAIT = 2.0  # segundos aguardando outro processo calcular
+LOCK_POLL_INTERVAL = 0.05
+STALE_GRACE = 60  # segundos em que um valor vencido ainda pode ser servido
+
+
+def get_timeout(name, default=300):
+    """TTL configurado em settings.CACHE_TIMEOUTS"""
+    return getattr(settings, "CACHE_TIMEOUTS", {}).get(name, default)
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def get_version(namespace):
+    try:
+        version = cache.get(_version_key(namespace))
+        if version is None:
+            cache.add(_version_key(namespace), 1, timeout=None)
+            version = cache.get(_version_key(namespace)) or 1
+        return version
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao ler versão de {namespace}: {e}")
+        return None
+
+
+def bump_version(namespace):
+    """Invalida todas as entradas do namespace"""
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # Chave ainda não existe
+        cache.add(_version_key(namespace), 2, timeout=None)
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao invalidar {namespace}: {e}")
+
+
+def _entry_key(namespace, version, name):
+    return f"{namespace}:v{version}:{name}"
+
+
+def set_value(namespace, name, value, timeout):
+    """
+    Grava um valor já conhecido (ex.: recebido por webhook) no mesmo formato
+    usado por get_or_compute, renovando seu prazo de validade.
+    """
+    version = get_version(namespace)
+    if version is None:
+        return
+    try:
+        cache.set(
+            _entry_key(namespace, version, name),
+            {"value": value, "expires_at": time.time() + timeout},
+            timeout=timeout + STALE_GRACE,
+        )
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao gravar {namespace}:{name}: {e}")
+
+
+_MISSING = object()
+
+
+def _lookup(namespace, name):
+    """
+    Primeira etapa do get_or_compute: lê a entrada e, se vencida, tenta o
+    lock. Retorna (key, has_lock, entry, value); value é _MISSING quando o
+    chamador precisa calcular e key é None quando o cache está indisponível.
+    """
+    version = get_version(namespace)
+    if version is None:
+        return None, False, None, _MISSING
+
+    key = _entry_key(namespace, version, name)
+    try:
+        entry = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao ler {key}: {e}")
+        return None, False, None, _MISSING
+
+    if entry is not None and entry["expires_at"] > time.time():
+        return key, False, entry, entry["value"]
+
+    try:
+        has_lock = cache.add(f"{key}:lock", 1, timeout=LOCK_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao travar {key}: {e}")
+        return None, False, None, _MISSING
+    if not has_lock and entry is not None:
+        # Outro processo já está recalculando; serve o valor anterior
+        return key, False, entry, entry["value"]
+    return key, has_lock, entry, _MISSING
+
+
+def _store(key, value, timeout):
+    try:
+        cache.set(
+            key,
+            {"value": value, "expires_at": time.time() + timeout},
+            timeout=timeout + STALE_GRACE,
+        )
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao gravar {key}: {e}")
+
+
+def _release(key):
+    try:
+        cache.delete(f"{key}:lock")
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao liberar o lock de {key}: {e}")
+
+
+def get_or_compute(namespace, name, compute, timeout):
+    """
+    Retorna o valor de `name` no namespace, calculando com `compute()` quando
+    ausente ou vencido. O valor precisa ser serializável em JSON.
+    """
+    key, has_lock, entry, value = _lookup(namespace, name)
+    if value is not _MISSING:
+        return value
+    if key is None:
+        return compute()
+
+    if not has_lock:
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                entry = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Cache indisponível ao aguardar {key}: {e}")
+                break
+            if entry is not None:
+                return entry["value"]
+
+    try:
+        value = compute()
+        _store(key, value, timeout)
+        return value
+    finally:
+        if has_lock:
+            _release(key)
+
+
+async def aget_or_compute(namespace, name, compute, timeout):
+    """
+    Versão assíncrona de get_or_compute: `compute` é uma corrotina (ex.:
+    consulta HTTP assíncrona) e o acesso ao cache roda em sync_to_async.
+    """
+    key, has_lock, entry, value = await sync_to_async(_lookup)(namespace, name)
+    if value is not _MISSING:
+        return value
+    if key is None:
+        return await compute()
+
+    if not has_lock:
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                entry = await cache.aget(key)
+            except Exception as e:
+                logger.warning(f"Cache indisponível ao aguardar {key}: {e}")
+                break
+            if entry is not None:
+                return entry["value"]
+
+    try:
+        value = await compute()
+        await sync_to_async(_store)(key, value, timeout)
+        return value
+    finally:
+        if has_lock:
+            await sync_to_async(_release)(key)
+
+
+class LocalLRUCache:
+    """Cache em memória do processo, com descarte do menos usado (LRU)"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,157 @@
+"""
+Django management command que mede o custo de montar as mensagens de um
+pedido (services.notification_templates) a partir do OrderSnapshot.
+
+Compara o acesso antigo, em que cada mensagem percorria order.items e o
+produto de cada item, com o snapshot carregado uma vez e os templates
+pré-montados. Mostra o tempo por mensagem (mediana) e as consultas de cada
+etapa. O pedido e os produtos sintéticos ficam em uma transação desfeita no
+final.
+
+Uso:
+    python manage.py benchmark_notifications                  # Pedido com 5 itens
+    python manage.py benchmark_notifications --items 20       # Itens no pedido
+    python manage.py benchmark_notifications --iterations 5000 --repeat 7
+"""
+
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from checkout.models import Order
+from checkout.snapshots import OrderSnapshot
+from core.queries import track_queries
+from products.models import Product
+from services.notification_templates import (
+    render_new_order_admin,
+    render_new_order_client,
+    render_payment_update,
+)
+
+
+class RollbackBenchmark(Exception):
+    pass
+
+
+def legacy_item_lines(order):
+    """Como as mensagens montavam a lista de itens antes do snapshot"""
+    return "\n".join(
+        [f"  • {item.product.name} (x{item.quantity})" for item in order.items.all()]
+    )
+
+
+class Command(BaseCommand):
+    help = "Mede o custo por mensagem das notificações de pedido"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=5,
+            help="Itens no pedido sintético (padrão: 5)",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=2000,
+            help="Mensagens renderizadas por medição (padrão: 2000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Medições de cada etapa (usa a mediana)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                order = self.create_order(max(1, options["items"]))
+                self.run(order, max(1, options["iterations"]), max(1, options["repeat"]))
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            self.stdout.write("🧹 Pedido sintético removido (transação desfeita)")
+
+    def create_order(self, items):
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Produto benchmark {index}",
+                    price=Decimal("9.90") + index,
+                    image="products/benchmark.jpg",
+                )
+                for index in range(items)
+            ]
+        )
+        return Order.objects.create_with_items(
+            [(product, index % 3 + 1) for index, product in enumerate(products)],
+            customer_name="Cliente Benchmark",
+            phone="11999999999",
+            address="Rua do Benchmark, 1",
+            payment_method="dinheiro",
+            cash_value=Decimal("500.00"),
+        )
+
+    def measure(self, func, iterations, repeat):
+        """Mediana (µs por chamada) e consultas de uma chamada"""
+        with track_queries() as stats:
+            func()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            timings.append((time.perf_counter() - started) / iterations * 1_000_000)
+        return statistics.median(timings), stats.count
+
+    def row(self, label, micros, queries):
+        self.stdout.write(f"{label:<44} {micros:>10.1f}µs {queries:>9}")
+
+    def run(self, order, iterations, repeat):
+        order = Order.objects.get(pk=order.pk)
+        snapshot = OrderSnapshot.from_order(order)
+        # Consultas são bem mais lentas que a renderização: menos iterações
+        db_iterations = max(1, iterations // 20)
+
+        self.stdout.write(
+            f"\n📊 Pedido com {len(snapshot.lines)} itens | mediana de {repeat} medições\n"
+        )
+        self.stdout.write(f"{'etapa':<44} {'por chamada':>12} {'consultas':>9}")
+
+        self.stdout.write("\n— Antes: itens consultados a cada mensagem")
+        self.row(
+            "lista de itens via order.items",
+            *self.measure(lambda: legacy_item_lines(order), db_iterations, repeat),
+        )
+
+        self.stdout.write("\n— Snapshot (carregado uma vez por pedido)")
+        self.row(
+            "OrderSnapshot.from_order (1 consulta)",
+            *self.measure(lambda: OrderSnapshot.from_order(order), db_iterations, repeat),
+        )
+        self.row(
+            "OrderSnapshot.load (pedido + itens)",
+            *self.measure(lambda: OrderSnapshot.load(order.pk), db_iterations, repeat),
+        )
+
+        self.stdout.write("\n— Renderização a partir do snapshot")
+        renders = [
+            ("novo pedido (admin)", lambda: render_new_order_admin(snapshot)),
+            ("novo pedido (cliente)", lambda: render_new_order_client(snapshot)),
+            ("atualização de pagamento", lambda: render_payment_update(snapshot)),
+            ("payload do WebSocket", snapshot.payload),
+            ("itens da preferência (cartão)", snapshot.preference_items),
+        ]
+        for label, func in renders:
+            self.row(label, *self.measure(func, iterations, repeat))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "\n✅ Benchmark concluído (antes, cada mensagem de novo pedido fazia "
+                f"{1 + len(snapshot.lines)} consultas; agora o snapshot é carregado "
+                "uma vez e as mensagens não consultam o banco)"
+            )
+        )
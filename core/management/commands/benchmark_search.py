@@ -0,0 +1,130 @@
+"""
+Django management command para comparar a busca de pedidos antiga
+(customer_name/phone __icontains) com a busca normalizada (core.search).
+
+Cria os pedidos sintéticos dentro de uma transação que é desfeita no final,
+então o banco não fica com os dados do benchmark. No PostgreSQL roda ANALYZE
+antes das medições e mostra o plano da busca nova (índice trigram).
+
+Uso:
+    python manage.py benchmark_search                    # 100 mil pedidos
+    python manage.py benchmark_search --orders 250000    # Quantidade de pedidos
+    python manage.py benchmark_search --repeat 10        # Execuções por consulta
+"""
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from checkout.models import Order
+from core.search import build_search_text
+from core.synthetic import random_name, random_phone
+
+QUERIES = ["maria", "joão silva", "conceicao", "98765", "(11) 9", "magalhães araujo"]
+
+
+class RollbackBenchmark(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compara a busca de pedidos por icontains com a busca normalizada"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--orders",
+            type=int,
+            default=100_000,
+            help="Quantidade de pedidos sintéticos",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Execuções de cada consulta (usa a mediana)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Pedidos por INSERT",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed_orders(options["orders"], options["batch_size"], options["seed"])
+                self.run(max(1, options["repeat"]))
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            self.stdout.write("🧹 Pedidos sintéticos removidos (transação desfeita)")
+
+    def seed_orders(self, count, batch_size, seed):
+        rng = random.Random(seed)
+        self.stdout.write(f"🔧 Criando {count} pedidos sintéticos...")
+        for start in range(0, count, batch_size):
+            batch = []
+            for _ in range(min(batch_size, count - start)):
+                name = random_name(rng)
+                phone = random_phone(rng)
+                batch.append(
+                    Order(
+                        customer_name=name,
+                        phone=phone,
+                        address="Rua do Benchmark, 1",
+                        search_text=build_search_text(name, phone),
+                    )
+                )
+            Order.objects.bulk_create(batch)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE checkout_order")
+
+    def measure(self, queryset, repeat):
+        """Mediana (ms) do COUNT + primeira página, como na listagem"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            total = queryset.count()
+            list(queryset.order_by("-created_at", "-id")[:10])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), total
+
+    def run(self, repeat):
+        self.stdout.write(
+            f"\n📊 Banco: {connection.vendor} | {Order.objects.count()} pedidos | "
+            f"mediana de {repeat} execuções\n"
+        )
+        self.stdout.write(f"{'busca':<20} {'icontains':>12} {'search()':>12} {'linhas':>14}")
+
+        for query in QUERIES:
+            old = Order.objects.filter(
+                Q(customer_name__icontains=query) | Q(phone__icontains=query)
+            )
+            new = Order.objects.search(query)
+            old_ms, old_total = self.measure(old, repeat)
+            new_ms, new_total = self.measure(new, repeat)
+            self.stdout.write(
+                f"{query!r:<20} {old_ms:>10.1f}ms {new_ms:>10.1f}ms "
+                f"{old_total:>6} / {new_total:<6}"
+            )
+
+        if connection.vendor == "postgresql":
+            sql, params = Order.objects.search(QUERIES[1]).query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN ANALYZE {sql}", params)
+                plan = "\n".join(f"   {row[0]}" for row in cursor.fetchall())
+            self.stdout.write(f"\n🔍 Plano da busca {QUERIES[1]!r}:\n{plan}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "\n✅ Benchmark concluído (linhas: icontains / search(); "
+                "a busca normalizada também ignora acentos e pontuação)"
+            )
+        )
@@ -0,0 +1,343 @@
+"""
+Django management command para gerar grandes volumes de pedidos sintéticos
+(milhões, em minutos) para testes de escala do dashboard, da busca e da
+paginação.
+
+- Determinístico: a mesma --seed com os mesmos parâmetros e catálogo gera os
+  mesmos pedidos (ver core.synthetic).
+- Lotes de --chunk-size pedidos gravados com COPY no PostgreSQL e INSERT em
+  lote nos demais bancos, em --workers processos.
+- Período, mistura de status e de formas de pagamento configuráveis; usa os
+  produtos ativos ou cria um catálogo sintético com --products.
+
+Os ids dos pedidos são reservados antes da gravação; rode em um banco de
+testes, sem tráfego. No final o resumo diário de vendas é reconstruído (os
+INSERTs em lote não passam pelos signals).
+
+Uso:
+    python manage.py generate_data --orders 1000000
+    python manage.py generate_data --orders 200000 --start 2024-01-01 --end 2024-12-31
+    python manage.py generate_data --status-mix completed=85,pending=5,cancelled=10
+    python manage.py generate_data --payment-mix pix=60,dinheiro=25,cartao=15
+    python manage.py generate_data --products 200 --categories 12   # Catálogo sintético
+    python manage.py generate_data --workers 8 --chunk-size 20000
+    python manage.py generate_data --cleanup                         # Remove os dados sintéticos
+"""
+
+import multiprocessing
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from checkout.models import Order, OrderItem, Payment
+from core.search import build_search_text
+from core.synthetic import SYNTHETIC_MARK, generate_chunk, parse_mix, write_chunk
+from products.catalog import invalidate_catalog
+from products.models import Category, Product
+from services.models import NotificationOutbox
+
+PRODUCT_TYPES = [
+    ("Água Mineral", ["500ml", "1,5L", "5L", "10L", "20L"]),
+    ("Água com Gás", ["500ml", "1,5L"]),
+    ("Galão", ["10L", "20L"]),
+    ("Gás de Cozinha", ["P5", "P13", "P45"]),
+    ("Suporte para Galão", ["Simples", "Elétrico"]),
+    ("Gelo", ["2kg", "5kg"]),
+]
+
+
+def _init_worker():
+    """Processo novo: garante o Django carregado e conexões próprias"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _run_chunk(task):
+    index, count, first_id, config, use_copy = task
+    orders, items = generate_chunk(index, count, first_id, config)
+    write_chunk(orders, items, use_copy)
+    return len(orders), len(items)
+
+
+class Command(BaseCommand):
+    help = "Gera pedidos sintéticos em volume (determinístico) para testes de escala"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100_000, help="Pedidos a gerar")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--start", help="Primeiro dia (AAAA-MM-DD)")
+        parser.add_argument(
+            "--end", help="Último dia (AAAA-MM-DD, padrão: hoje)"
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Dias até --end quando --start não é informado",
+        )
+        parser.add_argument(
+            "--status-mix",
+            default="completed=75,pending=10,cancelled=15",
+            help="Pesos dos status do pedido",
+        )
+        parser.add_argument(
+            "--payment-mix",
+            default="pix=55,dinheiro=30,cartao=15",
+            help="Pesos das formas de pagamento",
+        )
+        parser.add_argument(
+            "--max-items", type=int, default=4, help="Máximo de produtos por pedido"
+        )
+        parser.add_argument(
+            "--products",
+            type=int,
+            default=0,
+            help="Cria um catálogo sintético com N produtos (0 = usa os produtos ativos)",
+        )
+        parser.add_argument(
+            "--categories",
+            type=int,
+            default=8,
+            help="Categorias do catálogo sintético",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=10_000, help="Pedidos por lote"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Processos (0 = automático: 1 no SQLite, até 4 no PostgreSQL)",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Usa INSERT em lote também no PostgreSQL",
+        )
+        parser.add_argument(
+            "--no-rollup",
+            action="store_true",
+            help="Não reconstrói o resumo diário de vendas no final",
+        )
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help="Remove pedidos, produtos e categorias sintéticos",
+        )
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            self.cleanup(options["chunk_size"])
+        else:
+            self.generate(options)
+
+        if not options["no_rollup"]:
+            call_command("rebuild_sales_rollup", stdout=self.stdout)
+
+    # Geração
+
+    def date_range(self, options):
+        try:
+            end = date.fromisoformat(options["end"]) if options["end"] else timezone.localdate()
+            if options["start"]:
+                start = date.fromisoformat(options["start"])
+            else:
+                start = end - timedelta(days=max(1, options["days"]) - 1)
+        except ValueError as e:
+            raise CommandError(f"Data inválida: {e}")
+        if start > end:
+            raise CommandError("--start deve ser anterior a --end")
+        return start, (end - start).days + 1
+
+    def create_catalog(self, count, categories, seed):
+        """Catálogo sintético determinístico (bulk_create não dispara signals)"""
+        rng = random.Random(f"{seed}-catalog")
+        # Categorias já criadas em execuções anteriores são reaproveitadas
+        Category.objects.bulk_create(
+            [
+                Category(name=f"Categoria {i + 1} {SYNTHETIC_MARK}", description=SYNTHETIC_MARK)
+                for i in range(max(1, categories))
+            ],
+            ignore_conflicts=True,
+        )
+        created_categories = list(
+            Category.objects.filter(description=SYNTHETIC_MARK).order_by("id")[: max(1, categories)]
+        )
+        products = []
+        for i in range(count):
+            kind, sizes = rng.choice(PRODUCT_TYPES)
+            name = f"{kind} {rng.choice(sizes)} #{i + 1}"
+            products.append(
+                Product(
+                    name=name,
+                    description=SYNTHETIC_MARK,
+                    price=Decimal(rng.randint(300, 15000)) / 100,
+                    image="products/sintetico.png",
+                    category=rng.choice(created_categories),
+                    search_text=build_search_text(name),
+                )
+            )
+        Product.objects.bulk_create(products, batch_size=1000)
+        invalidate_catalog()
+        self.stdout.write(
+            f"🛒 Catálogo sintético: {count} produtos em {len(created_categories)} categorias"
+        )
+
+    def reserve_ids(self, count):
+        """Reserva a faixa de ids dos pedidos e retorna o primeiro"""
+        table = Order._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    f"SELECT pg_get_serial_sequence('{table}', 'id')"
+                )
+                sequence = cursor.fetchone()[0]
+                cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+                cursor.execute(
+                    f"SELECT GREATEST(COALESCE(MAX(id), 0), "
+                    f"(SELECT last_value FROM {sequence})) FROM {table}"
+                )
+                current = cursor.fetchone()[0]
+                cursor.execute("SELECT setval(%s, %s)", [sequence, current + count])
+            else:
+                current = Order.objects.aggregate(last=Max("id"))["last"] or 0
+        return current + 1
+
+    def generate(self, options):
+        total = options["orders"]
+        if total <= 0:
+            raise CommandError("--orders deve ser maior que zero")
+        try:
+            statuses, status_weights = parse_mix(options["status_mix"], Order.STATUS_CHOICES)
+            payments, payment_weights = parse_mix(options["payment_mix"], Order.PAYMENT_CHOICES)
+        except ValueError as e:
+            raise CommandError(str(e))
+        start, days = self.date_range(options)
+
+        if options["products"] > 0:
+            self.create_catalog(options["products"], options["categories"], options["seed"])
+            products = Product.objects.filter(description=SYNTHETIC_MARK)
+        else:
+            products = Product.objects.filter(is_active=True)
+        products = list(products.order_by("id").values_list("id", "price"))
+        if not products:
+            raise CommandError(
+                "❌ Nenhum produto ativo encontrado! Use --products N ou mock_products."
+            )
+
+        chunk_size = max(1, options["chunk_size"])
+        workers = options["workers"]
+        if workers <= 0:
+            workers = 1 if connection.vendor == "sqlite" else min(4, os.cpu_count() or 1)
+        use_copy = not options["no_copy"]
+
+        config = {
+            "seed": options["seed"],
+            "start": timezone.make_aware(datetime.combine(start, datetime.min.time())),
+            "days": days,
+            "statuses": statuses,
+            "status_weights": status_weights,
+            "payments": payments,
+            "payment_weights": payment_weights,
+            "products": products,
+            "max_items": max(1, options["max_items"]),
+        }
+        first_id = self.reserve_ids(total)
+        tasks = [
+            (index, min(chunk_size, total - offset), first_id + offset, config, use_copy)
+            for index, offset in enumerate(range(0, total, chunk_size))
+        ]
+
+        method = "COPY" if use_copy and connection.vendor == "postgresql" else "INSERT em lote"
+        self.stdout.write(
+            f"🚀 Gerando {total} pedidos de {start} a {start + timedelta(days=days - 1)} "
+            f"({len(products)} produtos, {len(tasks)} lotes, {workers} processos, {method})"
+        )
+
+        started = time.perf_counter()
+        orders_done = items_done = 0
+        if workers == 1:
+            results = map(_run_chunk, tasks)
+            pool = None
+        else:
+            # Conexões não podem ser compartilhadas com os processos filhos
+            connections.close_all()
+            pool = multiprocessing.Pool(workers, initializer=_init_worker)
+            results = pool.imap_unordered(_run_chunk, tasks)
+
+        try:
+            for orders, items in results:
+                orders_done += orders
+                items_done += items
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"   📦 {orders_done}/{total} pedidos "
+                    f"({orders_done / elapsed:.0f} pedidos/s)"
+                )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Order._meta.db_table}")
+                cursor.execute(f"ANALYZE {OrderItem._meta.db_table}")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {orders_done} pedidos e {items_done} itens em {elapsed:.1f}s "
+                f"(ids {first_id} a {first_id + total - 1}, seed {options['seed']})"
+            )
+        )
+
+    # Remoção
+
+    def cleanup(self, batch_size):
+        self.stdout.write(self.style.WARNING("🧹 Removendo dados sintéticos..."))
+        synthetic = Order.objects.filter(address__endswith=SYNTHETIC_MARK)
+        orders_table = Order._meta.db_table
+        items_table = OrderItem._meta.db_table
+        orders_deleted = 0
+        while True:
+            ids = list(synthetic.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            # DELETE direto: pelo ORM cada pedido dispararia os signals (evento
+            # WebSocket e recálculo do dia); o resumo é reconstruído no final
+            placeholders = ", ".join(["%s"] * len(ids))
+            with transaction.atomic(), connection.cursor() as cursor:
+                NotificationOutbox.objects.filter(order_id__in=ids).delete()
+                Payment.objects.filter(order_id__in=ids).delete()
+                cursor.execute(
+                    f"DELETE FROM {items_table} WHERE order_id IN ({placeholders})", ids
+                )
+                cursor.execute(
+                    f"DELETE FROM {orders_table} WHERE id IN ({placeholders})", ids
+                )
+            orders_deleted += len(ids)
+            self.stdout.write(f"   📦 {orders_deleted} pedidos removidos")
+
+        products = Product.objects.filter(description=SYNTHETIC_MARK)
+        products_deleted = products.count()
+        products.delete()
+        Category.objects.filter(description=SYNTHETIC_MARK).delete()
+        invalidate_catalog()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {orders_deleted} pedidos e {products_deleted} produtos sintéticos removidos"
+            )
+        )
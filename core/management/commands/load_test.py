@@ -0,0 +1,615 @@
+"""
+Django management command de teste de carga da loja, do checkout, do webhook
+e do dashboard.
+
+Faz requisições reais às rotas (products/, cart/add/, checkout/,
+services/webhook/mercadopago/, dashboard/) com o cliente de teste do Django,
+em várias threads, contra o banco configurado (SQLite ou PostgreSQL local).
+Mercado Pago e CallMeBot/Evolution são substituídos por um servidor HTTP local
+(stub), então o teste roda offline e não gera cobranças nem mensagens reais.
+
+Para cada cenário informa latência p50/p95/p99, requisições por segundo e
+consultas SQL por requisição. O resultado é gravado em JSON (com o commit
+atual) para comparar execuções com --compare.
+
+Cenários:
+    products       GET /products/ (vitrine)
+    cart_add       POST /cart/add/
+    checkout       POST /checkout/ com PIX (carrinho preenchido antes, fora da medição)
+    webhook        POST /services/webhook/mercadopago/ (gravação na fila de webhooks)
+    dashboard      GET /dashboard/ (usuário staff)
+    notifications  Envio de notificações do outbox ao CallMeBot (stub)
+
+Os pedidos, carrinhos, sessões e o usuário criados pelo teste são removidos no
+final (exceto com --keep).
+
+Uso:
+    python manage.py load_test                                  # Todos os cenários, 8 threads
+    python manage.py load_test --concurrency 32 --requests 2000
+    python manage.py load_test --scenarios products cart_add
+    python manage.py load_test --stub-latency 150               # Mercado Pago respondendo em 150ms
+    python manage.py load_test --compare benchmarks/load_test-abc1234-20250101-120000.json
+"""
+
+import itertools
+import json
+import math
+import re
+import secrets
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from cart.engine import CART_ID_SESSION_KEY, TOKEN_SESSION_KEY, _state_key
+from cart.models import Cart
+from checkout.models import Order
+from products.catalog import get_catalog
+from products.models import Product
+from services.mercadopago import mp_service
+from services.models import NotificationOutbox, WebhookEvent
+from services.notifications import deliver_notification
+
+BENCHMARK_CUSTOMER = "Teste de Carga"
+BENCHMARK_USERNAME = "load-test"
+RESULTS_DIR = Path(settings.BASE_DIR) / "benchmarks"
+
+
+# --- Servidor stub (Mercado Pago + CallMeBot/Evolution) ---
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """
+    Respostas mínimas das APIs externas usadas pela loja:
+        POST /v1/payments          pagamento PIX pendente, com QR code
+        GET  /v1/payments/<id>     pagamento aprovado (accredited)
+        POST /checkout/preferences preferência de cartão (init_point)
+        GET  qualquer outro        CallMeBot
+        POST qualquer outro        Evolution API
+    """
+
+    latency = 0.0
+    payment_ids = itertools.count(1)
+
+    def send_json(self, data, status=200):
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        match = re.fullmatch(r"/v1/payments/([\w-]+)", self.path.split("?")[0])
+        if match:
+            self.send_json(
+                {
+                    "id": match.group(1),
+                    "status": "approved",
+                    "status_detail": "accredited",
+                    "date_approved": timezone.now().isoformat(),
+                }
+            )
+        else:
+            self.send_json({"message": "queued"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        path = self.path.split("?")[0]
+
+        if path == "/v1/payments":
+            payment_id = f"load-{next(self.payment_ids)}"
+            self.send_json(
+                {
+                    "id": payment_id,
+                    "status": "pending",
+                    "status_detail": "pending_waiting_transfer",
+                    "point_of_interaction": {
+                        "transaction_data": {
+                            "ticket_url": f"http://stub.local/ticket/{payment_id}",
+                            "qr_code": f"00020126-{payment_id}",
+                        }
+                    },
+                },
+                status=201,
+            )
+        elif path == "/checkout/preferences":
+            preference_id = next(self.payment_ids)
+            self.send_json(
+                {
+                    "id": f"pref-{preference_id}",
+                    "init_point": f"http://stub.local/checkout/{preference_id}",
+                },
+                status=201,
+            )
+        else:
+            self.send_json({"status": "sent"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency=0.0):
+    """Sobe o stub em uma porta livre e retorna (server, base_url)"""
+    handler = type("LoadTestStubHandler", (StubAPIHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+# --- Métricas ---
+
+
+def percentile(values, pct):
+    """Percentil pelo método nearest-rank (values já ordenados)"""
+    if not values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[rank]
+
+
+def summarize(samples, elapsed):
+    """Resumo do cenário a partir das amostras (latência em s, consultas, ok)"""
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    queries = [sample[1] for sample in samples]
+    errors = sum(1 for sample in samples if not sample[2])
+    count = len(samples)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "queries": {
+            "avg": round(sum(queries) / count, 2) if count else 0.0,
+            "max": max(queries, default=0),
+        },
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+# --- Cenários ---
+
+
+class Scenario:
+    """
+    Um cenário de carga. setup() roda uma vez antes das threads, prepare()
+    uma vez por thread (cliente próprio), before() antes de cada requisição
+    (fora da medição) e request() é a requisição medida, que retorna o status
+    HTTP.
+    """
+
+    name = ""
+    expected_status = (200,)
+
+    def __init__(self, command):
+        self.command = command
+
+    def setup(self, total):
+        pass
+
+    def prepare(self, client):
+        pass
+
+    def before(self, client, index):
+        pass
+
+    def request(self, client, index):
+        raise NotImplementedError
+
+    def teardown(self):
+        pass
+
+
+class ProductsScenario(Scenario):
+    name = "products"
+
+    def request(self, client, index):
+        return client.get("/products/").status_code
+
+
+class CartAddScenario(Scenario):
+    name = "cart_add"
+
+    def request(self, client, index):
+        product_id = self.command.product_ids[index % len(self.command.product_ids)]
+        return client.post("/cart/add/", {"product_id": product_id}).status_code
+
+
+class CheckoutScenario(Scenario):
+    name = "checkout"
+    # PIX criado: redireciona para a página de aguardar pagamento
+    expected_status = (302,)
+
+    def before(self, client, index):
+        product_id = self.command.product_ids[index % len(self.command.product_ids)]
+        client.post("/cart/add/", {"product_id": product_id})
+
+    def request(self, client, index):
+        response = client.post(
+            "/checkout/",
+            {
+                "name": BENCHMARK_CUSTOMER,
+                "phone": "(11) 90000-0000",
+                "cpf": "",
+                "address": f"Rua do Teste, {index}",
+                "payment_method": "pix",
+            },
+        )
+        return response.status_code
+
+
+class WebhookScenario(Scenario):
+    name = "webhook"
+
+    def setup(self, total):
+        # Um pedido PIX pendente por requisição (até 500, depois reaproveita)
+        product = Product.objects.get(pk=self.command.product_ids[0])
+        token = secrets.token_hex(4)
+        self.payment_ids = []
+        for i in range(min(total, 500)):
+            payment_id = f"load-webhook-{token}-{i}"
+            Order.objects.create_with_items(
+                [(product, 1)],
+                customer_name=BENCHMARK_CUSTOMER,
+                phone="(11) 90000-0000",
+                address="Rua do Teste, 0",
+                payment_method="pix",
+                payment_status="pending",
+                payment_id=payment_id,
+            )
+            self.payment_ids.append(payment_id)
+
+    def request(self, client, index):
+        payment_id = self.payment_ids[index % len(self.payment_ids)]
+        response = client.post(
+            "/services/webhook/mercadopago/",
+            data=json.dumps({"action": "payment.updated", "data": {"id": payment_id}}),
+            content_type="application/json",
+        )
+        return response.status_code
+
+    def teardown(self):
+        WebhookEvent.objects.filter(payment_id__in=self.payment_ids).delete()
+
+
+class DashboardScenario(Scenario):
+    name = "dashboard"
+
+    def setup(self, total):
+        User = get_user_model()
+        self.user, _ = User.objects.get_or_create(
+            username=BENCHMARK_USERNAME, defaults={"is_staff": True}
+        )
+
+    def prepare(self, client):
+        client.force_login(self.user)
+
+    def request(self, client, index):
+        return client.get("/dashboard/").status_code
+
+    def teardown(self):
+        self.user.delete()
+
+
+class NotificationsScenario(Scenario):
+    name = "notifications"
+
+    def setup(self, total):
+        product = Product.objects.get(pk=self.command.product_ids[0])
+        order = Order.objects.create_with_items(
+            [(product, 1)],
+            customer_name=BENCHMARK_CUSTOMER,
+            phone="(11) 90000-0000",
+            address="Rua do Teste, 0",
+            payment_method="dinheiro",
+            payment_status="pending",
+        )
+        self.notifications = [
+            NotificationOutbox.enqueue("callmebot", "new_order", f"Teste de carga {i}", order=order)
+            for i in range(min(total, 500))
+        ]
+
+    def request(self, client, index):
+        deliver_notification(self.notifications[index % len(self.notifications)])
+        return 200
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        ProductsScenario,
+        CartAddScenario,
+        CheckoutScenario,
+        WebhookScenario,
+        DashboardScenario,
+        NotificationsScenario,
+    )
+}
+
+
+class Command(BaseCommand):
+    help = "Teste de carga das rotas da loja, checkout, webhook e dashboard (offline)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios",
+            nargs="+",
+            choices=list(SCENARIOS),
+            default=list(SCENARIOS),
+            help="Cenários a executar (padrão: todos)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Threads simultâneas"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requisições medidas por cenário"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=2, help="Requisições de aquecimento por thread"
+        )
+        parser.add_argument(
+            "--stub-latency",
+            type=float,
+            default=0.0,
+            help="Atraso das APIs simuladas, em milissegundos",
+        )
+        parser.add_argument(
+            "--output",
+            help="Arquivo JSON do resultado (padrão: benchmarks/load_test-<commit>-<data>.json)",
+        )
+        parser.add_argument(
+            "--compare", help="JSON de uma execução anterior para comparar"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=10.0,
+            help="Piora do p95 (%%) considerada regressão na comparação",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Mantém pedidos, carrinhos e usuário criados pelo teste",
+        )
+
+    def handle(self, *args, **options):
+        self.product_ids = [product["id"] for product in get_catalog().products]
+        if not self.product_ids:
+            raise CommandError(
+                "Nenhum produto ativo no catálogo (rode python manage.py mock_products)"
+            )
+
+        previous = None
+        if options["compare"]:
+            try:
+                previous = json.loads(Path(options["compare"]).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler {options['compare']}: {e}")
+
+        concurrency = max(1, options["concurrency"])
+        total = max(1, options["requests"])
+        self.started_at = timezone.now()
+        self.sessions = []
+        self.sessions_lock = threading.Lock()
+
+        server, stub_url = start_stub_server(options["stub_latency"] / 1000)
+        self.stdout.write(f"🧪 APIs externas simuladas em {stub_url}")
+        self.stdout.write(
+            f"🚀 {total} requisições por cenário, {concurrency} threads, "
+            f"banco {connection.vendor}"
+        )
+
+        overrides = override_settings(
+            ALLOWED_HOSTS=["testserver", *settings.ALLOWED_HOSTS],
+            MP_BASE_API_URL=stub_url,
+            CALLMEBOT_API_URL=f"{stub_url}/whatsapp.php",
+            CALLMEBOT_API_KEY=settings.CALLMEBOT_API_KEY or "load-test",
+            CALLMEBOT_PHONE_NUMBER=settings.CALLMEBOT_PHONE_NUMBER or "5500000000000",
+            EVOLUTION_API_BASE_URL=stub_url,
+        )
+        # mp_service é criado na importação, com a URL da configuração
+        original_mp_url = mp_service._base_url
+        mp_service._base_url = stub_url
+
+        results = {}
+        try:
+            with overrides:
+                for name in options["scenarios"]:
+                    scenario = SCENARIOS[name](self)
+                    self.stdout.write(f"\n▶️  {name}...")
+                    results[name] = self.run_scenario(
+                        scenario, concurrency, total, max(0, options["warmup"])
+                    )
+                    self.print_result(name, results[name])
+        finally:
+            mp_service._base_url = original_mp_url
+            server.shutdown()
+            if not options["keep"]:
+                self.cleanup()
+
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "commit": git_commit(),
+                "database": connection.vendor,
+                "concurrency": concurrency,
+                "requests": total,
+                "stub_latency_ms": options["stub_latency"],
+            },
+            "scenarios": results,
+        }
+        output = self.write_report(report, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"\n💾 Resultado salvo em {output}"))
+
+        if previous:
+            self.print_comparison(previous, report, options["threshold"])
+
+    def run_scenario(self, scenario, concurrency, total, warmup):
+        scenario.setup(total)
+        counter = itertools.count()
+        samples = []
+        errors = []
+        lock = threading.Lock()
+        clock = {}
+        barrier = threading.Barrier(
+            concurrency, action=lambda: clock.setdefault("start", time.perf_counter())
+        )
+
+        def worker():
+            client = Client()
+            try:
+                scenario.prepare(client)
+                for i in range(warmup):
+                    scenario.before(client, i)
+                    scenario.request(client, i)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            try:
+                barrier.wait()
+                while (index := next(counter)) < total:
+                    scenario.before(client, index)
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        try:
+                            ok = scenario.request(client, index) in scenario.expected_status
+                        except Exception as e:
+                            ok = False
+                            with lock:
+                                errors.append(e)
+                        elapsed = time.perf_counter() - started
+                    with lock:
+                        samples.append((elapsed, len(queries), ok))
+            finally:
+                self.forget_client(client)
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+        try:
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        finally:
+            scenario.teardown()
+        elapsed = time.perf_counter() - clock.get("start", time.perf_counter())
+
+        for error in errors[:3]:
+            self.stdout.write(self.style.WARNING(f"   ⚠️ {error}"))
+        return summarize(samples, elapsed)
+
+    def forget_client(self, client):
+        """Guarda a sessão do cliente para remover carrinho e sessão no final"""
+        session = client.session
+        with self.sessions_lock:
+            self.sessions.append(session)
+
+    def cleanup(self):
+        cart_ids = set()
+        for session in self.sessions:
+            if session.get(CART_ID_SESSION_KEY):
+                cart_ids.add(session[CART_ID_SESSION_KEY])
+            if session.get(TOKEN_SESSION_KEY):
+                cache.delete(_state_key(session[TOKEN_SESSION_KEY]))
+            if session.session_key:
+                session.delete()
+
+        carts, _ = Cart.objects.filter(pk__in=cart_ids).delete()
+        orders = Order.objects.filter(
+            customer_name=BENCHMARK_CUSTOMER, created_at__gte=self.started_at
+        )
+        deleted_orders = orders.count()
+        orders.delete()
+        get_user_model().objects.filter(username=BENCHMARK_USERNAME).delete()
+        self.stdout.write(
+            f"\n🧹 Removidos {deleted_orders} pedidos de teste, "
+            f"{len(cart_ids)} carrinhos e {len(self.sessions)} sessões"
+        )
+
+    def print_result(self, name, result):
+        latency = result["latency_ms"]
+        line = (
+            f"   p50 {latency['p50']:.1f}ms | p95 {latency['p95']:.1f}ms | "
+            f"p99 {latency['p99']:.1f}ms | {result['throughput_rps']:.0f} req/s | "
+            f"SQL {result['queries']['avg']:.1f}/req (máx {result['queries']['max']})"
+        )
+        self.stdout.write(line)
+        if result["errors"]:
+            self.stdout.write(
+                self.style.ERROR(f"   ❌ {result['errors']} de {result['requests']} com erro")
+            )
+
+    def write_report(self, report, output):
+        if output:
+            path = Path(output)
+        else:
+            stamp = timezone.localtime().strftime("%Y%m%d-%H%M%S")
+            commit = report["meta"]["commit"] or "sem-commit"
+            path = RESULTS_DIR / f"load_test-{commit}-{stamp}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        return path
+
+    def print_comparison(self, previous, current, threshold):
+        before_commit = previous.get("meta", {}).get("commit") or "?"
+        after_commit = current["meta"]["commit"] or "?"
+        self.stdout.write(f"\n📊 Comparação {before_commit} → {after_commit}")
+
+        regressions = 0
+        for name, result in current["scenarios"].items():
+            old = previous.get("scenarios", {}).get(name)
+            if not old:
+                continue
+            old_p95 = old["latency_ms"]["p95"]
+            new_p95 = result["latency_ms"]["p95"]
+            change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+            queries_change = result["queries"]["avg"] - old["queries"]["avg"]
+            line = (
+                f"   {name:<14} p95 {old_p95:.1f} → {new_p95:.1f}ms ({change:+.0f}%) | "
+                f"SQL/req {old['queries']['avg']:.1f} → {result['queries']['avg']:.1f} "
+                f"({queries_change:+.1f})"
+            )
+            if change > threshold or queries_change > 0:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(f"{line} ⚠️"))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            self.stdout.write(self.style.WARNING(f"⚠️  {regressions} cenários pioraram"))
+        else:
+            self.stdout.write(self.style.SUCCESS("✅ Nenhuma regressão"))
@@ -0,0 +1,98 @@
+"""
+Django management command que sobe um servidor HTTP local imitando o CallMeBot
+e a Evolution API, para testar o envio de notificações de ponta a ponta sem
+disparar mensagens reais.
+
+Uso:
+    python manage.py notification_stub_server                       # Escuta em 127.0.0.1:8025
+    python manage.py notification_stub_server --fail-rate 0.3       # 30% das chamadas falham (HTTP 500)
+    python manage.py notification_stub_server --latency 1.5         # Atraso de 1,5s por resposta
+
+Aponte as integrações para o stub, por exemplo:
+    CALLMEBOT_API_URL=http://127.0.0.1:8025/whatsapp.php
+    EVOLUTION_API_BASE_URL=http://127.0.0.1:8025
+"""
+
+import json
+import random
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Servidor HTTP local que simula CallMeBot/Evolution API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8025)
+        parser.add_argument(
+            "--fail-rate",
+            type=float,
+            default=0.0,
+            help="Fração das chamadas que retornam erro 500 (0 a 1)",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Segundos de atraso em cada resposta",
+        )
+
+    def handle(self, *args, **options):
+        command = self
+        fail_rate = options["fail_rate"]
+        latency = options["latency"]
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def respond(self, text):
+                if latency:
+                    time.sleep(latency)
+
+                if random.random() < fail_rate:
+                    command.stdout.write(command.style.WARNING(f"💥 Falha simulada: {self.command} {self.path.split('?')[0]}"))
+                    self.send_response(500)
+                    body = b'{"error": "simulated failure"}'
+                else:
+                    command.stdout.write(f"📩 {self.command} {self.path.split('?')[0]}\n{text}\n")
+                    self.send_response(200)
+                    body = b'{"status": "ok"}'
+
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                # CallMeBot envia a mensagem no parâmetro "text"
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                self.respond(query.get("text", [""])[0])
+
+            def do_POST(self):
+                # Evolution API envia JSON com "number" e "text"
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    payload = {}
+                self.respond(f"para {payload.get('number', '?')}: {payload.get('text', '')}")
+
+            def log_message(self, format, *args):
+                # Saída já é feita em respond()
+                pass
+
+        server = ThreadingHTTPServer((options["host"], options["port"]), StubHandler)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"🧪 Stub de notificações em http://{options['host']}:{options['port']} "
+                f"(falhas: {fail_rate:.0%}, latência: {latency}s)"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
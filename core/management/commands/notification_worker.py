@@ -0,0 +1,159 @@
+"""
+Django management command que envia as notificações do outbox (NotificationOutbox).
+
+As notificações são gravadas na mesma transação que cria/atualiza o pedido, e
+este worker as envia fora do ciclo de requisição: várias em paralelo, com limite
+de envios por provedor (settings.NOTIFICATION_RATE_LIMITS), novas tentativas com
+backoff exponencial e dead letter ao esgotar as tentativas.
+
+Uso:
+    python manage.py notification_worker                    # Executa continuamente
+    python manage.py notification_worker --once             # Processa o que está pendente e sai
+    python manage.py notification_worker --concurrency 8    # Envios em paralelo
+"""
+
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from services.http import RateLimiter
+from services.models import NotificationOutbox
+from services.notifications import deliver_notification
+
+
+class Command(BaseCommand):
+    help = "Envia as notificações pendentes do outbox (WhatsApp/CallMeBot)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa as notificações pendentes e encerra",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Número de envios simultâneos (padrão: 4)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Notificações reservadas por ciclo (padrão: 50)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Segundos de espera quando não há notificações (padrão: 2)",
+        )
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=10,
+            help="Reprocessa notificações presas em processamento há mais de N minutos",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--concurrency e --batch-size devem ser maiores que zero")
+
+        self.stopping = False
+        self.stats = {"sent": 0, "retry": 0, "dead": 0}
+        self.stats_lock = threading.Lock()
+        self.limiters = {
+            provider: RateLimiter(rate)
+            for provider, rate in settings.NOTIFICATION_RATE_LIMITS.items()
+        }
+
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+            self.stdout.write("📨 Worker de notificações iniciado")
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            while not self.stopping:
+                self.requeue_stale(options["stale_minutes"])
+                batch = self.claim_batch(options["batch_size"])
+
+                if batch:
+                    # Aguarda o lote terminar antes de reservar o próximo
+                    list(executor.map(self.process, batch))
+                    continue
+
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Notificações enviadas: {self.stats['sent']} | "
+                f"reagendadas: {self.stats['retry']} | "
+                f"dead letter: {self.stats['dead']}"
+            )
+        )
+
+    def stop(self, *args):
+        self.stdout.write("⏹️  Encerrando após o lote atual...")
+        self.stopping = True
+
+    def requeue_stale(self, minutes):
+        requeued = NotificationOutbox.objects.stale_processing(minutes).update(
+            status="pending", locked_at=None
+        )
+        if requeued:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️  {requeued} notificações presas voltaram para a fila")
+            )
+
+    def claim_batch(self, batch_size):
+        """
+        Reserva um lote de notificações vencidas. Com PostgreSQL, SKIP LOCKED
+        permite vários workers sem que dois peguem a mesma mensagem.
+        """
+        with transaction.atomic():
+            ids = list(
+                NotificationOutbox.objects.due()
+                .select_for_update(skip_locked=True)
+                .order_by("next_attempt_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            NotificationOutbox.objects.filter(id__in=ids, status="pending").update(
+                status="processing", locked_at=timezone.now()
+            )
+        return list(NotificationOutbox.objects.filter(id__in=ids, status="processing"))
+
+    def process(self, notification):
+        try:
+            limiter = self.limiters.get(notification.provider)
+            if limiter:
+                limiter.acquire()
+
+            try:
+                deliver_notification(notification)
+            except Exception as e:
+                notification.mark_failed(e)
+                result = "dead" if notification.status == "dead" else "retry"
+                self.stderr.write(
+                    f"❌ Notificação #{notification.id} ({notification.kind}) falhou "
+                    f"[tentativa {notification.attempts}]: {e}"
+                )
+            else:
+                notification.mark_sent()
+                result = "sent"
+
+            with self.stats_lock:
+                self.stats[result] += 1
+        finally:
+            # Cada thread tem sua própria conexão com o banco
+            close_old_connections()
+            connection.close()
@@ -0,0 +1,166 @@
+"""
+Django management command para remover carrinhos abandonados.
+
+Remove em lotes limitados, com pausa entre eles para não competir com a loja:
+- carrinhos sem itens criados há mais de --empty-hours horas;
+- carrinhos sem item adicionado nos últimos --days dias.
+
+Ao final informa as linhas removidas e o espaço liberado (medido no SQLite;
+estimado pelo tamanho médio das linhas no PostgreSQL, onde o espaço volta a
+ser reaproveitável depois do VACUUM).
+
+Uso:
+    python manage.py reap_carts                        # Padrão: 7 dias / 24h vazios
+    python manage.py reap_carts --days 3 --empty-hours 6
+    python manage.py reap_carts --batch-size 500 --sleep 1
+    python manage.py reap_carts --dry-run              # Apenas conta
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+
+
+def _sqlite_free_bytes():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA freelist_count")
+        free_pages = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return free_pages * cursor.fetchone()[0]
+
+
+def _postgres_bytes_per_row(model):
+    """Tamanho médio de uma linha da tabela, incluindo índices e TOAST"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_total_relation_size(%s::regclass), reltuples "
+            "FROM pg_class WHERE oid = %s::regclass",
+            [table, table],
+        )
+        total_bytes, estimated_rows = cursor.fetchone()
+    rows = estimated_rows if estimated_rows and estimated_rows > 0 else model.objects.count()
+    return total_bytes / rows if rows else 0
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = "Remove carrinhos abandonados em lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Carrinhos sem item adicionado há esse número de dias",
+        )
+        parser.add_argument(
+            "--empty-hours",
+            type=int,
+            default=24,
+            help="Carrinhos vazios criados há esse número de horas",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Carrinhos removidos por lote",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.5,
+            help="Pausa entre lotes, em segundos",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=0,
+            help="Máximo de lotes nesta execução (0 = sem limite)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta os carrinhos que seriam removidos",
+        )
+
+    def stale_carts(self, days, empty_hours):
+        now = timezone.now()
+        cutoff = now - timedelta(days=days)
+        empty_cutoff = now - timedelta(hours=empty_hours)
+
+        recent_items = CartItem.objects.filter(cart=OuterRef("pk"), added_at__gte=cutoff)
+        any_items = CartItem.objects.filter(cart=OuterRef("pk"))
+        return Cart.objects.alias(
+            has_recent=Exists(recent_items), has_items=Exists(any_items)
+        ).filter(
+            Q(created_at__lt=cutoff, has_recent=False)
+            | Q(created_at__lt=empty_cutoff, has_items=False)
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        stale = self.stale_carts(options["days"], options["empty_hours"])
+
+        if options["dry_run"]:
+            carts = stale.count()
+            items = CartItem.objects.filter(cart__in=stale.values("pk")).count()
+            self.stdout.write(f"🔎 {carts} carrinhos abandonados ({items} itens) seriam removidos")
+            return
+
+        vendor = connection.vendor
+        if vendor == "postgresql":
+            cart_row_bytes = _postgres_bytes_per_row(Cart)
+            item_row_bytes = _postgres_bytes_per_row(CartItem)
+        elif vendor == "sqlite":
+            free_before = _sqlite_free_bytes()
+
+        self.stdout.write("🧹 Removendo carrinhos abandonados...")
+        carts_deleted = items_deleted = batches = 0
+        while True:
+            ids = list(stale.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+
+            with transaction.atomic():
+                # Itens primeiro: o DELETE dos carrinhos não precisa cascatear
+                items, _ = CartItem.objects.filter(cart_id__in=ids).delete()
+                carts, _ = Cart.objects.filter(pk__in=ids).delete()
+            carts_deleted += carts
+            items_deleted += items
+            batches += 1
+            self.stdout.write(f"   📦 Lote {batches}: {carts} carrinhos, {items} itens")
+
+            if len(ids) < batch_size:
+                break
+            if options["max_batches"] and batches >= options["max_batches"]:
+                self.stdout.write(self.style.WARNING("⏸️  Limite de lotes atingido"))
+                break
+            time.sleep(options["sleep"])
+
+        if vendor == "postgresql":
+            reclaimed = carts_deleted * cart_row_bytes + items_deleted * item_row_bytes
+            space = f"~{format_bytes(reclaimed)} estimados (reaproveitáveis após VACUUM)"
+        elif vendor == "sqlite":
+            space = f"{format_bytes(_sqlite_free_bytes() - free_before)} liberados"
+        else:
+            space = "espaço não medido"
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {carts_deleted} carrinhos e {items_deleted} itens removidos "
+                f"em {batches} lotes; {space}"
+            )
+        )
@@ -0,0 +1,67 @@
+"""
+Django management command para reconstruir o resumo diário de vendas.
+
+Uso:
+    python manage.py rebuild_sales_rollup              # Reconstrói todo o histórico
+    python manage.py rebuild_sales_rollup --days 30    # Reconstrói apenas os últimos 30 dias
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from checkout.models import Order
+from dashboard.models import DailySalesRollup, rollup_aggregates
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a tabela de resumo diário de vendas a partir dos pedidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=0,
+            help="Reconstrói apenas os últimos N dias (0 = todo o histórico)",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days < 0:
+            raise CommandError("--days deve ser maior ou igual a zero")
+
+        orders = Order.objects.all()
+        rollups = DailySalesRollup.objects.all()
+        if days:
+            first_day = timezone.localdate() - timedelta(days=days - 1)
+            start, _ = DailySalesRollup.day_bounds(first_day)
+            orders = orders.filter(created_at__gte=start)
+            rollups = rollups.filter(date__gte=first_day)
+
+        # Uma única query agrupada por dia (fuso local)
+        rows = (
+            orders.annotate(day=TruncDate("created_at"))
+            .values("day")
+            .annotate(**rollup_aggregates())
+            .order_by("day")
+        )
+
+        with transaction.atomic():
+            deleted, _ = rollups.delete()
+            created = DailySalesRollup.objects.bulk_create(
+                [
+                    DailySalesRollup(date=row.pop("day"), **row)
+                    for row in rows
+                ],
+                batch_size=500,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Resumo diário reconstruído: {len(created)} dias "
+                f"({deleted} linhas antigas removidas)"
+            )
+        )
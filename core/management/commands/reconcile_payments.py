@@ -0,0 +1,233 @@
+"""
+Django management command que confere com o Mercado Pago os pagamentos online
+(PIX/cartão) que continuam pendentes.
+
+Recupera os pedidos cujo webhook se perdeu: seleciona os pendentes com
+payment_id criados há mais de --older-than minutos, consulta o Mercado Pago em
+lotes, várias consultas em paralelo e com limite de consultas por segundo
+(settings.RECONCILE_RATE_LIMIT), e aplica o resultado ao pedido
+(services.reconciliation). PIX pendentes após a data de expiração são
+cancelados. As gravações no banco ficam na thread principal, uma por vez.
+
+Ao final informa quantos pedidos foram pagos, cancelados, expirados ou
+continuam pendentes, e quanto saiu da receita pendente do dashboard.
+
+Uso:
+    python manage.py reconcile_payments                     # Pendentes há mais de 15 min
+    python manage.py reconcile_payments --older-than 60     # Pendentes há mais de 1h
+    python manage.py reconcile_payments --concurrency 8 --rate 10
+    python manage.py reconcile_payments --interval 300      # Repete a cada 5 min
+    python manage.py reconcile_payments --dry-run           # Apenas conta
+"""
+
+import logging
+import signal
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from checkout.models import Order, Payment
+from services.http import RateLimiter
+from services.mercadopago import mp_service
+from services.reconciliation import SETTLED_ACTIONS, reconcile_payment
+
+logger = logging.getLogger("app.payments")
+
+# Ação do update_order_status -> contador do relatório
+ACTION_COUNTERS = {
+    "payment_approved": "approved",
+    "payment_cancelled": "cancelled",
+    "payment_expired": "expired",
+}
+
+
+class Command(BaseCommand):
+    help = "Confere com o Mercado Pago os pagamentos PIX/cartão que continuam pendentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=settings.RECONCILE_STALE_MINUTES,
+            help="Pedidos pendentes criados há mais de N minutos "
+            f"(padrão: {settings.RECONCILE_STALE_MINUTES})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Pedidos consultados por lote (padrão: 50)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Consultas simultâneas ao Mercado Pago (padrão: 4)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.RECONCILE_RATE_LIMIT,
+            help="Máximo de consultas por segundo (0 = sem limite)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Máximo de pedidos conferidos por execução (0 = todos)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Repete a conferência a cada N segundos (0 = executa uma vez)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas conta os pedidos que seriam conferidos",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--concurrency e --batch-size devem ser maiores que zero")
+
+        candidates = self.candidates(options["older_than"])
+        if options["dry_run"]:
+            self.show_candidates(candidates)
+            return
+
+        self.stopping = False
+        self.limiter = RateLimiter(options["rate"])
+        if options["interval"] > 0:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+            self.stdout.write("🔁 Conciliação de pagamentos iniciada")
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            while not self.stopping:
+                self.run(executor, candidates, options)
+                if options["interval"] <= 0:
+                    break
+
+                close_old_connections()
+                next_run = time.monotonic() + options["interval"]
+                while not self.stopping and time.monotonic() < next_run:
+                    time.sleep(min(1.0, next_run - time.monotonic()))
+
+    def stop(self, *args):
+        self.stdout.write("⏹️  Encerrando após o lote atual...")
+        self.stopping = True
+
+    def candidates(self, minutes):
+        # Expiração gravada no Payment: usada quando a resposta não traz a data
+        expires_at = Payment.objects.filter(
+            order=OuterRef("pk"), payment_id=OuterRef("payment_id")
+        ).values("date_of_expiration")[:1]
+        return (
+            Order.objects.awaiting_reconciliation(minutes)
+            .annotate(expires_at=Subquery(expires_at))
+            .only("id", "payment_id", "payment_method", "total_amount")
+            .order_by("id")
+        )
+
+    def show_candidates(self, candidates):
+        summary = candidates.aggregate(total=Sum("total_amount"))
+        count = candidates.count()
+        expired = candidates.filter(expires_at__lt=timezone.now()).count()
+        self.stdout.write(
+            f"🔎 {count} pagamentos pendentes seriam conferidos "
+            f"(R$ {summary['total'] or Decimal('0.00'):.2f}); "
+            f"PIX vencidos: {expired}"
+        )
+
+    def fetch(self, payment_id):
+        self.limiter.acquire()
+        payment_data = mp_service.get_payment_info(str(payment_id))
+        if not payment_data:
+            raise RuntimeError(f"Pagamento {payment_id} não encontrado")
+        return payment_data
+
+    def run(self, executor, candidates, options):
+        started = time.monotonic()
+        stats = Counter()
+        settled_revenue = Decimal("0.00")
+        last_id = 0
+
+        while not self.stopping:
+            size = options["batch_size"]
+            if options["limit"]:
+                size = min(size, options["limit"] - stats["checked"])
+                if size <= 0:
+                    break
+
+            # Paginação pelo id: pedidos que continuam pendentes não voltam no próximo lote
+            batch = list(candidates.filter(id__gt=last_id)[:size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            now = timezone.now()
+            futures = {executor.submit(self.fetch, order.payment_id): order for order in batch}
+            errors_before = stats["errors"]
+            for future in as_completed(futures):
+                order = futures[future]
+                stats["checked"] += 1
+                try:
+                    action = reconcile_payment(order, future.result(), now)
+                except Exception as e:
+                    stats["errors"] += 1
+                    self.stderr.write(
+                        f"❌ Pedido #{order.id} (pagamento {order.payment_id}): {e}"
+                    )
+                    continue
+
+                stats[ACTION_COUNTERS.get(action, "pending")] += 1
+                if action in SETTLED_ACTIONS:
+                    settled_revenue += order.total_amount or Decimal("0.00")
+
+            if stats["errors"] - errors_before == len(batch):
+                # Lote inteiro falhou: Mercado Pago fora do ar ou circuito aberto
+                self.stderr.write(
+                    self.style.WARNING("⚠️  Todas as consultas do lote falharam; interrompendo")
+                )
+                break
+            if len(batch) < size:
+                break
+
+        self.report(stats, settled_revenue, time.monotonic() - started)
+
+    def report(self, stats, settled_revenue, elapsed):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {stats['checked']} pagamentos conferidos em {elapsed:.1f}s | "
+                f"pagos: {stats['approved']} | cancelados: {stats['cancelled']} | "
+                f"expirados: {stats['expired']} | ainda pendentes: {stats['pending']} | "
+                f"erros: {stats['errors']}"
+            )
+        )
+        if settled_revenue:
+            self.stdout.write(
+                f"   💰 R$ {settled_revenue:.2f} saíram da receita pendente"
+            )
+
+        fields = {
+            f"reconcile_{key}": stats[key]
+            for key in ("checked", "approved", "cancelled", "expired", "pending", "errors")
+        }
+        logger.info(
+            f"Conciliação de pagamentos: {stats['checked']} conferidos, "
+            f"{stats['errors']} erros",
+            extra={
+                **fields,
+                "reconcile_settled_revenue": float(settled_revenue),
+                "reconcile_seconds": round(elapsed, 2),
+            },
+        )
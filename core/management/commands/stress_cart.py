@@ -0,0 +1,138 @@
+"""
+Django management command para verificar as alterações concorrentes do
+carrinho: várias threads somam itens ao mesmo carrinho ao mesmo tempo e a
+quantidade final precisa ser exatamente threads x cliques (nenhum clique
+perdido).
+
+Modos:
+    cache     SessionCart (lock do carrinho no cache, caso comum)
+    database  CartItem.objects.change_quantity (UPDATE atômico com F(),
+              usado quando o cache está indisponível)
+
+O carrinho de teste é removido no final.
+
+Uso:
+    python manage.py stress_cart                          # 20 threads x 10 cliques, cache
+    python manage.py stress_cart --mode database          # UPDATE atômico no banco
+    python manage.py stress_cart --threads 50 --clicks 20
+"""
+
+import secrets
+import threading
+import time
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from cart.engine import TOKEN_SESSION_KEY, SessionCart, _state_key
+from cart.models import Cart, CartItem
+from products.catalog import get_catalog
+
+
+class Command(BaseCommand):
+    help = "Soma itens ao mesmo carrinho a partir de várias threads e confere o total"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=20)
+        parser.add_argument("--clicks", type=int, default=10, help="Cliques por thread")
+        parser.add_argument("--mode", choices=["cache", "database"], default="cache")
+
+    def handle(self, *args, **options):
+        products = get_catalog().products
+        if not products:
+            raise CommandError("Nenhum produto ativo no catálogo")
+        product_id = products[0]["id"]
+
+        threads = max(1, options["threads"])
+        clicks = max(1, options["clicks"])
+        expected = threads * clicks
+
+        self.stdout.write(
+            f"🔧 {threads} threads x {clicks} cliques no mesmo carrinho "
+            f"(modo {options['mode']})..."
+        )
+        if options["mode"] == "cache":
+            quantity, errors, elapsed = self.run_cache(product_id, threads, clicks)
+        else:
+            quantity, errors, elapsed = self.run_database(product_id, threads, clicks)
+
+        self.stdout.write(
+            f"📊 {expected} cliques em {elapsed:.2f}s "
+            f"({expected / elapsed:.0f}/s), {errors} erros"
+        )
+        # Cliques com erro falharam de forma visível (ex.: SQLite travado);
+        # perdidos são os que "deram certo" e não aparecem no total
+        lost = expected - errors - quantity
+        if lost == 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✅ Quantidade final {quantity} ({errors} com erro): nenhum clique perdido"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"❌ Quantidade final {quantity}, esperado {expected - errors} "
+                    f"({lost} cliques perdidos)"
+                )
+            )
+
+    def hammer(self, threads, clicks, click):
+        errors = []
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(clicks):
+                    try:
+                        click()
+                    except Exception as e:
+                        errors.append(e)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        for error in errors[:3]:
+            self.stdout.write(self.style.WARNING(f"   ⚠️ {error}"))
+        return len(errors), elapsed
+
+    def run_cache(self, product_id, threads, clicks):
+        token = secrets.token_urlsafe(16)
+
+        def click():
+            # Cada "requisição" tem sua própria sessão com o mesmo token
+            request = SimpleNamespace(session={TOKEN_SESSION_KEY: token})
+            SessionCart(request).add(product_id)
+
+        try:
+            errors, elapsed = self.hammer(threads, clicks, click)
+        finally:
+            cart = SessionCart(SimpleNamespace(session={TOKEN_SESSION_KEY: token}))
+            quantity = cart.quantity(product_id)
+            if cart.state.get("cart_id"):
+                Cart.objects.filter(pk=cart.state["cart_id"]).delete()
+            cache.delete(_state_key(token))
+        return quantity, errors, elapsed
+
+    def run_database(self, product_id, threads, clicks):
+        cart = Cart.objects.create()
+
+        def click():
+            CartItem.objects.change_quantity(cart.pk, product_id, 1)
+
+        try:
+            errors, elapsed = self.hammer(threads, clicks, click)
+            quantity = cart.summary(product_id)["quantity"]
+        finally:
+            cart.delete()
+        return quantity, errors, elapsed
@@ -0,0 +1,208 @@
+"""
+Django management command que aplica os webhooks do Mercado Pago gravados pelo
+endpoint services/webhook/mercadopago/ (WebhookEvent).
+
+Para cada evento consulta o pagamento no Mercado Pago e atualiza o pedido
+(update_order_status). Vários pagamentos são processados em paralelo, mas os
+eventos de um mesmo pagamento são aplicados um de cada vez, na ordem de
+chegada. Falhas são reagendadas com backoff exponencial até
+settings.WEBHOOK_MAX_ATTEMPTS, depois vão para dead letter.
+
+A profundidade e o atraso da fila são registrados periodicamente no log
+"app.webhooks" (campos estruturados no formatter json) e ficam disponíveis em
+/services/webhook/metrics/ para admins.
+
+Uso:
+    python manage.py webhook_worker                    # Executa continuamente
+    python manage.py webhook_worker --once             # Processa o que está pendente e sai
+    python manage.py webhook_worker --concurrency 8    # Pagamentos em paralelo
+    python manage.py webhook_worker --stats            # Mostra as métricas da fila e sai
+"""
+
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from services.models import WebhookEvent
+from services.webhooks import process_event, queue_metrics
+
+logger = logging.getLogger("app.webhooks")
+
+
+class Command(BaseCommand):
+    help = "Aplica os webhooks do Mercado Pago gravados na fila (WebhookEvent)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa os eventos pendentes e encerra",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Número de pagamentos processados simultaneamente (padrão: 4)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Eventos reservados por ciclo (padrão: 50)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Segundos de espera quando não há eventos (padrão: 1)",
+        )
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=10,
+            help="Reprocessa eventos presos em processamento há mais de N minutos",
+        )
+        parser.add_argument(
+            "--metrics-interval",
+            type=float,
+            default=60.0,
+            help="Segundos entre os registros de métricas da fila (padrão: 60)",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Mostra as métricas da fila e encerra",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.show_stats()
+            return
+
+        if options["concurrency"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--concurrency e --batch-size devem ser maiores que zero")
+
+        self.stopping = False
+        self.stats = {"processed": 0, "retry": 0, "dead": 0}
+        self.stats_lock = threading.Lock()
+        last_metrics = time.monotonic()
+
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+            self.stdout.write("🔔 Worker de webhooks iniciado")
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            while not self.stopping:
+                if time.monotonic() - last_metrics >= options["metrics_interval"]:
+                    self.log_metrics()
+                    last_metrics = time.monotonic()
+
+                self.requeue_stale(options["stale_minutes"])
+                batch = self.claim_batch(options["batch_size"])
+
+                if batch:
+                    # Aguarda o lote terminar antes de reservar o próximo
+                    list(executor.map(self.process, batch))
+                    continue
+
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+
+        self.log_metrics()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Webhooks processados: {self.stats['processed']} | "
+                f"reagendados: {self.stats['retry']} | "
+                f"dead letter: {self.stats['dead']}"
+            )
+        )
+
+    def stop(self, *args):
+        self.stdout.write("⏹️  Encerrando após o lote atual...")
+        self.stopping = True
+
+    def show_stats(self):
+        metrics = queue_metrics()
+        self.stdout.write("📊 Fila de webhooks")
+        self.stdout.write(f"   Pendentes: {metrics['pending']}")
+        self.stdout.write(f"   Em processamento: {metrics['processing']}")
+        self.stdout.write(f"   Dead letter: {metrics['dead']}")
+        self.stdout.write(
+            f"   Pendente mais antigo: {metrics['oldest_pending_seconds']:.1f}s"
+        )
+        self.stdout.write(
+            f"   Atraso p50/p95: {metrics['lag_p50_seconds']:.2f}s / "
+            f"{metrics['lag_p95_seconds']:.2f}s"
+        )
+
+    def log_metrics(self):
+        metrics = queue_metrics()
+        logger.info(
+            f"Fila de webhooks: {metrics['pending']} pendentes, "
+            f"atraso p95 {metrics['lag_p95_seconds']}s",
+            extra={f"webhook_{key}": value for key, value in metrics.items()},
+        )
+
+    def requeue_stale(self, minutes):
+        stale = list(WebhookEvent.objects.stale_processing(minutes))
+        for event in stale:
+            event.mark_failed("Processamento interrompido (worker encerrado)")
+        if stale:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️  {len(stale)} eventos presos voltaram para a fila")
+            )
+
+    def claim_batch(self, batch_size):
+        """
+        Reserva um lote de eventos vencidos, no máximo um por pagamento. Com
+        PostgreSQL, SKIP LOCKED permite vários workers sem que dois peguem o
+        mesmo evento.
+        """
+        with transaction.atomic():
+            ids = list(
+                WebhookEvent.objects.claimable()
+                .select_for_update(skip_locked=True)
+                .order_by("received_at", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            WebhookEvent.objects.filter(id__in=ids, status="pending").update(
+                status="processing", locked_at=timezone.now()
+            )
+        return list(WebhookEvent.objects.filter(id__in=ids, status="processing"))
+
+    def process(self, event):
+        try:
+            try:
+                process_event(event)
+            except Exception as e:
+                event.mark_failed(e)
+                if event.status == "dead":
+                    result = "dead"
+                elif event.status == "processed":
+                    # Substituído por um aviso mais novo do mesmo pagamento
+                    result = "processed"
+                else:
+                    result = "retry"
+                self.stderr.write(
+                    f"❌ Webhook #{event.id} (pagamento {event.payment_id}) falhou "
+                    f"[tentativa {event.attempts}]: {e}"
+                )
+            else:
+                result = "processed"
+
+            with self.stats_lock:
+                self.stats[result] += 1
+        finally:
+            # Cada thread tem sua própria conexão com o banco
+            close_old_connections()
+            connection.close()
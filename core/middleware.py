@@ -0,0 +1,143 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .queries import atrack_queries, get_query_budget, track_queries
+
+logger = logging.getLogger("app.sql")
+
+
+class QueryBudgetMiddleware:
+    """
+    Mede as consultas SQL de cada requisição (core.queries) e:
+
+    - envia o header Server-Timing (settings.SQL_SERVER_TIMING), visível na
+      aba Network do navegador;
+    - registra as métricas como campos estruturados no log "app.sql"
+      (formatter json): DEBUG para toda requisição, WARNING quando a view
+      passa do orçamento (settings.SQL_QUERY_BUDGETS);
+    - para uma amostra das requisições lentas (SQL_SLOW_REQUEST_MS,
+      SQL_SLOW_SAMPLE_RATE), inclui no log a SQL executada.
+
+    As métricas também ficam em response.sql_stats, usado pelos helpers de
+    teste (core.testing).
+
+    Funciona nos modos síncrono e assíncrono (views assíncronas sob ASGI).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_INSTRUMENTATION:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with track_queries() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        if not settings.SQL_INSTRUMENTATION:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        async with atrack_queries() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats, started)
+
+    def finish(self, request, response, stats, started):
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else None
+        budget = get_query_budget(view_name, request.method)
+        response.sql_stats = stats
+
+        if settings.SQL_SERVER_TIMING:
+            response["Server-Timing"] = (
+                f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries, '
+                f'{stats.duplicates} dup", total;dur={total_ms:.1f}'
+            )
+
+        fields = {
+            "path": request.path,
+            "method": request.method,
+            "view": view_name,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 2),
+            "sql_budget": budget,
+            **stats.as_log_fields(),
+        }
+
+        if budget is not None and stats.count > budget:
+            fields["sql_most_repeated"] = stats.most_repeated()
+            logger.warning(
+                f"Orçamento de SQL excedido em {view_name}: "
+                f"{stats.count} consultas (limite {budget})",
+                extra=fields,
+            )
+
+        if (
+            total_ms >= settings.SQL_SLOW_REQUEST_MS
+            and random.random() < settings.SQL_SLOW_SAMPLE_RATE
+        ):
+            fields["sql_queries"] = [
+                {"sql": sql, "ms": round(seconds * 1000, 2)}
+                for sql, seconds in stats.captured
+            ]
+            logger.warning(
+                f"Requisição lenta {request.method} {request.path}: "
+                f"{total_ms:.0f}ms, {stats.count} consultas",
+                extra=fields,
+            )
+        else:
+            logger.debug(
+                f"{request.method} {request.path}: {stats.count} consultas "
+                f"em {stats.duration_ms:.1f}ms",
+                extra=fields,
+            )
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que também funciona no modo assíncrono. O original
+    só é síncrono e, sob ASGI, faria o Django executar toda a cadeia de
+    middlewares (e as views assíncronas) em threads.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(
+                static_file, request
+            )
+        return await self.get_response(request)
@@ -0,0 +1,321 @@
+"""
+Paginação por cursor (keyset) para as listas do dashboard.
+
+Em vez de OFFSET + COUNT(*) (Paginator do Django), cada página é buscada a
+partir da última linha da página anterior:
+
+    WHERE (created_at, id) < (<cursor>) ORDER BY created_at DESC, id DESC
+    LIMIT per_page + 1
+
+O custo é o mesmo na primeira e na milésima página e usa os índices que já
+existem em created_at. O cursor é opaco na URL (?after=... / ?before=...).
+
+O total exibido é opcional (with_count), calculado só na primeira página e
+limitado (approximate_count): conta no máximo COUNT_LIMIT linhas e, acima
+disso, usa a estimativa do planner no PostgreSQL.
+
+SequenceCursorPaginator aplica os mesmos cursores a uma lista já em memória
+(ex.: o snapshot do catálogo em products.catalog).
+"""
+
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+
+COUNT_LIMIT = 1000
+
+AFTER_PARAM = "after"
+BEFORE_PARAM = "before"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list):
+        raise InvalidCursor("Cursor inválido")
+    return values
+
+
+def _explain_estimate(queryset):
+    """Linhas estimadas pelo planner do PostgreSQL (sem executar a consulta)"""
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    sql, params = compiler.as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def approximate_count(queryset, limit=COUNT_LIMIT):
+    """
+    Total de linhas do queryset sem varrer a tabela inteira.
+    Retorna (total, tipo): conta exatamente até `limit` linhas ("exact");
+    acima disso usa a estimativa do planner no PostgreSQL ("estimate") ou
+    informa apenas o limite ("at_least").
+    """
+    queryset = queryset.order_by()
+    counted = queryset.values("pk")[: limit + 1].count()
+    if counted <= limit:
+        return counted, "exact"
+
+    if connections[queryset.db].vendor == "postgresql":
+        try:
+            return max(_explain_estimate(queryset), counted), "estimate"
+        except Exception:
+            pass
+    return limit, "at_least"
+
+
+class CursorPage:
+    """Página de resultados com a mesma interface usada pelos templates"""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_param(self):
+        return f"{AFTER_PARAM}={self.next_cursor}" if self.next_cursor else ""
+
+    @property
+    def previous_param(self):
+        return f"{BEFORE_PARAM}={self.previous_cursor}" if self.previous_cursor else ""
+
+
+class CursorPaginator:
+    """
+    Paginador keyset sobre `ordering` (por padrão -created_at, -id). O último
+    campo precisa ser único para que o cursor identifique uma única linha.
+
+    with_count=True exibe o total na primeira página; nas seguintes o COUNT
+    não roda (a navegação só depende dos cursores).
+    """
+
+    def __init__(self, queryset, per_page, ordering=("-created_at", "-id"), with_count=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.with_count = with_count
+        self.first_page = True
+        self._count = None
+
+    @property
+    def fields(self):
+        return [name.lstrip("-") for name in self.ordering]
+
+    @property
+    def count(self):
+        """
+        Total (aproximado acima de COUNT_LIMIT); None se desativado ou fora
+        da primeira página
+        """
+        if not (self.with_count and self.first_page):
+            return None
+        if self._count is None:
+            self._count = approximate_count(self.queryset)
+        return self._count[0]
+
+    @property
+    def count_label(self):
+        """Total formatado para exibição ("42", "cerca de 15300", "mais de 1000")"""
+        if self.count is None:
+            return ""
+        total, kind = self._count
+        if kind == "estimate":
+            return f"cerca de {total}"
+        if kind == "at_least":
+            return f"mais de {total}"
+        return str(total)
+
+    def _field_value(self, name, value):
+        field = self.queryset.model._meta.get_field(name)
+        return field.to_python(value)
+
+    def _cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name) for name in self.fields])
+
+    def _keyset_filter(self, values, forward):
+        """
+        Linhas depois (forward) ou antes do cursor na ordenação da lista:
+        (a > x) OR (a = x AND b > y) ..., com o sentido de cada campo.
+        """
+        condition = Q()
+        equal = Q()
+        for ordering, name, value in zip(self.ordering, self.fields, values, strict=True):
+            descending = ordering.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+
+    def get_page(self, after=None, before=None):
+        """
+        Página seguinte a `after` ou anterior a `before` (cursores da URL).
+        Cursor ausente ou inválido retorna a primeira página.
+        """
+        cursor, forward = (after, True) if after else (before, False)
+        values = None
+        if cursor:
+            try:
+                values = [
+                    self._field_value(name, value)
+                    for name, value in zip(self.fields, decode_cursor(cursor), strict=True)
+                ]
+            except Exception:
+                values = None
+        if values is None:
+            forward = True
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, forward))
+        ordering = self.ordering if forward else self._reversed_ordering()
+        rows = list(queryset.order_by(*ordering)[: self.per_page + 1])
+
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            self.first_page = values is None
+            return CursorPage(rows, self, None, None)
+
+        if forward:
+            has_next = has_more
+            has_previous = values is not None
+        else:
+            has_next = True
+            has_previous = has_more
+        self.first_page = not has_previous
+
+        return CursorPage(
+            rows,
+            self,
+            self._cursor_for(rows[-1]) if has_next else None,
+            self._cursor_for(rows[0]) if has_previous else None,
+        )
+
+    def get_page_from_request(self, request):
+        return self.get_page(
+            after=request.GET.get(AFTER_PARAM), before=request.GET.get(BEFORE_PARAM)
+        )
+
+
+class SequenceCursorPaginator:
+    """
+    Mesma paginação por cursor sobre uma lista de dicts já ordenada por
+    `ordering`. Os valores do cursor são os próprios valores dos dicts.
+    """
+
+    def __init__(self, items, per_page, ordering=("-created_at", "-id")):
+        self.items = items
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    @property
+    def count_label(self):
+        return str(self.count)
+
+    def _values(self, item):
+        return [item[name] for name in self.fields]
+
+    def _is_after(self, values, cursor):
+        """Se `values` vem depois do cursor na ordenação da lista"""
+        for ordering, value, reference in zip(self.ordering, values, cursor, strict=True):
+            if value == reference:
+                continue
+            if ordering.startswith("-"):
+                return value < reference
+            return value > reference
+        return False
+
+    def get_page(self, after=None, before=None):
+        cursor, forward = (after, True) if after else (before, False)
+        values = None
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+                if len(values) != len(self.fields):
+                    values = None
+            except InvalidCursor:
+                values = None
+
+        start = 0
+        if values is not None:
+            # Primeira posição depois do cursor (ou a própria, indo para trás)
+            start = next(
+                (
+                    index
+                    for index, item in enumerate(self.items)
+                    if self._is_after(self._values(item), values)
+                ),
+                len(self.items),
+            )
+            if not forward:
+                # A página anterior termina antes da linha do cursor
+                if start and self._values(self.items[start - 1]) == values:
+                    start -= 1
+                start = max(0, start - self.per_page)
+
+        rows = self.items[start : start + self.per_page]
+        if not rows:
+            return CursorPage(rows, self, None, None)
+
+        has_next = start + self.per_page < len(self.items)
+        has_previous = start > 0
+        return CursorPage(
+            rows,
+            self,
+            encode_cursor(self._values(rows[-1])) if has_next else None,
+            encode_cursor(self._values(rows[0])) if has_previous else None,
+        )
+
+    def get_page_from_request(self, request):
+        return self.get_page(
+            after=request.GET.get(AFTER_PARAM), before=request.GET.get(BEFORE_PARAM)
+        )
@@ -0,0 +1,129 @@
+"""
+Contagem das consultas SQL de um trecho de código (uma requisição, um teste).
+
+track_queries() instala um execute_wrapper em todas as conexões e acumula:
+- número de consultas e tempo total no banco;
+- duplicadas: mesma SQL com os mesmos parâmetros (resultado já conhecido);
+- repetidas: mesma SQL com parâmetros diferentes, o padrão do N+1.
+
+Usado pelo core.middleware.QueryBudgetMiddleware e pelos helpers de teste em
+core.testing. Os orçamentos por view ficam em settings.SQL_QUERY_BUDGETS.
+"""
+
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# SQL guardada por requisição para o log de requisições lentas
+MAX_CAPTURED_QUERIES = 200
+
+TRANSACTION_STATEMENTS = ("BEGIN", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK", "COMMIT")
+
+
+def get_query_budget(view_name, method=None):
+    """
+    Limite de consultas da view pelo nome da URL (ex.: "dashboard:order_list")
+    ou, com prioridade, pelo método + nome (ex.: "POST checkout:checkout")
+    """
+    if not view_name:
+        return None
+    budgets = getattr(settings, "SQL_QUERY_BUDGETS", {})
+    if method and f"{method} {view_name}" in budgets:
+        return budgets[f"{method} {view_name}"]
+    return budgets.get(view_name)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # segundos
+        self.captured = []  # (sql, segundos), até MAX_CAPTURED_QUERIES
+        self._statements = Counter()
+        self._templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            # BEGIN/SAVEPOINT se repetem por natureza; não entram como duplicadas
+            if not sql.startswith(TRANSACTION_STATEMENTS):
+                self._templates[sql] += 1
+                self._statements[(sql, repr(params))] += 1
+            if len(self.captured) < MAX_CAPTURED_QUERIES:
+                self.captured.append((sql, elapsed))
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    @property
+    def duplicates(self):
+        """Consultas idênticas (SQL e parâmetros) executadas mais de uma vez"""
+        return sum(count - 1 for count in self._statements.values())
+
+    @property
+    def repeated(self):
+        """Execuções extras da mesma SQL com parâmetros diferentes (N+1)"""
+        return sum(count - 1 for count in self._templates.values()) - self.duplicates
+
+    def most_repeated(self, limit=3):
+        """SQLs executadas mais de uma vez, das mais frequentes para as menos"""
+        return [
+            (sql, count) for sql, count in self._templates.most_common(limit) if count > 1
+        ]
+
+    def as_log_fields(self):
+        return {
+            "sql_count": self.count,
+            "sql_time_ms": round(self.duration_ms, 2),
+            "sql_duplicates": self.duplicates,
+            "sql_repeated": self.repeated,
+        }
+
+    def describe(self):
+        """Resumo legível (mensagens de erro dos testes)"""
+        lines = [
+            f"{self.count} consultas em {self.duration_ms:.1f}ms "
+            f"({self.duplicates} duplicadas, {self.repeated} repetidas)"
+        ]
+        for sql, count in self.most_repeated(5):
+            lines.append(f"  {count}x {sql[:200]}")
+        return "\n".join(lines)
+
+
+def _wrap_connections(stack, stats):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(stats))
+
+
+@contextmanager
+def track_queries():
+    """Conta as consultas feitas dentro do bloco, em todas as conexões"""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        _wrap_connections(stack, stats)
+        yield stats
+
+
+@asynccontextmanager
+async def atrack_queries():
+    """
+    Versão para código assíncrono. As conexões são por thread e o ORM
+    assíncrono consulta na thread do sync_to_async da requisição, então os
+    wrappers são instalados (e removidos) nessa mesma thread.
+    """
+    stats = QueryStats()
+    stack = ExitStack()
+    await sync_to_async(_wrap_connections)(stack, stats)
+    try:
+        yield stats
+    finally:
+        await sync_to_async(stack.close)()
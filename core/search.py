@@ -0,0 +1,51 @@
+"""
+Busca textual de pedidos e produtos.
+
+Cada modelo pesquisável guarda uma coluna `search_text` com os campos de busca
+já normalizados (utils.utils.normalize_text: sem acentos, minúsculos, sem
+pontuação). A busca normaliza os termos do usuário da mesma forma e filtra com
+`search_text LIKE '%termo%'` (um filtro por palavra):
+
+- PostgreSQL: índice GIN com pg_trgm (gin_trgm_ops) na coluna, que atende
+  LIKE com curinga no início, algo que os índices B-tree não conseguem.
+- SQLite (dev): mesma consulta, sem índice; ainda assim compara uma única
+  coluna já normalizada em vez de LOWER() em vários campos.
+
+"jose silva" encontra "José da Silva"; "98765-4321" encontra "(11) 98765-4321".
+"""
+
+from django.db.models import Q
+
+from utils.utils import normalize_text
+
+SEARCH_FIELD = "search_text"
+
+
+def build_search_text(*values):
+    """Valor da coluna search_text a partir dos campos pesquisáveis"""
+    parts = [normalize_text(str(value)) for value in values if value]
+    return " ".join(part for part in parts if part)
+
+
+def search_terms(query):
+    """Palavras da busca do usuário, normalizadas (vazias descartadas)"""
+    terms = [normalize_text(word) for word in (query or "").split()]
+    return [term for term in terms if term]
+
+
+def search_queryset(queryset, query, field=SEARCH_FIELD):
+    """Filtra o queryset exigindo todas as palavras da busca"""
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(**{f"{field}__contains": term})
+    return queryset.filter(condition)
+
+
+def matches_search(search_text, query):
+    """Mesma regra de search_queryset, para listas já em memória"""
+    return all(term in search_text for term in search_terms(query))
+
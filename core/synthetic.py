@@ -0,0 +1,233 @@
+"""
+Geração de dados sintéticos em volume (pedidos, itens e catálogo) para testes
+de escala do dashboard, da busca e da paginação.
+
+Os pedidos são gerados em lotes independentes: cada lote tem seu próprio
+gerador aleatório (semente + número do lote) e sua faixa de ids reservada, então
+o resultado é o mesmo com qualquer número de processos e em qualquer ordem de
+execução.
+
+Gravação de cada lote:
+- PostgreSQL: COPY ... FROM STDIN (CSV) para pedidos e itens.
+- Demais bancos: INSERT em lote (executemany) para os pedidos, preservando o
+  created_at gerado (o bulk_create o substituiria pelo auto_now_add), e
+  bulk_create para os itens.
+"""
+
+import csv
+import io
+import random
+from datetime import timedelta
+from decimal import ROUND_UP, Decimal
+
+from django.db import connection, transaction
+
+from checkout.models import Order, OrderItem
+
+from .search import build_search_text
+
+FIRST_NAMES = [
+    "João", "Maria", "José", "Ana", "Antônio", "Francisca", "Carlos", "Márcia",
+    "Paulo", "Adriana", "Lucas", "Juliana", "Luís", "Fernanda", "Gabriel",
+    "Patrícia", "Rafael", "Aline", "Sebastião", "Cecília",
+]
+LAST_NAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves",
+    "Pereira", "Lima", "Gomes", "Conceição", "Araújo", "Ribeiro", "Gonçalves",
+    "Magalhães",
+]
+STREETS = [
+    "Rua das Flores", "Av. Principal", "Rua do Comércio", "Alameda dos Pássaros",
+    "Rua da Paz", "Av. das Nações", "Rua Nova Esperança", "Alameda Central",
+    "Rua do Sol", "Av. da Liberdade",
+]
+NEIGHBORHOODS = [
+    "Centro", "Jardim América", "Vila Nova", "Bela Vista", "Jardim Europa",
+    "Vila Progresso", "Alto da Boa Vista", "Jardim Primavera",
+]
+
+# Marcador dos dados gerados (usado na remoção)
+SYNTHETIC_MARK = "(SINTÉTICO)"
+
+ORDER_COLUMNS = (
+    "id",
+    "customer_name",
+    "phone",
+    "cpf",
+    "address",
+    "payment_method",
+    "cash_value",
+    "payment_status",
+    "payment_id",
+    "total_amount",
+    "created_at",
+    "status",
+    "search_text",
+)
+ITEM_COLUMNS = ("order_id", "product_id", "quantity", "unit_price")
+
+# Horário de funcionamento em que os pedidos são distribuídos
+OPENING_HOUR = 7
+BUSINESS_SECONDS = 15 * 3600
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def random_phone(rng):
+    return f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+
+
+def parse_mix(value, choices):
+    """
+    Converte "pix=50,dinheiro=30,cartao=20" em ([valores], [pesos]),
+    validando contra as choices do campo
+    """
+    valid = {choice for choice, _ in choices}
+    values, weights = [], []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in valid:
+            raise ValueError(f"'{name}' inválido (opções: {', '.join(sorted(valid))})")
+        try:
+            weight = float(weight)
+        except ValueError:
+            raise ValueError(f"Peso inválido para '{name}': {weight!r}")
+        if weight < 0:
+            raise ValueError(f"Peso negativo para '{name}'")
+        values.append(name)
+        weights.append(weight)
+    if not sum(weights):
+        raise ValueError("A soma dos pesos deve ser maior que zero")
+    return values, weights
+
+
+def _cash_value(rng, total):
+    """Valor entregue em dinheiro: exato ou arredondado para cima (troco)"""
+    step = Decimal(rng.choice([1, 10, 20, 50, 100]))
+    return (total / step).quantize(Decimal("1"), rounding=ROUND_UP) * step
+
+
+def generate_chunk(index, count, first_id, config):
+    """
+    Pedidos e itens do lote `index` como tuplas (ORDER_COLUMNS, ITEM_COLUMNS).
+    Mesma semente, lote e configuração produzem exatamente as mesmas linhas.
+
+    config: seed, start (datetime local às 00:00), days, statuses,
+    status_weights, payments, payment_weights, products [(id, preço)],
+    max_items
+    """
+    rng = random.Random(f"{config['seed']}-{index}")
+    products = config["products"]
+    max_items = min(config["max_items"], len(products))
+    orders, items = [], []
+
+    for offset in range(count):
+        order_id = first_id + offset
+        status = rng.choices(config["statuses"], config["status_weights"])[0]
+        payment_method = rng.choices(config["payments"], config["payment_weights"])[0]
+        if status == "completed":
+            payment_status = "paid"
+        elif status == "cancelled":
+            payment_status = "cancelled"
+        elif payment_method != "dinheiro" and rng.random() < 0.5:
+            payment_status = "paid"
+        else:
+            payment_status = "pending"
+
+        total = Decimal("0.00")
+        for product_id, price in rng.sample(products, rng.randint(1, max_items)):
+            quantity = rng.choices((1, 2, 3, 4, 5), (50, 25, 12, 8, 5))[0]
+            total += price * quantity
+            items.append((order_id, product_id, quantity, price))
+
+        name = random_name(rng)
+        phone = random_phone(rng)
+        created_at = config["start"] + timedelta(
+            days=rng.randrange(config["days"]),
+            seconds=OPENING_HOUR * 3600 + rng.randrange(BUSINESS_SECONDS),
+        )
+        orders.append(
+            (
+                order_id,
+                name,
+                phone,
+                None,
+                f"{rng.choice(STREETS)}, {rng.randint(1, 2000)} - "
+                f"{rng.choice(NEIGHBORHOODS)} {SYNTHETIC_MARK}",
+                payment_method,
+                _cash_value(rng, total) if payment_method == "dinheiro" else None,
+                payment_status,
+                f"synthetic-{order_id}" if payment_method != "dinheiro" else None,
+                total,
+                created_at,
+                status,
+                build_search_text(name, phone),
+            )
+        )
+    return orders, items
+
+
+def _csv_value(value):
+    # None vira campo vazio sem aspas, que o COPY CSV lê como NULL
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def _insert_orders(cursor, rows):
+    ops = connection.ops
+    created_at = ORDER_COLUMNS.index("created_at")
+    decimals = [ORDER_COLUMNS.index("cash_value"), ORDER_COLUMNS.index("total_amount")]
+    adapted = []
+    for row in rows:
+        row = list(row)
+        row[created_at] = ops.adapt_datetimefield_value(row[created_at])
+        for position in decimals:
+            if row[position] is not None:
+                row[position] = ops.adapt_decimalfield_value(row[position], 10, 2)
+        adapted.append(row)
+
+    placeholders = ", ".join(["%s"] * len(ORDER_COLUMNS))
+    cursor.executemany(
+        f"INSERT INTO {Order._meta.db_table} ({', '.join(ORDER_COLUMNS)}) "
+        f"VALUES ({placeholders})",
+        adapted,
+    )
+
+
+def write_chunk(orders, items, use_copy=True):
+    """Grava um lote de pedidos e itens em uma transação"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if use_copy and connection.vendor == "postgresql":
+            _copy_rows(cursor, Order._meta.db_table, ORDER_COLUMNS, orders)
+            _copy_rows(cursor, OrderItem._meta.db_table, ITEM_COLUMNS, items)
+        else:
+            _insert_orders(cursor, orders)
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order_id=order_id,
+                        product_id=product_id,
+                        quantity=quantity,
+                        unit_price=unit_price,
+                    )
+                    for order_id, product_id, quantity, unit_price in items
+                ],
+                batch_size=2000,
+            )
@@ -0,0 +1,100 @@
+"""
+Helpers de teste para orçamentos de consultas SQL.
+
+    from core.testing import QueryBudgetMixin
+
+    class DashboardTests(QueryBudgetMixin, TestCase):
+        def test_order_list(self):
+            response = self.client.get(reverse("dashboard:order_list"))
+            self.assertWithinQueryBudget(response)   # settings.SQL_QUERY_BUDGETS
+
+        def test_order_total(self):
+            with self.assertMaxQueries(1):
+                order.calculate_total()
+
+Diferente do assertNumQueries do Django, os limites são máximos (a view pode
+ficar mais barata sem quebrar o teste) e a mensagem de erro mostra as SQLs
+repetidas, que costumam apontar o N+1.
+
+Os testes não dependem do Redis: in_memory_services() troca o cache e o
+channel layer por implementações em memória, e reset_caches() descarta o que
+ficou de um teste para o outro (inclusive o snapshot do catálogo guardado no
+processo, que só é invalidado após o commit).
+"""
+
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from .queries import get_query_budget, track_queries
+
+
+def in_memory_services():
+    """override_settings com cache e channel layer em memória"""
+    return override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+        CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    )
+
+
+def reset_caches():
+    """Limpa o cache e o snapshot do catálogo em memória do processo"""
+    from products import catalog
+
+    cache.clear()
+    catalog._local_cache.clear()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def check_query_stats(stats, limit, max_duplicates=None, label="bloco"):
+    if limit is not None and stats.count > limit:
+        raise QueryBudgetExceeded(
+            f"{label} passou do orçamento de {limit} consultas:\n{stats.describe()}"
+        )
+    if max_duplicates is not None and stats.duplicates > max_duplicates:
+        raise QueryBudgetExceeded(
+            f"{label} tem {stats.duplicates} consultas duplicadas "
+            f"(máximo {max_duplicates}):\n{stats.describe()}"
+        )
+
+
+@contextmanager
+def assert_max_queries(limit, max_duplicates=None):
+    """Falha se o bloco fizer mais de `limit` consultas (ou duplicadas demais)"""
+    with track_queries() as stats:
+        yield stats
+    check_query_stats(stats, limit, max_duplicates)
+
+
+def assert_within_query_budget(response, max_duplicates=0):
+    """
+    Confere a resposta do client de teste contra o orçamento da view em
+    settings.SQL_QUERY_BUDGETS (requer o QueryBudgetMiddleware ativo)
+    """
+    stats = getattr(response, "sql_stats", None)
+    if stats is None:
+        raise AssertionError(
+            "Resposta sem sql_stats: QueryBudgetMiddleware ativo e SQL_INSTRUMENTATION=True?"
+        )
+    view_name = response.resolver_match.view_name
+    budget = get_query_budget(view_name, response.request["REQUEST_METHOD"])
+    if budget is None:
+        raise AssertionError(f"Sem orçamento para {view_name} em SQL_QUERY_BUDGETS")
+    check_query_stats(stats, budget, max_duplicates, label=view_name)
+    return stats
+
+
+class QueryBudgetMixin:
+    """Métodos de asserção para TestCase"""
+
+    def assertMaxQueries(self, limit, max_duplicates=None):
+        return assert_max_queries(limit, max_duplicates)
+
+    def assertWithinQueryBudget(self, response, max_duplicates=0):
+        return assert_within_query_budget(response, max_duplicates)
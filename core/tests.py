@@ -1 +1,99 @@
-# Create your tests here.
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from core import cache as core_cache
+from core.pagination import CursorPaginator
+from core.testing import in_memory_services
+from products.models import Category
+
+
+class FailingCache:
+    """Cache real com as operações indicadas falhando (Redis fora do ar)"""
+
+    def __init__(self, *failing):
+        self.failing = set(failing)
+
+    def __getattr__(self, name):
+        if name in self.failing:
+
+            def fail(*args, **kwargs):
+                raise ConnectionError("Redis fora do ar")
+
+            return fail
+        return getattr(cache, name)
+
+
+@in_memory_services()
+class GetOrComputeUnavailableCacheTests(SimpleTestCase):
+    """Cache indisponível no meio do get_or_compute: o valor vem de compute()"""
+
+    def setUp(self):
+        cache.clear()
+        # Versão já lida: a falha acontece depois dela
+        core_cache.get_version("metrics")
+
+    def test_lock_failure(self):
+        with patch.object(core_cache, "cache", FailingCache("add")):
+            value = core_cache.get_or_compute("metrics", "sales", lambda: 42, 60)
+        self.assertEqual(value, 42)
+
+    def test_store_and_release_failure(self):
+        with patch.object(core_cache, "cache", FailingCache("set", "delete")):
+            value = core_cache.get_or_compute("metrics", "sales", lambda: 42, 60)
+        self.assertEqual(value, 42)
+
+    def test_wait_failure(self):
+        # Outro processo está calculando e o cache cai enquanto aguardamos
+        key = core_cache._entry_key(
+            "metrics", core_cache.get_version("metrics"), "sales"
+        )
+        cache.add(f"{key}:lock", 1)
+        with patch.object(core_cache, "cache", FailingCache("aget")):
+
+            async def compute():
+                return 42
+
+            value = async_to_sync(core_cache.aget_or_compute)(
+                "metrics", "sales", compute, 60
+            )
+        self.assertEqual(value, 42)
+
+
+class CursorPaginatorCountTests(TestCase):
+    """O total só é contado na primeira página, e só com with_count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.bulk_create(
+            [Category(name=f"Categoria {index:02d}") for index in range(25)]
+        )
+
+    def paginator(self, **kwargs):
+        return CursorPaginator(
+            Category.objects.all(), 10, ordering=("name", "id"), **kwargs
+        )
+
+    def test_count_disabled_by_default(self):
+        paginator = self.paginator()
+        with self.assertNumQueries(1):
+            paginator.get_page()
+            self.assertEqual(paginator.count_label, "")
+
+    def test_count_only_on_first_page(self):
+        paginator = self.paginator(with_count=True)
+        first = paginator.get_page()
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count_label, "25")
+
+        paginator = self.paginator(with_count=True)
+        second = paginator.get_page(after=first.next_cursor)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count_label, "")
+
+        # Voltando à primeira página pelo cursor "before"
+        paginator = self.paginator(with_count=True)
+        paginator.get_page(before=second.previous_cursor)
+        self.assertEqual(paginator.count_label, "25")
@@ -1 +1,23 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import DailySalesRollup
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "date",
+        "orders_count",
+        "effective_count",
+        "effective_revenue",
+        "revenue_pending",
+        "updated_at",
+    )
+    date_hierarchy = "date"
+    ordering = ("-date",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
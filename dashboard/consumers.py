@@ -1,11 +1,19 @@
 import json
 
-from channels.db import database_sync_to_async
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth.models import AnonymousUser
 
+from .utils.order_events import PROTOCOL_VERSION, current_seq
+
 
 class OrdersConsumer(AsyncWebsocketConsumer):
+    """
+    Envia as alterações de pedidos no protocolo delta (utils/order_events.py).
+    Ao conectar, informa a sequência atual para o cliente buscar o que perdeu
+    em /dashboard/orders/events/?since=<seq>.
+    """
+
     async def connect(self):
         # Verificar se o usuário está autenticado
         if self.scope["user"] == AnonymousUser():
@@ -19,38 +27,20 @@ class OrdersConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        seq = await sync_to_async(current_seq)()
+        await self.send(
+            text_data=json.dumps({"type": "hello", "v": PROTOCOL_VERSION, "seq": seq})
+        )
+
     async def disconnect(self, close_code):
         # Remover do grupo
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data):
         # Não precisamos processar mensagens do cliente para este caso
         pass
 
-    # Receber mensagem de atualização de pedido
-    async def order_update(self, event):
-        # Enviar mensagem para WebSocket
-        await self.send(
-            text_data=json.dumps({"type": "order_update", "data": event["data"]})
-        )
-
-    # Receber mensagem de novo pedido
-    async def new_order(self, event):
-        # Enviar mensagem para WebSocket
-        await self.send(
-            text_data=json.dumps({"type": "new_order", "data": event["data"]})
-        )
-
-    # Receber mensagem de item adicionado
-    async def order_item_added(self, event):
-        # Enviar mensagem para WebSocket
-        await self.send(
-            text_data=json.dumps({"type": "order_item_added", "data": event["data"]})
-        )
-
-    # Receber mensagem de item removido
-    async def order_item_removed(self, event):
-        # Enviar mensagem para WebSocket
-        await self.send(
-            text_data=json.dumps({"type": "order_item_removed", "data": event["data"]})
-        )
+    # Receber alteração de pedido (mensagem delta)
+    async def order_delta(self, event):
+        await self.send(text_data=json.dumps({"type": "order_delta", **event["data"]}))
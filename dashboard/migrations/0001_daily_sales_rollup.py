@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-17 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('cancelled_count', models.PositiveIntegerField(default=0)),
+                ('revenue_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_pending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue_cancelled', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('effective_count', models.PositiveIntegerField(default=0)),
+                ('effective_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pix_count', models.PositiveIntegerField(default=0)),
+                ('pix_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('dinheiro_count', models.PositiveIntegerField(default=0)),
+                ('dinheiro_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cartao_count', models.PositiveIntegerField(default=0)),
+                ('cartao_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Vendas',
+                'verbose_name_plural': 'Resumos Diários de Vendas',
+                'ordering': ['date'],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+# Cópia das agregações de dashboard.models.rollup_aggregates no momento desta
+# migração: o histórico não pode mudar se o código do rollup mudar depois
+EFFECTIVE = Q(status="completed", payment_status="paid")
+
+
+def revenue(condition):
+    return Coalesce(
+        Sum("total_amount", filter=condition),
+        Decimal("0.00"),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def rollup_aggregates():
+    aggregates = {
+        "orders_count": Count("id"),
+        "pending_count": Count("id", filter=Q(status="pending")),
+        "completed_count": Count("id", filter=Q(status="completed")),
+        "cancelled_count": Count("id", filter=Q(status="cancelled")),
+        "revenue_paid": revenue(Q(payment_status="paid")),
+        "revenue_pending": revenue(Q(payment_status="pending")),
+        "revenue_cancelled": revenue(Q(payment_status="cancelled")),
+        "effective_count": Count("id", filter=EFFECTIVE),
+        "effective_revenue": revenue(EFFECTIVE),
+    }
+    for method in ("pix", "dinheiro", "cartao"):
+        aggregates[f"{method}_count"] = Count("id", filter=Q(payment_method=method))
+        aggregates[f"{method}_revenue"] = revenue(EFFECTIVE & Q(payment_method=method))
+    return aggregates
+
+
+def rebuild_rollups(apps, schema_editor):
+    """
+    Preenche o resumo diário com o histórico de pedidos (mesma consulta do
+    comando rebuild_sales_rollup, com as agregações copiadas acima). Sem isso, as métricas dos períodos e o
+    gráfico do dashboard mostrariam apenas as vendas de hoje após o deploy.
+    """
+    Order = apps.get_model("checkout", "Order")
+    DailySalesRollup = apps.get_model("dashboard", "DailySalesRollup")
+
+    rows = (
+        Order.objects.annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(**rollup_aggregates())
+        .order_by("day")
+    )
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(date=row.pop("day"), **row) for row in rows],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_daily_sales_rollup'),
+        # total_amount já preenchido pela migração dos totais
+        ('checkout', '0003_order_total_amount_orderitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -1 +1,118 @@
-# Create your models here.
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+EFFECTIVE = Q(status="completed", payment_status="paid")
+
+
+def rollup_aggregates():
+    """
+    Agregações usadas para montar uma linha do rollup a partir dos pedidos.
+    Compartilhadas entre a atualização incremental (um dia) e o rebuild.
+    """
+    zero = Decimal("0.00")
+
+    def revenue(condition):
+        return Coalesce(
+            Sum("total_amount", filter=condition),
+            zero,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    aggregates = {
+        "orders_count": Count("id"),
+        "pending_count": Count("id", filter=Q(status="pending")),
+        "completed_count": Count("id", filter=Q(status="completed")),
+        "cancelled_count": Count("id", filter=Q(status="cancelled")),
+        "revenue_paid": revenue(Q(payment_status="paid")),
+        "revenue_pending": revenue(Q(payment_status="pending")),
+        "revenue_cancelled": revenue(Q(payment_status="cancelled")),
+        "effective_count": Count("id", filter=EFFECTIVE),
+        "effective_revenue": revenue(EFFECTIVE),
+    }
+    for method in ("pix", "dinheiro", "cartao"):
+        aggregates[f"{method}_count"] = Count("id", filter=Q(payment_method=method))
+        aggregates[f"{method}_revenue"] = revenue(EFFECTIVE & Q(payment_method=method))
+    return aggregates
+
+
+class DailySalesRollupQuerySet(models.QuerySet):
+    def last_days(self, days):
+        """Linhas dos últimos N dias (incluindo hoje), em dias do fuso local"""
+        today = timezone.localdate()
+        return self.filter(date__gt=today - timedelta(days=days), date__lte=today)
+
+    def before_today(self):
+        return self.filter(date__lt=timezone.localdate())
+
+
+class DailySalesRollup(models.Model):
+    """
+    Totais de pedidos por dia (fuso local), mantidos a cada alteração de pedido
+    e reconstruíveis com o comando rebuild_sales_rollup.
+
+    As receitas por método de pagamento consideram apenas pedidos efetivos
+    (concluídos e pagos).
+    """
+
+    date = models.DateField(unique=True)
+    orders_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    revenue_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_pending = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_cancelled = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    effective_count = models.PositiveIntegerField(default=0)
+    effective_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pix_count = models.PositiveIntegerField(default=0)
+    pix_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    dinheiro_count = models.PositiveIntegerField(default=0)
+    dinheiro_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cartao_count = models.PositiveIntegerField(default=0)
+    cartao_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DailySalesRollupQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Resumo Diário de Vendas"
+        verbose_name_plural = "Resumos Diários de Vendas"
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date:%d/%m/%Y} - {self.orders_count} pedidos"
+
+    @staticmethod
+    def day_bounds(day):
+        """Início e fim (aware) de um dia no fuso local"""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, start + timedelta(days=1)
+
+    @classmethod
+    def refresh_day(cls, day):
+        """
+        Recalcula a linha de um dia a partir dos pedidos daquele dia.
+        Usa o índice de created_at, então o custo depende só do volume do dia.
+        """
+        from checkout.models import Order
+        from dashboard.utils.metrics import invalidate_metrics_cache
+
+        start, end = cls.day_bounds(day)
+        values = Order.objects.filter(
+            created_at__gte=start, created_at__lt=end
+        ).aggregate(**rollup_aggregates())
+
+        if not values["orders_count"]:
+            cls.objects.filter(date=day).delete()
+            rollup = None
+        else:
+            rollup, _ = cls.objects.update_or_create(date=day, defaults=values)
+
+        # Seções de métricas calculadas antes deste recálculo ficam obsoletas
+        invalidate_metrics_cache()
+        return rollup
@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from checkout.models import Order, OrderItem, in_bulk_order_changes
+
+from .models import DailySalesRollup
+
+# Colunas do pedido que entram no resumo diário
+ROLLUP_FIELDS = {"status", "payment_status", "payment_method", "total_amount", "created_at"}
+
+
+def schedule_rollup_refresh(order):
+    """
+    Agenda o recálculo do dia do pedido para depois do commit, para que o
+    rollup reflita apenas dados efetivamente gravados
+    """
+    if not order.created_at:
+        return
+    day = timezone.localdate(order.created_at)
+    transaction.on_commit(partial(DailySalesRollup.refresh_day, day))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, update_fields=None, **kwargs):
+    # Saves parciais que não tocam no resumo (ex.: dados do pagamento) não
+    # recalculam o dia
+    if update_fields is not None and not ROLLUP_FIELDS & set(update_fields):
+        return
+    schedule_rollup_refresh(instance)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    # Alterações de itens mudam o total do pedido (Order.update_total). Em
+    # lote, o save final do pedido já agenda o recálculo
+    if in_bulk_order_changes():
+        return
+    schedule_rollup_refresh(instance.order)
@@ -1 +1,193 @@
-# Create your tests here.
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from checkout.models import Order
+from core.testing import QueryBudgetMixin, in_memory_services, reset_caches
+from products.models import Category, Product
+
+from .utils import order_events
+from .utils.order_events import record_order_event
+
+
+def create_products(count):
+    return Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Produto {index}",
+                price=Decimal("9.90") + index,
+                image="products/teste.jpg",
+            )
+            for index in range(count)
+        ]
+    )
+
+
+def create_order(products, index=0):
+    return Order.objects.create_with_items(
+        [(product, 1 + index % 3) for product in products],
+        customer_name=f"Cliente {index}",
+        phone=f"1199999{index:04d}",
+        address="Rua Teste, 1",
+        payment_method="dinheiro",
+    )
+
+
+@in_memory_services()
+class OrderListQueriesTests(TestCase):
+    """A lista de pedidos não pode fazer consultas por pedido ou por item (N+1)"""
+
+    def setUp(self):
+        reset_caches()
+        user = get_user_model().objects.create_user("admin", password="senha")
+        self.client.force_login(user)
+
+    def count_queries(self):
+        reset_caches()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("dashboard:order_list"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_orders_and_items(self):
+        create_order(create_products(1))
+        response, single = self.count_queries()
+        self.assertEqual(len(response.context["orders"]), 1)
+
+        products = create_products(5)
+        for index in range(1, 8):
+            create_order(products, index)
+        response, many = self.count_queries()
+        self.assertEqual(len(response.context["orders"]), 8)
+
+        self.assertEqual(single, many)
+
+
+@in_memory_services()
+class DashboardQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """As páginas do dashboard ficam dentro de SQL_QUERY_BUDGETS"""
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(
+            [Category(name=f"Categoria {index}") for index in range(3)]
+        )
+        products = create_products(6)
+        for index, product in enumerate(products):
+            product.category = categories[index % 3]
+        Product.objects.bulk_update(products, ["category"])
+        cls.orders = [
+            create_order(products[: 1 + index % 6], index) for index in range(12)
+        ]
+        cls.user = get_user_model().objects.create_user("admin", password="senha")
+
+    def setUp(self):
+        reset_caches()
+        self.client.force_login(self.user)
+
+    def assertPageWithinBudget(self, name, *args):
+        response = self.client.get(reverse(name, args=args))
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_dashboard(self):
+        self.assertPageWithinBudget("dashboard:dashboard")
+
+    def test_order_list(self):
+        self.assertPageWithinBudget("dashboard:order_list")
+
+    def test_order_detail(self):
+        self.assertPageWithinBudget("dashboard:order_detail", self.orders[-1].pk)
+
+    def test_order_edit(self):
+        self.assertPageWithinBudget("dashboard:order_edit", self.orders[-1].pk)
+
+    def test_order_fragment(self):
+        self.assertPageWithinBudget("dashboard:order_fragment", self.orders[-1].pk)
+
+    def test_order_create(self):
+        self.assertPageWithinBudget("dashboard:order_create")
+
+    def test_product_list(self):
+        self.assertPageWithinBudget("dashboard:product_list")
+
+    def test_category_list(self):
+        self.assertPageWithinBudget("dashboard:category_list")
+
+
+@in_memory_services()
+class OrderEventsTests(TestCase):
+    """Sequência das mensagens delta e resync de clientes reconectados"""
+
+    def setUp(self):
+        reset_caches()
+        user = get_user_model().objects.create_user("admin", password="senha")
+        self.client.force_login(user)
+
+    def record_events(self):
+        data = {"status": "pending", "payment_status": "pending", "total": "10.00"}
+        return [
+            record_order_event(7, "new_order", data),
+            record_order_event(7, "order_update", {**data, "status": "completed"}),
+            record_order_event(8, "new_order", data),
+            record_order_event(7, "order_deleted", None),
+        ]
+
+    def get_events(self, since):
+        response = self.client.get(reverse("dashboard:order_events"), {"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_seq_numbering(self):
+        created, updated, other, deleted = self.record_events()
+
+        self.assertEqual(
+            [created["seq"], updated["seq"], other["seq"], deleted["seq"]], [1, 2, 3, 4]
+        )
+        self.assertEqual(created["op"], "create")
+        self.assertEqual(created["changes"]["total"], "10.00")
+        # Só o que mudou desde a última mensagem do pedido
+        self.assertEqual(updated["op"], "update")
+        self.assertEqual(updated["changes"], {"status": "completed"})
+        self.assertEqual(deleted["op"], "delete")
+        self.assertEqual(order_events.current_seq(), 4)
+
+    def test_unchanged_order_does_not_consume_seq(self):
+        data = {"status": "pending"}
+        record_order_event(7, "new_order", data)
+        self.assertIsNone(record_order_event(7, "order_update", data))
+        self.assertEqual(order_events.current_seq(), 1)
+
+    def test_resync_from_old_seq(self):
+        events = self.record_events()
+
+        payload = self.get_events(since=2)
+        self.assertEqual(payload["seq"], 4)
+        self.assertFalse(payload["reset"])
+        self.assertEqual(payload["events"], events[2:])
+
+        payload = self.get_events(since=4)
+        self.assertFalse(payload["reset"])
+        self.assertEqual(payload["events"], [])
+
+    def test_resync_after_history_expired(self):
+        self.record_events()
+        cache.delete(order_events._event_key(3))
+
+        payload = self.get_events(since=1)
+        self.assertTrue(payload["reset"])
+        self.assertEqual(payload["events"], [])
+        self.assertEqual(payload["seq"], 4)
+
+    def test_resync_too_far_behind(self):
+        self.record_events()
+        cache.set(
+            order_events._SEQ_KEY, order_events.MAX_RESYNC_EVENTS + 10, timeout=None
+        )
+
+        self.assertTrue(self.get_events(since=1)["reset"])
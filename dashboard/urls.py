@@ -25,6 +25,8 @@ urlpatterns = [
     # Order URLs
     path("orders/", views.order_list, name="order_list"),
     path("orders/create/", views.order_create, name="order_create"),
+    path("orders/events/", views.order_events, name="order_events"),
+    path("orders/<int:pk>/fragment/", views.order_fragment, name="order_fragment"),
     path("orders/<int:pk>/", views.order_detail, name="order_detail"),
     path("orders/<int:pk>/edit/", views.order_edit, name="order_edit"),
     path("orders/<int:pk>/cancel/", views.order_cancel, name="order_cancel"),
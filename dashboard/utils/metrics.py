@@ -1,128 +1,196 @@
 from datetime import timedelta
 
-from django.utils.timezone import now
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import localdate, now
 
 from checkout.models import Order
+from core.cache import bump_version, get_or_compute, get_timeout
+from dashboard.models import DailySalesRollup
 from products.models import Product
 
+METRICS_CACHE_NAMESPACE = "dashboard_metrics"
+
 
 def get_date_labels(days):
     """
     Gera labels de datas para gráficos
     Formato: ['01/09', '02/09', '03/09', ...]
     """
+    today = localdate()
     labels = []
     for i in range(days):
-        target_date = (now() - timedelta(days=days - 1 - i)).date()
+        target_date = today - timedelta(days=days - 1 - i)
         labels.append(target_date.strftime("%d/%m"))
     return labels
 
 
-# Função para calcular todas as métricas
-def calculate_metrics():
-    """
-    Calcula todas as métricas do dashboard
+def invalidate_metrics_cache():
+    """Invalida todas as seções de métricas (chamado quando pedidos mudam)"""
+    bump_version(METRICS_CACHE_NAMESPACE)
 
-    CORREÇÕES APLICADAS:
-    - revenue_today agora exclui receitas canceladas
-    - Gráficos usam queryset base para evitar dupla filtragem
-    - Performance otimizada com agregações do Django
-    - Otimizado com uma única query usando aggregações condicionais
-    """
-    from django.db.models import Count, F, Q, Sum
 
-    # ===== MÉTRICAS DO DIA COM OTIMIZAÇÃO =====
-    orders_today = Order.objects.today()
+def _effective_today():
+    """Vendas e receita efetivas (concluídas + pagas) do dia, ao vivo"""
+    effective = Order.objects.today().effective().aggregate(
+        count=Count("id"), revenue=Sum("total_amount")
+    )
+    return effective["count"] or 0, float(effective["revenue"] or 0)
+
 
-    # Uma única query com agregações condicionais para métricas do dia
-    today_metrics = orders_today.aggregate(
+def today_metrics():
+    """Métricas do dia em uma única query com agregações condicionais"""
+    metrics = Order.objects.today().aggregate(
         total_count=Count('id'),
         pending_count=Count('id', filter=Q(status='pending')),
         completed_count=Count('id', filter=Q(status='completed')),
         cancelled_count=Count('id', filter=Q(status='cancelled')),
         late_count=Count('id', filter=Q(status='pending', created_at__lt=now() - timedelta(minutes=25))),
-        revenue_paid=Sum(F('items__quantity') * F('items__product__price'), filter=Q(payment_status='paid')),
-        revenue_pending=Sum(F('items__quantity') * F('items__product__price'), filter=Q(payment_status='pending')),
-        revenue_cancelled=Sum(F('items__quantity') * F('items__product__price'), filter=Q(payment_status='cancelled')),
+        revenue_paid=Sum('total_amount', filter=Q(payment_status='paid')),
+        revenue_pending=Sum('total_amount', filter=Q(payment_status='pending')),
+        revenue_cancelled=Sum('total_amount', filter=Q(payment_status='cancelled')),
     )
 
-    # Extrair valores da agregação
-    orders_today_count = today_metrics['total_count'] or 0
-    orders_pending_today = today_metrics['pending_count'] or 0
-    orders_completed_today = today_metrics['completed_count'] or 0
-    orders_cancelled_today = today_metrics['cancelled_count'] or 0
-    orders_late_today = today_metrics['late_count'] or 0
+    revenue_paid_today = float(metrics['revenue_paid'] or 0)
+    revenue_pending_today = float(metrics['revenue_pending'] or 0)
 
-    revenue_paid_today = float(today_metrics['revenue_paid'] or 0)
-    revenue_pending_today = float(today_metrics['revenue_pending'] or 0)
-    revenue_cancelled_today = float(today_metrics['revenue_cancelled'] or 0)
-    # CORREÇÃO: Receita real do dia não deve incluir cancelamentos
-    revenue_today = revenue_paid_today + revenue_pending_today
+    return {
+        "orders_today": metrics['total_count'] or 0,
+        "orders_pending_today": metrics['pending_count'] or 0,
+        "orders_completed_today": metrics['completed_count'] or 0,
+        "orders_cancelled_today": metrics['cancelled_count'] or 0,
+        "orders_late_today": metrics['late_count'] or 0,
+        # CORREÇÃO: Receita real do dia não deve incluir cancelamentos
+        "revenue_today": revenue_paid_today + revenue_pending_today,
+        "revenue_paid_today": revenue_paid_today,
+        "revenue_pending_today": revenue_pending_today,
+        "revenue_cancelled_today": float(metrics['revenue_cancelled'] or 0),
+        # Pedidos atrasados (globais)
+        "late_orders_count": Order.objects.late().count(),
+    }
 
-    # ===== MÉTRICAS GERAIS =====
-    total_products = Product.objects.count()
-    total_active_products = Product.objects.filter(is_active=True).count()
-    total_inactive_products = Product.objects.filter(is_active=False).count()
 
-    # Pedidos efetivos (apenas os que geram receita real)
-    effective_orders = Order.objects.effective()
-    total_effective_sales = effective_orders.count()
-    total_effective_revenue = effective_orders.total_revenue()
+def period_metrics(days, effective_today=_effective_today):
+    """
+    Vendas efetivas dos últimos N dias (incluindo hoje): no máximo N-1 linhas
+    do resumo diário + a fatia de hoje ao vivo
+    """
+    today = localdate()
+    rollups = {
+        rollup.date: rollup
+        for rollup in DailySalesRollup.objects.last_days(days).before_today()
+    }
+    sales_today, revenue_today = effective_today()
 
-    effective_orders_last_7_days = Order.objects.effective().last_days(7)
-    effective_orders_last_30_days = Order.objects.effective().last_days(30)
+    daily_sales = []
+    daily_revenue = []
+    for i in range(days):
+        target_date = today - timedelta(days=days - 1 - i)
+        if target_date == today:
+            daily_sales.append(sales_today)
+            daily_revenue.append(revenue_today)
+        elif target_date in rollups:
+            daily_sales.append(rollups[target_date].effective_count)
+            daily_revenue.append(float(rollups[target_date].effective_revenue))
+        else:
+            daily_sales.append(0)
+            daily_revenue.append(0.0)
 
-    # Vendas efetivas dos últimos períodos
-    effective_sales_last_7_days = effective_orders_last_7_days.count()
-    effective_revenue_last_7_days = effective_orders_last_7_days.total_revenue()
+    return {
+        f"effective_sales_last_{days}_days": sum(daily_sales),
+        f"effective_revenue_last_{days}_days": sum(daily_revenue),
+        f"effective_revenue_chart_{days}_days": daily_revenue,
+    }
 
-    effective_sales_last_30_days = effective_orders_last_30_days.count()
-    effective_revenue_last_30_days = effective_orders_last_30_days.total_revenue()
 
-    # Pedidos atrasados (globais)
-    late_orders_count = Order.objects.late().count()
+def all_time_metrics(effective_today=_effective_today):
+    """Pedidos efetivos de todo o histórico: resumo diário + hoje ao vivo"""
+    history = DailySalesRollup.objects.before_today().aggregate(
+        sales=Sum('effective_count'),
+        revenue=Sum('effective_revenue'),
+    )
+    sales_today, revenue_today = effective_today()
 
-    # ===== DADOS PARA GRÁFICOS =====
-    # CORREÇÃO: Usar queryset base para gráficos, não o já filtrado
-    # Receita efetiva diária dos últimos 7 dias para gráfico
-    effective_revenue_chart_7_days = Order.objects.effective().daily_revenue_last_days(
-        7
+    return {
+        "total_effective_sales": (history['sales'] or 0) + sales_today,
+        "total_effective_revenue": float(history['revenue'] or 0) + revenue_today,
+    }
+
+
+def product_metrics():
+    products = Product.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
     )
+    return {
+        "total_products": products['total'],
+        "total_active_products": products['active'],
+        "total_inactive_products": products['total'] - products['active'],
+    }
+
+
+def cache_once(compute):
+    """Executa compute() uma única vez e reaproveita o resultado"""
+    result = []
+
+    def wrapper():
+        if not result:
+            result.append(compute())
+        return result[0]
+
+    return wrapper
+
+
+def _cached(name, compute, timeout_name):
+    # A data entra na chave para que a virada do dia não sirva números de ontem
+    return get_or_compute(
+        METRICS_CACHE_NAMESPACE,
+        f"{name}:{localdate().isoformat()}",
+        compute,
+        get_timeout(timeout_name),
+    )
+
+
+# Função para calcular todas as métricas
+def calculate_metrics():
+    """
+    Calcula todas as métricas do dashboard
+
+    CORREÇÕES APLICADAS:
+    - revenue_today agora exclui receitas canceladas
+    - Gráficos usam queryset base para evitar dupla filtragem
+    - Performance otimizada com agregações do Django
+    - Otimizado com uma única query usando aggregações condicionais
+    - Histórico lido do resumo diário (DailySalesRollup) + fatia de hoje ao vivo,
+      então o custo não cresce com o volume de pedidos
+    - Seções em cache (CACHE_TIMEOUTS), invalidadas quando pedidos mudam
+    """
+    metrics = {}
+    # A fatia de hoje é compartilhada pelas seções que estiverem fora do cache
+    effective_today = cache_once(_effective_today)
 
-    # Receita efetiva diária dos últimos 30 dias para gráfico
-    effective_revenue_chart_30_days = Order.objects.effective().daily_revenue_last_days(
-        30
+    # ===== MÉTRICAS DO DIA =====
+    metrics.update(_cached("today", today_metrics, "dashboard_daily"))
+
+    # ===== MÉTRICAS GERAIS =====
+    # Contagem de produtos é uma query simples e muda fora dos pedidos
+    metrics.update(product_metrics())
+    metrics.update(
+        _cached("all_time", lambda: all_time_metrics(effective_today), "dashboard_weekly")
+    )
+    metrics.update(
+        _cached(
+            "last_7_days", lambda: period_metrics(7, effective_today), "dashboard_weekly"
+        )
+    )
+    metrics.update(
+        _cached(
+            "last_30_days", lambda: period_metrics(30, effective_today), "dashboard_weekly"
+        )
     )
 
+    # ===== DADOS PARA GRÁFICOS =====
     # Labels de datas para os gráficos
-    chart_labels_7_days = get_date_labels(7)
-    chart_labels_30_days = get_date_labels(30)
+    metrics["chart_labels_7_days"] = get_date_labels(7)
+    metrics["chart_labels_30_days"] = get_date_labels(30)
 
-    return {
-        # ===== MÉTRICAS DO DIA =====
-        "orders_today": orders_today_count,
-        "orders_pending_today": orders_pending_today,
-        "orders_completed_today": orders_completed_today,
-        "orders_cancelled_today": orders_cancelled_today,
-        "orders_late_today": orders_late_today,
-        "revenue_today": revenue_today,
-        "revenue_paid_today": revenue_paid_today,
-        "revenue_pending_today": revenue_pending_today,
-        "revenue_cancelled_today": revenue_cancelled_today,
-        # ===== MÉTRICAS GERAIS =====
-        "total_products": total_products,
-        "total_active_products": total_active_products,
-        "total_inactive_products": total_inactive_products,
-        "total_effective_sales": total_effective_sales,
-        "total_effective_revenue": total_effective_revenue,
-        "effective_sales_last_7_days": effective_sales_last_7_days,
-        "effective_revenue_last_7_days": effective_revenue_last_7_days,
-        "effective_sales_last_30_days": effective_sales_last_30_days,
-        "effective_revenue_last_30_days": effective_revenue_last_30_days,
-        "late_orders_count": late_orders_count,
-        # ===== DADOS PARA GRÁFICOS =====
-        "effective_revenue_chart_7_days": effective_revenue_chart_7_days,
-        "effective_revenue_chart_30_days": effective_revenue_chart_30_days,
-        "chart_labels_7_days": chart_labels_7_days,
-        "chart_labels_30_days": chart_labels_30_days,
-    }
+    return metrics
@@ -0,0 +1,136 @@
+"""
+Protocolo de eventos da lista de pedidos do dashboard (OrdersConsumer).
+
+Cada alteração de pedido vira uma mensagem versionada e numerada:
+
+    {"v": 1, "seq": 42, "op": "update", "order_id": 7,
+     "event": "order_update", "changes": {"status": "completed"}}
+
+- op: "create", "update" ou "delete"
+- changes: apenas os campos que mudaram desde a última mensagem do pedido
+  (o último estado publicado de cada pedido fica no cache)
+- seq: sequência global; as mensagens ficam no cache por
+  CACHE_TIMEOUTS["order_events"] para que clientes reconectando busquem o que
+  perderam (events_since) em vez de recarregar a página.
+"""
+
+import logging
+
+from django.core.cache import cache
+
+from core.cache import get_timeout
+
+logger = logging.getLogger("app.cache")
+
+PROTOCOL_VERSION = 1
+ORDER_EVENTS_NAMESPACE = "order_events"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24  # 24h
+MAX_RESYNC_EVENTS = 500
+
+_SEQ_KEY = f"{ORDER_EVENTS_NAMESPACE}:seq"
+
+
+def _event_key(seq):
+    return f"{ORDER_EVENTS_NAMESPACE}:event:{seq}"
+
+
+def _snapshot_key(order_id):
+    return f"{ORDER_EVENTS_NAMESPACE}:snapshot:{order_id}"
+
+
+def current_seq():
+    """Último número de sequência publicado (0 se nenhum)"""
+    try:
+        return cache.get(_SEQ_KEY) or 0
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao ler sequência de eventos: {e}")
+        return 0
+
+
+def _next_seq():
+    try:
+        return cache.incr(_SEQ_KEY)
+    except ValueError:
+        # Chave ainda não existe
+        cache.add(_SEQ_KEY, 0, timeout=None)
+        return cache.incr(_SEQ_KEY)
+
+
+def diff_changes(previous, data):
+    """Campos de `data` diferentes do último estado publicado"""
+    if previous is None:
+        return dict(data)
+    return {key: value for key, value in data.items() if previous.get(key) != value}
+
+
+def record_order_event(order_id, event_type, data):
+    """
+    Monta a mensagem delta do pedido e a grava no log de eventos.
+    `data` é o payload completo do pedido, ou None quando foi removido.
+    Retorna None quando nada mudou desde a última mensagem.
+    """
+    if data is None:
+        op, changes = "delete", {}
+    else:
+        op = "create" if event_type == "new_order" else "update"
+        changes = None
+
+    try:
+        if data is None:
+            cache.delete(_snapshot_key(order_id))
+        else:
+            changes = diff_changes(cache.get(_snapshot_key(order_id)), data)
+            if not changes:
+                return None
+            cache.set(_snapshot_key(order_id), data, timeout=SNAPSHOT_TIMEOUT)
+
+        message = {
+            "v": PROTOCOL_VERSION,
+            "seq": _next_seq(),
+            "op": op,
+            "order_id": order_id,
+            "event": event_type,
+            "changes": changes,
+        }
+        cache.set(
+            _event_key(message["seq"]),
+            message,
+            timeout=get_timeout("order_events", 3600),
+        )
+        return message
+    except Exception as e:
+        # Sem cache a mensagem segue completa e sem sequência
+        logger.warning(f"Cache indisponível ao registrar evento do pedido: {e}")
+        return {
+            "v": PROTOCOL_VERSION,
+            "seq": None,
+            "op": op,
+            "order_id": order_id,
+            "event": event_type,
+            "changes": data or {},
+        }
+
+
+def events_since(since):
+    """
+    Mensagens com seq maior que `since`, em ordem. Retorna (eventos, seq
+    atual), com eventos = None quando o histórico não cobre o intervalo e o
+    cliente precisa recarregar a lista.
+    """
+    seq = current_seq()
+    if since >= seq:
+        return [], seq
+    if seq - since > MAX_RESYNC_EVENTS:
+        return None, seq
+
+    keys = [_event_key(n) for n in range(since + 1, seq + 1)]
+    try:
+        found = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Cache indisponível ao ler eventos: {e}")
+        return None, seq
+
+    if len(found) != len(keys):
+        # Parte do intervalo já expirou
+        return None, seq
+    return [found[key] for key in keys], seq
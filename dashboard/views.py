@@ -1,13 +1,18 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import models, transaction
+from django.db import transaction
+from django.db.models import Count
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods, require_POST
 
-from checkout.models import Order, OrderItem
+from checkout.models import Order, bulk_order_changes
+from core.pagination import CursorPaginator
 from products.models import Category, Product
 
 from .utils.metrics import calculate_metrics
+from .utils.order_events import PROTOCOL_VERSION, current_seq, events_since
 
 
 # Login view
@@ -53,22 +58,18 @@ def product_list(request):
     if category_filter:
         products = products.filter(category_id=category_filter)
 
-    # Filter by search query
+    # Filter by search query (sem acentos, índice trigram no PostgreSQL)
     if search_query:
-        products = products.filter(name__icontains=search_query)
-
-    # Order by most recent
-    products = products.order_by("-created_at")
+        products = products.search(search_query)
 
     # Get all categories for filter dropdown
     categories = Category.objects.all().order_by("name")
 
-    # Paginação
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(products, 9)  # 9 produtos por página
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Paginação por cursor, dos mais recentes para os mais antigos
+    paginator = CursorPaginator(
+        products.select_related("category"), 9, with_count=True  # 9 produtos por página
+    )
+    page_obj = paginator.get_page_from_request(request)
 
     return render(
         request,
@@ -143,15 +144,38 @@ def logout_view(request):
 
 
 # Order CRUD views
+def get_order_lines(request):
+    """
+    Lê os pares product_id/quantity do formulário e busca todos os produtos
+    em uma única query. Retorna lista de tuplas (product, quantity).
+    """
+    lines = []
+    product_ids = request.POST.getlist("product_id")
+    quantities = request.POST.getlist("quantity")
+    for product_id, quantity in zip(product_ids, quantities, strict=False):
+        if product_id and quantity and int(quantity) > 0:
+            lines.append((int(product_id), int(quantity)))
+
+    products = Product.objects.in_bulk([product_id for product_id, _ in lines])
+    return [
+        (products[product_id], quantity)
+        for product_id, quantity in lines
+        if product_id in products
+    ]
+
+
 @login_required
 def order_list(request):
+    # Sequência lida antes da consulta: eventos posteriores chegam pelo WebSocket
+    orders_seq = current_seq()
+
     # Get filter parameters from the request
     status_filter = request.GET.get("status")
     payment_status_filter = request.GET.get("payment_status")
     search_query = request.GET.get("search", "")
 
-    # Start with optimized queryset using select_related
-    orders = Order.objects.select_related().prefetch_related("items__product")
+    # Apenas as colunas exibidas, com totais dos itens anotados no banco
+    orders = Order.objects.for_list()
 
     # Filter orders based on the status
     if status_filter == "pending":
@@ -177,22 +201,13 @@ def order_list(request):
     elif payment_status_filter == "cancelled":
         orders = orders.filter(payment_status="cancelled")
 
-    # Filter by search query (customer name or phone)
+    # Filter by search query (customer name or phone, sem acentos)
     if search_query:
-        orders = orders.filter(
-            models.Q(customer_name__icontains=search_query)
-            | models.Q(phone__icontains=search_query)
-        )
-
-    # Order by most recent
-    orders = orders.order_by("-created_at")
+        orders = orders.search(search_query)
 
-    # Paginação
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(orders, 10)  # 10 pedidos por página
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Paginação por cursor, dos mais recentes para os mais antigos
+    paginator = CursorPaginator(orders, 10, with_count=True)  # 10 pedidos por página
+    page_obj = paginator.get_page_from_request(request)
 
     return render(
         request,
@@ -204,13 +219,53 @@ def order_list(request):
             "search_query": search_query,
             "page_obj": page_obj,
             "is_paginated": page_obj.has_other_pages(),
+            "orders_seq": orders_seq,
         },
     )
 
 
+@login_required
+def order_events(request):
+    """
+    Eventos da lista de pedidos posteriores a ?since=<seq>, para o cliente
+    reconectado se atualizar sem recarregar a página. "reset" indica que o
+    histórico não cobre o intervalo e a lista precisa ser recarregada.
+    """
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        since = 0
+
+    events, seq = events_since(since)
+    return JsonResponse(
+        {
+            "v": PROTOCOL_VERSION,
+            "seq": seq,
+            "reset": events is None,
+            "events": events or [],
+        }
+    )
+
+
+@login_required
+def order_fragment(request, pk):
+    """Linha da tabela e card de um pedido, para inserir/atualizar na lista"""
+    order = get_object_or_404(Order.objects.for_list(), pk=pk)
+    context = {"order": order}
+    return JsonResponse(
+        {
+            "order_id": order.pk,
+            "row": render_to_string("dashboard/partials/order_row.html", context, request),
+            "card": render_to_string("dashboard/partials/order_card.html", context, request),
+        }
+    )
+
+
 @login_required
 def order_detail(request, pk):
-    order = get_object_or_404(Order, pk=pk)
+    order = get_object_or_404(
+        Order.objects.prefetch_related("items__product"), pk=pk
+    )
     return render(request, "dashboard/order_detail.html", {"order": order})
 
 
@@ -222,23 +277,14 @@ def order_create(request):
         address = request.POST.get("address")
         status = request.POST.get("status", "pending")
 
-        # Get product IDs and quantities from the form
-        product_ids = request.POST.getlist("product_id")
-        quantities = request.POST.getlist("quantity")
-
-        # Create order with items in a transaction
-        with transaction.atomic():
-            order = Order.objects.create(
-                customer_name=customer_name, phone=phone, address=address, status=status
-            )
-
-            # Create order items
-            for product_id, quantity in zip(product_ids, quantities, strict=False):
-                if product_id and quantity and int(quantity) > 0:
-                    product = Product.objects.get(pk=product_id)
-                    OrderItem.objects.create(
-                        order=order, product=product, quantity=int(quantity)
-                    )
+        # Create order with items in a single transaction (bulk insert)
+        Order.objects.create_with_items(
+            get_order_lines(request),
+            customer_name=customer_name,
+            phone=phone,
+            address=address,
+            status=status,
+        )
 
         return redirect("dashboard:order_list")
 
@@ -264,24 +310,12 @@ def order_edit(request, pk):
 
         # Só permitir edição de itens se can_edit_items for True
         if order.can_edit_items:
-            # Get product IDs and quantities from the form
-            product_ids = request.POST.getlist("product_id")
-            quantities = request.POST.getlist("quantity")
+            lines = get_order_lines(request)
 
-            # Update order and items in a transaction
-            with transaction.atomic():
+            # Update order and items in a transaction, publishing a single event
+            with transaction.atomic(), bulk_order_changes():
                 order.save()
-
-                # Delete existing items and create new ones
-                order.items.all().delete()
-
-                # Create new order items
-                for product_id, quantity in zip(product_ids, quantities, strict=False):
-                    if product_id and quantity and int(quantity) > 0:
-                        product = Product.objects.get(pk=product_id)
-                        OrderItem.objects.create(
-                            order=order, product=product, quantity=int(quantity)
-                        )
+                order.set_items(lines)
         else:
             # Se não pode editar itens, apenas salva as informações básicas
             order.save()
@@ -292,7 +326,7 @@ def order_edit(request, pk):
     products = Product.objects.filter(is_active=True)
 
     # Prepare products with order information
-    order_items = {item.product.id: item for item in order.items.all()}
+    order_items = {item.product_id: item for item in order.items.all()}
     products_with_order_info = []
     for product in products:
         product_info = {
@@ -402,22 +436,18 @@ def category_list(request):
     # Get filter parameters from the request
     search_query = request.GET.get("search", "")
 
-    # Get all categories
-    categories = Category.objects.all()
+    # Categorias com a contagem de produtos (uma query para a página toda)
+    categories = Category.objects.annotate(products_count=Count("products"))
 
     # Filter by search query
     if search_query:
         categories = categories.filter(name__icontains=search_query)
 
-    # Order by name
-    categories = categories.order_by("name")
-
-    # Paginação
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(categories, 10)  # 10 categorias por página
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Paginação por cursor em ordem alfabética (name é único e indexado)
+    paginator = CursorPaginator(
+        categories, 10, ordering=("name", "id"), with_count=True
+    )
+    page_obj = paginator.get_page_from_request(request)
 
     return render(
         request,
@@ -0,0 +1,138 @@
+"""
+Snapshot do catálogo da loja (produtos ativos e categorias).
+
+O catálogo muda pouco e é lido a cada página da loja, então ele é serializado
+uma vez e reaproveitado:
+
+- Redis (core.cache.get_or_compute), no namespace versionado "catalog", com
+  os TTLs CACHE_TIMEOUTS["products"] e CACHE_TIMEOUTS["categories"].
+- Memória do processo (LocalLRUCache), por versão: dentro do TTL uma página
+  da loja custa apenas a leitura da versão no Redis.
+
+Qualquer save/delete de Product ou Category incrementa a versão após o commit
+(products.signals), e todos os processos passam a montar o snapshot novo.
+Filtros (busca e categoria) e paginação são feitos em memória.
+"""
+
+from decimal import Decimal
+
+from core.cache import (
+    LocalLRUCache,
+    bump_version,
+    get_or_compute,
+    get_timeout,
+    get_version,
+)
+from core.search import matches_search
+
+from .models import Category, Product
+
+CATALOG_NAMESPACE = "catalog"
+
+_local_cache = LocalLRUCache(maxsize=8)
+
+
+def invalidate_catalog():
+    """Invalida o snapshot (chamado quando produtos ou categorias mudam)"""
+    bump_version(CATALOG_NAMESPACE)
+
+
+def _image_url(product):
+    try:
+        return product.image.url if product.image else ""
+    except Exception:
+        return ""
+
+
+def build_products():
+    """Produtos ativos serializados, dos mais recentes para os mais antigos"""
+    products = (
+        Product.objects.filter(is_active=True)
+        .select_related("category")
+        .order_by("-created_at", "-id")
+    )
+    return [
+        {
+            "id": product.id,
+            "name": product.name,
+            "description": product.description,
+            "price": str(product.price),
+            "image_url": _image_url(product),
+            "category_id": product.category_id,
+            "category_name": product.category.name if product.category else "",
+            "search_text": product.search_text,
+            "created_at": product.created_at.isoformat(),
+        }
+        for product in products
+    ]
+
+
+def build_categories():
+    return [
+        {"id": category.id, "name": category.name}
+        for category in Category.objects.order_by("name")
+    ]
+
+
+class CatalogSnapshot:
+    """Produtos e categorias de uma versão do catálogo, com índice por id"""
+
+    def __init__(self, products, categories):
+        self.products = products
+        self.categories = categories
+        self._by_id = {product["id"]: product for product in products}
+
+    def get_product(self, product_id):
+        """Produto ativo pelo id (None se não existe ou está inativo)"""
+        try:
+            return self._by_id.get(int(product_id))
+        except (TypeError, ValueError):
+            return None
+
+    def price(self, product_id):
+        product = self.get_product(product_id)
+        return Decimal(product["price"]) if product else None
+
+    def filter(self, search=None, category=None):
+        products = self.products
+        if category:
+            try:
+                category_id = int(category)
+            except (TypeError, ValueError):
+                return []
+            products = [p for p in products if p["category_id"] == category_id]
+        if search:
+            products = [p for p in products if matches_search(p["search_text"], search)]
+        return products
+
+
+def _cached(name, build, timeout, version):
+    """Parte do snapshot: memória do processo, depois Redis, depois banco"""
+    if version is None:
+        # Cache indisponível: monta direto do banco
+        return build()
+
+    key = (version, name)
+    value = _local_cache.get(key)
+    if value is None:
+        value = get_or_compute(CATALOG_NAMESPACE, name, build, timeout)
+        _local_cache.set(key, value, timeout)
+    return value
+
+
+def get_catalog():
+    """Snapshot da versão atual do catálogo"""
+    version = get_version(CATALOG_NAMESPACE)
+    if version is None:
+        return CatalogSnapshot(build_products(), build_categories())
+
+    snapshot = _local_cache.get((version, "snapshot"))
+    if snapshot is None:
+        products_timeout = get_timeout("products", 900)
+        snapshot = CatalogSnapshot(
+            _cached("products", build_products, products_timeout, version),
+            _cached("categories", build_categories, get_timeout("categories", 86400), version),
+        )
+        # O índice vale enquanto a lista de produtos (menor TTL) for válida
+        _local_cache.set((version, "snapshot"), snapshot, products_timeout)
+    return snapshot
@@ -1,5 +1,7 @@
 from django.db import models
 
+from core.search import build_search_text, search_queryset
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -15,7 +17,16 @@ class Category(models.Model):
         ordering = ["name"]
 
 
+class ProductQuerySet(models.QuerySet):
+    def search(self, query):
+        """Busca pelo nome do produto (ver core.search)"""
+        return search_queryset(self, query)
+
+
 class Product(models.Model):
+    # Campos normalizados em search_text (core.search)
+    SEARCH_FIELDS = ("name",)
+
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=8, decimal_places=2)
@@ -25,10 +36,28 @@ class Product(models.Model):
     )
     is_active = models.BooleanField(default=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    search_text = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Nome normalizado para a busca (índice trigram no PostgreSQL)",
+    )
+
+    objects = ProductQuerySet.as_manager()
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(
+            *(getattr(self, field) for field in self.SEARCH_FIELDS)
+        )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_FIELDS):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Produto"
         verbose_name_plural = "Produtos"
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    """
+    Signal chamado quando um produto ou categoria muda: o snapshot do catálogo
+    da loja fica obsoleto após o commit
+    """
+    try:
+        transaction.on_commit(invalidate_catalog)
+    except Exception:
+        # Não pode falhar o signal
+        pass
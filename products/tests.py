@@ -1 +1,57 @@
-# Create your tests here.
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core.search import build_search_text
+from core.testing import QueryBudgetMixin, in_memory_services, reset_caches
+
+from .models import Category, Product
+
+
+@in_memory_services()
+class ProductListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """A vitrine fica dentro de SQL_QUERY_BUDGETS["product_list"]"""
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(
+            [Category(name=f"Categoria {index}") for index in range(3)]
+        )
+        # bulk_create não chama save(): search_text preenchido aqui
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Produto {index}",
+                    search_text=build_search_text(f"Produto {index}"),
+                    price=Decimal("5.00") + index,
+                    image="products/teste.jpg",
+                    category=categories[index % 3],
+                )
+                for index in range(12)
+            ]
+        )
+
+    def setUp(self):
+        reset_caches()
+
+    def test_cold_cache(self):
+        response = self.client.get(reverse("product_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+
+    def test_warm_cache(self):
+        self.client.get(reverse("product_list"))
+        response = self.client.get(reverse("product_list"), {"search": "produto 1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product["name"] for product in response.context["products"]],
+            ["Produto 11", "Produto 10", "Produto 1"],
+        )
+        self.assertWithinQueryBudget(response)
+
+    def test_filtered_by_category(self):
+        category = Category.objects.first()
+        response = self.client.get(reverse("product_list"), {"category": category.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
@@ -1,11 +1,13 @@
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect
 from django.views.generic import DetailView, ListView
 
-from cart.models import CartItem
-from cart.views import get_cart
+from cart.engine import SessionCart
+from cart.views import cart_response
+from core.pagination import SequenceCursorPaginator
 
-from .models import Category, Product
+from .catalog import get_catalog
+from .models import Product
 
 
 def add_to_cart(request):
@@ -16,15 +18,13 @@ def add_to_cart(request):
     if not product_id:
         return JsonResponse({"error": "No product id"}, status=400)
 
-    cart = get_cart(request)
-    # SEGURANÇA: Só permite adicionar produtos ativos
-    product = get_object_or_404(Product, pk=product_id, is_active=True)
-    item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-    if not created:
-        item.quantity += 1
-        item.save()
+    cart = SessionCart(request)
+    # SEGURANÇA: Só permite adicionar produtos ativos (presentes no catálogo)
+    if not cart.is_available(product_id):
+        raise Http404("Produto não encontrado")
+    cart.add(product_id)
 
-    return JsonResponse({"success": True, "cart_count": cart.total_quantity})
+    return cart_response(cart, product_id)
 
 
 class ProductListView(ListView):
@@ -34,31 +34,25 @@ class ProductListView(ListView):
     paginate_by = 9
 
     def get_queryset(self):
-        queryset = (
-            Product.objects.filter(is_active=True)
-            .select_related("category")
-            .order_by("-created_at")
+        # Produtos ativos do snapshot do catálogo (sem consulta ao banco)
+        self.catalog = get_catalog()
+        return self.catalog.filter(
+            search=self.request.GET.get("search", ""),
+            category=self.request.GET.get("category", ""),
         )
 
-        # Filtro de busca por nome
-        search_query = self.request.GET.get("search", "")
-        if search_query:
-            queryset = queryset.filter(name__icontains=search_query)
-
-        # Filtro por categoria
-        category_filter = self.request.GET.get("category", "")
-        if category_filter:
-            queryset = queryset.filter(category_id=category_filter)
-
-        return queryset
+    def paginate_queryset(self, queryset, page_size):
+        # Paginação por cursor em memória, sobre a lista do snapshot
+        paginator = SequenceCursorPaginator(queryset, page_size)
+        page = paginator.get_page_from_request(self.request)
+        return paginator, page, page.object_list, page.has_other_pages()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cart = get_cart(self.request)
-        context["cart_count"] = cart.total_quantity if cart else 0
+        context["cart_count"] = SessionCart(self.request).count
         context["search_query"] = self.request.GET.get("search", "")
         context["category_filter"] = self.request.GET.get("category", "")
-        context["categories"] = Category.objects.all().order_by("name")
+        context["categories"] = self.catalog.categories
         return context
 
     def get(self, request, *args, **kwargs):
@@ -0,0 +1,100 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import NotificationOutbox, WebhookEvent
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "order",
+        "provider",
+        "kind",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = ("status", "provider", "kind", "created_at")
+    search_fields = ("order__id", "message", "last_error")
+    readonly_fields = (
+        "order",
+        "provider",
+        "kind",
+        "recipient",
+        "message",
+        "attempts",
+        "locked_at",
+        "last_error",
+        "created_at",
+        "sent_at",
+    )
+    actions = ["retry_notifications"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Reenviar notificações selecionadas")
+    def retry_notifications(self, request, queryset):
+        updated = queryset.exclude(status="sent").update(
+            status="pending", attempts=0, next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f"{updated} notificações voltaram para a fila.")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "payment_id",
+        "event_key",
+        "status",
+        "duplicates",
+        "attempts",
+        "provider_status",
+        "result",
+        "received_at",
+        "processed_at",
+    )
+    list_filter = ("status", "provider", "event_key", "received_at")
+    search_fields = ("payment_id", "notification_id", "last_error")
+    readonly_fields = (
+        "provider",
+        "payment_id",
+        "event_key",
+        "notification_id",
+        "payload",
+        "duplicates",
+        "attempts",
+        "locked_at",
+        "last_error",
+        "provider_status",
+        "result",
+        "received_at",
+        "processed_at",
+    )
+    actions = ["retry_events"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Reprocessar eventos em dead letter")
+    def retry_events(self, request, queryset):
+        updated = 0
+        for event in queryset.filter(status="dead"):
+            try:
+                with transaction.atomic():
+                    WebhookEvent.objects.filter(pk=event.pk).update(
+                        status="pending",
+                        attempts=0,
+                        next_attempt_at=timezone.now(),
+                        locked_at=None,
+                    )
+                updated += 1
+            except IntegrityError:
+                # Já existe um evento pendente para o pagamento
+                pass
+        self.message_user(request, f"{updated} eventos voltaram para a fila.")
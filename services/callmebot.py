@@ -1,8 +1,9 @@
 import urllib.parse
 
-import requests
 from django.conf import settings
 
+from services import http
+
 
 class CallMeBot:
     def __init__(self):
@@ -13,7 +14,8 @@ class CallMeBot:
     def send_text_message(self, message):
         message_formatted = self.format_message_for_callmebot(message)
         url = f"{self.__base_url}&text={message_formatted}"
-        response = requests.get(url)
+        # Envio não é idempotente: quem reenvia é o notification_worker
+        response = http.get(url, timeout=10, idempotent=False)
         if response.status_code != 200:
             raise Exception(f"Erro ao enviar mensagem: {response.text}")
         return response
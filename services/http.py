@@ -0,0 +1,393 @@
+"""
+Camada HTTP compartilhada pelas integrações (Mercado Pago, Evolution API e
+CallMeBot).
+
+- Uma requests.Session por host, com pool de conexões keep-alive
+  (settings.HTTP_POOL_SIZE): o handshake TCP+TLS é feito uma vez por conexão
+  e reaproveitado nas chamadas seguintes.
+- Timeout padrão (settings.HTTP_TIMEOUT), sobrescrevível por chamada.
+- Novas tentativas com backoff exponencial e jitter apenas para chamadas
+  idempotentes (GET/HEAD/PUT/DELETE/OPTIONS, ou POST marcado com
+  idempotent=True, ex.: X-Idempotency-Key do Mercado Pago).
+- Circuit breaker por host: após falhas consecutivas as chamadas falham
+  imediatamente por um período, em vez de prender a requisição do usuário
+  esperando o timeout de um serviço fora do ar.
+- RateLimiter: limite de chamadas por segundo para os workers que disparam
+  muitas chamadas em paralelo (notificações, conciliação de pagamentos).
+
+arequest/aget/apost são as versões assíncronas (httpx.AsyncClient), usadas
+pelas views assíncronas: a espera pela resposta não ocupa uma thread. Usam os
+mesmos timeouts, novas tentativas e circuit breaker da versão síncrona.
+
+Os clientes httpx compartilhados pertencem ao event loop do servidor, que
+existe do lifespan.startup ao lifespan.shutdown do ASGI (lifespan, ligado em
+app/asgi.py): no desligamento eles são fechados. Fora dele (runserver, client
+de teste, async_to_sync), cada event loop dura uma chamada e a requisição usa
+um cliente próprio, fechado ao terminar.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("app.http")
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+_sessions = {}
+_breakers = {}
+_lock = threading.Lock()
+# event loop do servidor (registrado no lifespan) -> {host: httpx.AsyncClient}
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Chamada bloqueada porque o circuito do host está aberto"""
+
+
+class CircuitBreaker:
+    """
+    Circuito simples por contagem de falhas consecutivas.
+
+    closed -> open após `failure_threshold` falhas; depois de `reset_timeout`
+    segundos deixa passar uma chamada de teste (half-open): sucesso fecha o
+    circuito, falha reabre.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_progress = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Chamada de teste terminou sem resultado (cancelada): libera a próxima"""
+        with self.lock:
+            self.trial_in_progress = False
+
+
+class RateLimiter:
+    """Token bucket simples e thread-safe (chamadas por segundo)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(url):
+    """Session compartilhada (pool keep-alive) do host da URL"""
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.HTTP_POOL_SIZE,
+                    pool_block=False,
+                )
+                session.mount(f"{urlsplit(url).scheme}://", adapter)
+                _sessions[key] = session
+    return session
+
+
+def get_breaker(url):
+    key = _host_key(url)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(
+                key,
+                CircuitBreaker(
+                    settings.HTTP_CIRCUIT_FAILURE_THRESHOLD,
+                    settings.HTTP_CIRCUIT_RESET_SECONDS,
+                ),
+            )
+    return breaker
+
+
+def _backoff(attempt):
+    """Backoff exponencial com "full jitter" (evita rajadas sincronizadas)"""
+    return random.uniform(0, settings.HTTP_RETRY_BACKOFF * (2**attempt))
+
+
+def request(method, url, *, timeout=None, idempotent=None, retries=None, **kwargs):
+    """
+    Executa a requisição pela session do host. Aceita os mesmos argumentos
+    de requests.request e retorna o Response (sem raise_for_status).
+
+    Lança CircuitOpenError se o host estiver com o circuito aberto e as
+    exceções de requests em falhas de conexão/timeout.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    if retries is None:
+        retries = settings.HTTP_MAX_RETRIES if idempotent else 0
+    if timeout is None:
+        timeout = settings.HTTP_TIMEOUT
+
+    session = get_session(url)
+    breaker = get_breaker(url)
+    host = _host_key(url)
+
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuito aberto para {host}")
+
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            breaker.record_failure()
+            if attempt >= retries:
+                raise
+            logger.warning(f"{method} {host} falhou ({e}); nova tentativa {attempt + 1}/{retries}")
+        except BaseException:
+            # Demais falhas (redirecionamentos, URL inválida, resposta truncada,
+            # erro em hook) também encerram a chamada de teste do half-open
+            breaker.record_failure()
+            raise
+        else:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                return response
+            logger.warning(
+                f"{method} {host} retornou {response.status_code}; "
+                f"nova tentativa {attempt + 1}/{retries}"
+            )
+            response.close()
+
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+# Versão assíncrona
+
+
+def _new_async_client():
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_ASYNC_POOL_SIZE,
+            max_keepalive_connections=settings.HTTP_POOL_SIZE,
+        ),
+    )
+
+
+def get_async_client(url):
+    """
+    httpx.AsyncClient compartilhado (pool keep-alive) do host da URL, ou None
+    se o event loop atual não é o do servidor. O cliente fica preso ao event
+    loop em que foi criado: sob o uvicorn, um por processo.
+    """
+    clients = _async_clients.get(asyncio.get_running_loop())
+    if clients is None:
+        return None
+    key = _host_key(url)
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = _new_async_client()
+    return client
+
+
+@asynccontextmanager
+async def _async_client(url):
+    client = get_async_client(url)
+    if client is not None:
+        yield client
+        return
+    # Event loop de uma chamada só: cliente próprio, fechado ao terminar
+    async with _new_async_client() as client:
+        yield client
+
+
+async def aclose_async_clients():
+    """Fecha os clientes compartilhados do event loop atual"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Falha ao fechar cliente HTTP: {e}")
+
+
+async def lifespan(scope, receive, send):
+    """
+    Protocolo lifespan do ASGI: o event loop do servidor passa a compartilhar
+    os clientes httpx no startup e os fecha no shutdown
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            _async_clients.setdefault(asyncio.get_running_loop(), {})
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_async_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _httpx_timeout(timeout):
+    """Converte o timeout no formato do requests ((conexão, leitura) ou número)"""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+async def arequest(method, url, *, timeout=None, idempotent=None, retries=None, **kwargs):
+    """
+    Versão assíncrona de request(): mesmos argumentos, retorna o
+    httpx.Response (sem raise_for_status).
+
+    Lança CircuitOpenError se o host estiver com o circuito aberto e as
+    exceções do httpx (httpx.TransportError) em falhas de conexão/timeout.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    if retries is None:
+        retries = settings.HTTP_MAX_RETRIES if idempotent else 0
+    if timeout is None:
+        timeout = settings.HTTP_TIMEOUT
+
+    breaker = get_breaker(url)
+    host = _host_key(url)
+
+    async with _async_client(url) as client:
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuito aberto para {host}")
+
+            try:
+                response = await client.request(
+                    method, url, timeout=_httpx_timeout(timeout), **kwargs
+                )
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                logger.warning(
+                    f"{method} {host} falhou ({e}); nova tentativa {attempt + 1}/{retries}"
+                )
+            except asyncio.CancelledError:
+                # Requisição cancelada (cliente desconectou): não é falha do host
+                breaker.release_trial()
+                raise
+            except BaseException:
+                # Demais falhas (redirecionamentos, URL inválida, erro ao
+                # decodificar): também encerram a chamada de teste do half-open
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    # Corpo já lido: a resposta continua válida após fechar o cliente
+                    await response.aread()
+                    return response
+                logger.warning(
+                    f"{method} {host} retornou {response.status_code}; "
+                    f"nova tentativa {attempt + 1}/{retries}"
+                )
+
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+
+
+async def aget(url, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest("POST", url, **kwargs)
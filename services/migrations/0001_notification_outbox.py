@@ -0,0 +1,40 @@
+# Generated by Django 5.1 on 2026-10-17 18:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('checkout', '0003_order_total_amount_orderitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('callmebot', 'CallMeBot'), ('evolution', 'Evolution API')], max_length=20)),
+                ('kind', models.CharField(help_text='Tipo da notificação (ex: new_order, payment_update)', max_length=50)),
+                ('recipient', models.CharField(blank=True, help_text='Número de destino (Evolution API)', max_length=20)),
+                ('message', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('sent', 'Enviada'), ('dead', 'Falhou (dead letter)')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='checkout.order')),
+            ],
+            options={
+                'verbose_name': 'Notificação (Outbox)',
+                'verbose_name_plural': 'Notificações (Outbox)',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='services_no_status_086a2a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1 on 2026-10-17 18:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('mercadopago', 'Mercado Pago')], default='mercadopago', max_length=20)),
+                ('payment_id', models.CharField(help_text='ID do pagamento no provedor', max_length=64)),
+                ('event_key', models.CharField(help_text='Tipo do recurso notificado (ex: payment)', max_length=50)),
+                ('notification_id', models.CharField(blank=True, help_text='ID da notificação, quando enviado', max_length=64)),
+                ('payload', models.JSONField(help_text='Corpo recebido (primeira notificação)')),
+                ('duplicates', models.PositiveIntegerField(default=0, help_text='Notificações repetidas absorvidas por este evento')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('processed', 'Processado'), ('dead', 'Falhou (dead letter)')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('provider_status', models.CharField(blank=True, help_text='status/status_detail lido do provedor', max_length=50)),
+                ('result', models.CharField(blank=True, help_text='Ação aplicada ao pedido', max_length=50)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Webhook',
+                'verbose_name_plural': 'Eventos de Webhook',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='services_we_status_74d948_idx'), models.Index(fields=['payment_id', 'received_at'], name='services_we_payment_b66d61_idx'), models.Index(fields=['processed_at'], name='services_we_process_6426f4_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('payment_id', 'event_key'), name='unique_pending_webhook_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,309 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def retry_delay(attempts, base_seconds):
+    """Backoff exponencial com jitter para a tentativa de número `attempts`"""
+    delay = base_seconds * (2 ** (attempts - 1))
+    return delay + random.uniform(0, delay / 2)
+
+
+class NotificationOutboxQuerySet(models.QuerySet):
+    def due(self):
+        """Mensagens pendentes cujo horário de tentativa já chegou"""
+        return self.filter(status="pending", next_attempt_at__lte=timezone.now())
+
+    def stale_processing(self, minutes=10):
+        """Mensagens presas em processamento (worker morreu no meio do envio)"""
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        return self.filter(status="processing", locked_at__lt=cutoff)
+
+    def dead(self):
+        return self.filter(status="dead")
+
+
+class NotificationOutbox(models.Model):
+    """
+    Fila de notificações (WhatsApp/CallMeBot) gravada na mesma transação da
+    alteração do pedido e enviada pelo comando notification_worker.
+    """
+
+    PROVIDER_CHOICES = [
+        ("callmebot", "CallMeBot"),
+        ("evolution", "Evolution API"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pendente"),
+        ("processing", "Processando"),
+        ("sent", "Enviada"),
+        ("dead", "Falhou (dead letter)"),
+    ]
+
+    order = models.ForeignKey(
+        "checkout.Order",
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        null=True,
+        blank=True,
+    )
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    kind = models.CharField(
+        max_length=50, help_text="Tipo da notificação (ex: new_order, payment_update)"
+    )
+    recipient = models.CharField(
+        max_length=20, blank=True, help_text="Número de destino (Evolution API)"
+    )
+    message = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = NotificationOutboxQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Notificação (Outbox)"
+        verbose_name_plural = "Notificações (Outbox)"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} - {self.kind} ({self.get_status_display()})"
+
+    @classmethod
+    def enqueue(cls, provider, kind, message, order=None, recipient=""):
+        """
+        Grava a notificação para envio assíncrono. Deve ser chamado dentro da
+        mesma transação que altera o pedido.
+        """
+        return cls.objects.create(
+            provider=provider,
+            kind=kind,
+            message=message,
+            order=order,
+            recipient=recipient,
+        )
+
+    def mark_sent(self):
+        self.status = "sent"
+        self.sent_at = timezone.now()
+        self.locked_at = None
+        self.last_error = ""
+        self.save(update_fields=["status", "sent_at", "locked_at", "last_error"])
+
+    def mark_failed(self, error):
+        """
+        Registra a falha e agenda nova tentativa com backoff exponencial e
+        jitter, ou move para dead letter ao atingir o limite de tentativas.
+        """
+        self.attempts += 1
+        self.last_error = str(error)[:2000]
+        self.locked_at = None
+
+        if self.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            self.status = "dead"
+        else:
+            delay = retry_delay(self.attempts, settings.NOTIFICATION_RETRY_BASE_SECONDS)
+            self.status = "pending"
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+        self.save(
+            update_fields=[
+                "attempts",
+                "last_error",
+                "locked_at",
+                "status",
+                "next_attempt_at",
+            ]
+        )
+
+
+class WebhookEventQuerySet(models.QuerySet):
+    def due(self):
+        """Eventos pendentes cujo horário de tentativa já chegou"""
+        return self.filter(status="pending", next_attempt_at__lte=timezone.now())
+
+    def claimable(self):
+        """
+        Eventos vencidos de pagamentos sem outro evento em processamento: os
+        eventos de um mesmo pagamento são aplicados um de cada vez, em ordem
+        """
+        processing = WebhookEvent.objects.filter(status="processing").values("payment_id")
+        return self.due().exclude(payment_id__in=processing)
+
+    def stale_processing(self, minutes=10):
+        """Eventos presos em processamento (worker morreu no meio)"""
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        return self.filter(status="processing", locked_at__lt=cutoff)
+
+    def dead(self):
+        return self.filter(status="dead")
+
+
+class WebhookEvent(models.Model):
+    """
+    Notificação de webhook recebida, gravada antes de qualquer processamento
+    e aplicada pelo comando webhook_worker.
+
+    Há no máximo um evento pendente por (payment_id, event_key): reenvios do
+    Mercado Pago e o mesmo aviso nos formatos topic/resource e action/data
+    chegando antes do processamento só incrementam `duplicates`. Um aviso que
+    chega enquanto o evento do pagamento está em processamento gera um novo
+    evento pendente, aplicado depois dele.
+    """
+
+    PROVIDER_CHOICES = [
+        ("mercadopago", "Mercado Pago"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pendente"),
+        ("processing", "Processando"),
+        ("processed", "Processado"),
+        ("dead", "Falhou (dead letter)"),
+    ]
+
+    provider = models.CharField(
+        max_length=20, choices=PROVIDER_CHOICES, default="mercadopago"
+    )
+    payment_id = models.CharField(max_length=64, help_text="ID do pagamento no provedor")
+    event_key = models.CharField(
+        max_length=50, help_text="Tipo do recurso notificado (ex: payment)"
+    )
+    notification_id = models.CharField(
+        max_length=64, blank=True, help_text="ID da notificação, quando enviado"
+    )
+    payload = models.JSONField(help_text="Corpo recebido (primeira notificação)")
+    duplicates = models.PositiveIntegerField(
+        default=0, help_text="Notificações repetidas absorvidas por este evento"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    provider_status = models.CharField(
+        max_length=50, blank=True, help_text="status/status_detail lido do provedor"
+    )
+    result = models.CharField(
+        max_length=50, blank=True, help_text="Ação aplicada ao pedido"
+    )
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = WebhookEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Evento de Webhook"
+        verbose_name_plural = "Eventos de Webhook"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["payment_id", "event_key"],
+                condition=Q(status="pending"),
+                name="unique_pending_webhook_event",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+            models.Index(fields=["payment_id", "received_at"]),
+            models.Index(fields=["processed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.event_key} {self.payment_id} ({self.get_status_display()})"
+
+    @classmethod
+    def record(cls, payment_id, event_key, payload, notification_id="", provider="mercadopago"):
+        """
+        Grava a notificação. Retorna (evento, True) quando criou um evento novo
+        e (None, False) quando ela foi absorvida pelo evento pendente.
+        """
+        for _ in range(3):
+            try:
+                with transaction.atomic():
+                    event = cls.objects.create(
+                        provider=provider,
+                        payment_id=payment_id,
+                        event_key=event_key,
+                        notification_id=notification_id,
+                        payload=payload,
+                    )
+                return event, True
+            except IntegrityError:
+                absorbed = cls.objects.filter(
+                    payment_id=payment_id, event_key=event_key, status="pending"
+                ).update(duplicates=F("duplicates") + 1)
+                if absorbed:
+                    return None, False
+                # O pendente acabou de ser reservado pelo worker: grava de novo
+        raise IntegrityError(f"Não foi possível registrar o evento do pagamento {payment_id}")
+
+    def mark_processed(self, provider_status, result):
+        self.status = "processed"
+        self.provider_status = provider_status[:50]
+        self.result = result[:50]
+        self.processed_at = timezone.now()
+        self.locked_at = None
+        self.last_error = ""
+        self.save(
+            update_fields=[
+                "status",
+                "provider_status",
+                "result",
+                "processed_at",
+                "locked_at",
+                "last_error",
+            ]
+        )
+
+    def mark_failed(self, error):
+        """
+        Registra a falha e agenda nova tentativa com backoff, ou move para
+        dead letter ao atingir settings.WEBHOOK_MAX_ATTEMPTS
+        """
+        self.attempts += 1
+        self.last_error = str(error)[:2000]
+        self.locked_at = None
+
+        if self.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            self.status = "dead"
+        else:
+            delay = retry_delay(self.attempts, settings.WEBHOOK_RETRY_BASE_SECONDS)
+            self.status = "pending"
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+        try:
+            with transaction.atomic():
+                self.save(
+                    update_fields=[
+                        "attempts",
+                        "last_error",
+                        "locked_at",
+                        "status",
+                        "next_attempt_at",
+                    ]
+                )
+        except IntegrityError:
+            # Chegou outro aviso do pagamento nesse meio tempo: ele já
+            # busca o status atual, então este evento pode ser encerrado
+            self.status = "processed"
+            self.result = "superseded"
+            self.processed_at = timezone.now()
+            self.save(
+                update_fields=[
+                    "attempts",
+                    "last_error",
+                    "locked_at",
+                    "status",
+                    "result",
+                    "processed_at",
+                ]
+            )
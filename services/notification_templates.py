@@ -0,0 +1,151 @@
+"""
+Mensagens de WhatsApp dos pedidos (Evolution API e CallMeBot).
+
+Os textos fixos são montados uma vez, na importação: os templates com campos
+nomeados, os emojis e o bloco de pagamento de cada combinação de forma e
+status de pagamento. Renderizar uma mensagem é só preencher os campos a partir
+de um OrderSnapshot (checkout.snapshots), sem consultas ao banco: o mesmo
+snapshot serve para todas as mensagens de um pedido.
+
+Benchmark: python manage.py benchmark_notifications
+"""
+
+from checkout.snapshots import PAYMENT_METHOD_LABELS, PAYMENT_STATUS_LABELS
+
+PAYMENT_METHOD_EMOJI = {"pix": "💳", "dinheiro": "💰", "cartao": "💳"}
+PAYMENT_STATUS_EMOJI = {"pending": "⏳", "paid": "✅", "cancelled": "❌"}
+
+SEPARATOR = "━━━━━━━━━━━━━━━━━━━━━━━━━━"
+
+ITEM_LINE = "  • {name} (x{quantity})"
+
+CASH_INFO = "\nValor recebido: R$ {cash_value:.2f}\nTroco: R$ {change:.2f}"
+
+NEW_ORDER_ADMIN = (
+    "🚨 *NOVO PEDIDO RECEBIDO!*\n\n"
+    "{order_line}"
+    "*Cliente:* {customer_name}\n"
+    "*Telefone:* {phone}\n"
+    "*Endereço:* {address}\n\n"
+    "*Itens do pedido:*\n{items}\n\n"
+    "*Total:* R$ {total:.2f}\n\n"
+    "*Pagamento:*\n{payment_info}\n\n"
+    f"{SEPARATOR}"
+)
+
+NEW_ORDER_CLIENT = (
+    "✅ *Pedido Confirmado!*\n\n"
+    "Olá *{customer_name}*, seu pedido foi confirmado com sucesso!\n\n"
+    "*Resumo do pedido:*\n"
+    "Total: R$ {total:.2f}\n"
+    "Pagamento: {payment_info}\n\n"
+    "Em breve entraremos em contato para combinar a entrega.\n\n"
+    "Obrigado pela preferência!"
+)
+
+PAYMENT_UPDATE = (
+    "{header}\n\n"
+    "*Pedido:* #{order_id}\n"
+    "*Cliente:* {customer_name}\n"
+    "*Telefone:* {phone}\n"
+    "*Total:* R$ {total:.2f}\n\n"
+    "*Pagamento:*\n"
+    "{method_line}\n"
+    "{status_text}\n\n"
+    "{footer}"
+    f"{SEPARATOR}"
+)
+
+
+def _method_line(method):
+    return f"{PAYMENT_METHOD_EMOJI.get(method, '💳')} {PAYMENT_METHOD_LABELS.get(method, method)}"
+
+
+def _status_line(status):
+    return (
+        f"{PAYMENT_STATUS_EMOJI.get(status, '⏳')} "
+        f"Status: {PAYMENT_STATUS_LABELS.get(status, status)}"
+    )
+
+
+def _pending_parts(status):
+    return (
+        "⏳ *ATUALIZAÇÃO DE PAGAMENTO*",
+        f"{PAYMENT_STATUS_EMOJI.get(status, '⏳')} {PAYMENT_STATUS_LABELS.get(status, status)}",
+        "",
+    )
+
+
+# Blocos pré-montados para as combinações conhecidas de forma/status
+PAYMENT_INFO = {
+    (method, status): f"{_method_line(method)}\n{_status_line(status)}"
+    for method in PAYMENT_METHOD_LABELS
+    for status in PAYMENT_STATUS_LABELS
+}
+METHOD_LINES = {method: _method_line(method) for method in PAYMENT_METHOD_LABELS}
+
+# payment_status -> (cabeçalho, texto do status, orientação ao admin)
+PAYMENT_UPDATE_PARTS = {
+    **{status: _pending_parts(status) for status in PAYMENT_STATUS_LABELS},
+    "paid": (
+        "💰 *PAGAMENTO APROVADO!*",
+        "✅ Pago",
+        "🎉 *O pedido está pronto para ser processado!*\n",
+    ),
+    "cancelled": (
+        "❌ *PAGAMENTO CANCELADO*",
+        "❌ Cancelado",
+        "⚠️ *Ação necessária:*\n"
+        "• Verificar motivo do cancelamento\n"
+        "• Não processar o pedido\n"
+        "• Entrar em contato se necessário\n\n",
+    ),
+}
+
+
+def payment_info(snapshot):
+    """Forma e status do pagamento (+ troco, no dinheiro)"""
+    method, status = snapshot.payment_method, snapshot.payment_status
+    info = PAYMENT_INFO.get((method, status)) or f"{_method_line(method)}\n{_status_line(status)}"
+    if method == "dinheiro" and snapshot.cash_value:
+        info += CASH_INFO.format(cash_value=snapshot.cash_value, change=snapshot.change_amount)
+    return info
+
+
+def render_new_order_admin(snapshot, include_order_id=True):
+    return NEW_ORDER_ADMIN.format(
+        order_line=f"*Pedido:* #{snapshot.id}\n" if include_order_id else "",
+        customer_name=snapshot.customer_name,
+        phone=snapshot.phone,
+        address=snapshot.address,
+        items="\n".join(
+            ITEM_LINE.format(name=line.product_name, quantity=line.quantity)
+            for line in snapshot.lines
+        ),
+        total=snapshot.total_price,
+        payment_info=payment_info(snapshot),
+    )
+
+
+def render_new_order_client(snapshot):
+    return NEW_ORDER_CLIENT.format(
+        customer_name=snapshot.customer_name,
+        total=snapshot.total_price,
+        payment_info=payment_info(snapshot),
+    )
+
+
+def render_payment_update(snapshot):
+    status = snapshot.payment_status
+    header, status_text, footer = PAYMENT_UPDATE_PARTS.get(status) or _pending_parts(status)
+    method = snapshot.payment_method
+    return PAYMENT_UPDATE.format(
+        header=header,
+        order_id=snapshot.id or "N/A",
+        customer_name=snapshot.customer_name or "N/A",
+        phone=snapshot.phone or "N/A",
+        total=snapshot.total_price or 0,
+        method_line=METHOD_LINES.get(method) or _method_line(method),
+        status_text=status_text,
+        footer=footer,
+    )
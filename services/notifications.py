@@ -1,7 +1,14 @@
 from django.conf import settings
 
+from checkout.snapshots import OrderSnapshot
 from services.callmebot import CallMeBot
 from services.evolution import EvolutionAPI
+from services.models import NotificationOutbox
+from services.notification_templates import (
+    render_new_order_admin,
+    render_new_order_client,
+    render_payment_update,
+)
 
 
 def send_order_notifications(order):
@@ -10,102 +17,41 @@ def send_order_notifications(order):
     """
     evolution = EvolutionAPI()
     admin_number = settings.WHATSAPP_ADMIN_NUMBER
-    client_number = order.phone
-
-    # Monta a lista de itens com quantidade
-    itens_str = "\n".join(
-        [f"  • {item.product.name} (x{item.quantity})" for item in order.items.all()]
-    )
-
-    # Informações de pagamento
-    payment_method_emoji = {"pix": "💳", "dinheiro": "💰", "cartao": "💳"}.get(
-        order.payment_method, "💳"
-    )
-
-    payment_status_emoji = {"pending": "⏳", "paid": "✅", "cancelled": "❌"}.get(
-        order.payment_status, "⏳"
-    )
-
-    payment_info = f"{payment_method_emoji} {order.get_payment_method_display()}"
-    payment_info += (
-        f"\n{payment_status_emoji} Status: {order.get_payment_status_display()}"
-    )
-
-    if order.payment_method == "dinheiro" and order.cash_value:
-        change = order.change_amount
-        payment_info += f"\nValor recebido: R$ {order.cash_value:.2f}"
-        payment_info += f"\nTroco: R$ {change:.2f}"
+    # Um snapshot para as duas mensagens (itens consultados uma vez)
+    snapshot = OrderSnapshot.of(order)
 
     # Mensagem para o admin
-    admin_message = (
-        f"🚨 *NOVO PEDIDO RECEBIDO!*\n\n"
-        f"*Cliente:* {order.customer_name}\n"
-        f"*Telefone:* {order.phone}\n"
-        f"*Endereço:* {order.address}\n\n"
-        f"*Itens do pedido:*\n{itens_str}\n\n"
-        f"*Total:* R$ {order.total_price:.2f}\n\n"
-        f"*Pagamento:*\n{payment_info}\n\n"
-        f"━━━━━━━━━━━━━━━━━━━━━━━━━━"
-    )
+    admin_message = render_new_order_admin(snapshot, include_order_id=False)
     evolution.send_text_message(admin_number, admin_message)
 
     # Mensagem para o cliente
-    client_message = (
-        f"✅ *Pedido Confirmado!*\n\n"
-        f"Olá *{order.customer_name}*, seu pedido foi confirmado com sucesso!\n\n"
-        f"*Resumo do pedido:*\n"
-        f"Total: R$ {order.total_price:.2f}\n"
-        f"Pagamento: {payment_info}\n\n"
-        f"Em breve entraremos em contato para combinar a entrega.\n\n"
-        f"Obrigado pela preferência!"
-    )
+    client_message = render_new_order_client(snapshot)
     try:
-        evolution.send_text_message(f"55{client_number}", client_message)
+        evolution.send_text_message(f"55{snapshot.phone}", client_message)
     except Exception as e:
         # Apenas loga o erro, não interrompe o fluxo
         print(f"Erro ao enviar mensagem ao cliente: {e}")
 
 
-def send_order_notifications_with_callmebot(order):
-    callmebot = CallMeBot()
-
-    # Monta a lista de itens com quantidade
-    itens_str = "\n".join(
-        [f"  • {item.product.name} (x{item.quantity})" for item in order.items.all()]
-    )
-
-    # Informações de pagamento
-    payment_method_emoji = {"pix": "💳", "dinheiro": "💰", "cartao": "💳"}.get(
-        order.payment_method, "💳"
-    )
+def build_order_message_for_callmebot(order):
+    """
+    Monta a mensagem de novo pedido enviada ao admin via CallMeBot.
+    Aceita o pedido ou um OrderSnapshot já montado.
+    """
+    return render_new_order_admin(OrderSnapshot.of(order))
 
-    payment_status_emoji = {"pending": "⏳", "paid": "✅", "cancelled": "❌"}.get(
-        order.payment_status, "⏳"
-    )
 
-    payment_info = f"{payment_method_emoji} {order.get_payment_method_display()}"
-    payment_info += (
-        f"\n{payment_status_emoji} Status: {order.get_payment_status_display()}"
-    )
+def send_order_notifications_with_callmebot(order):
+    callmebot = CallMeBot()
+    callmebot.send_text_message(build_order_message_for_callmebot(order))
 
-    if order.payment_method == "dinheiro" and order.cash_value:
-        change = order.change_amount
-        payment_info += f"\nValor recebido: R$ {order.cash_value:.2f}"
-        payment_info += f"\nTroco: R$ {change:.2f}"
 
-    # Mensagem para o admin
-    message = (
-        f"🚨 *NOVO PEDIDO RECEBIDO!*\n\n"
-        f"*Pedido:* #{order.id}\n"
-        f"*Cliente:* {order.customer_name}\n"
-        f"*Telefone:* {order.phone}\n"
-        f"*Endereço:* {order.address}\n\n"
-        f"*Itens do pedido:*\n{itens_str}\n\n"
-        f"*Total:* R$ {order.total_price:.2f}\n\n"
-        f"*Pagamento:*\n{payment_info}\n\n"
-        f"━━━━━━━━━━━━━━━━━━━━━━━━━━"
-    )
-    callmebot.send_text_message(message)
+def build_payment_update_message(order):
+    """
+    Monta a mensagem de atualização de pagamento enviada ao admin.
+    Usa apenas campos do pedido (nenhuma consulta aos itens).
+    """
+    return render_payment_update(order)
 
 
 def send_payment_update_notification_with_callmebot(order, previous_status=None):
@@ -113,62 +59,45 @@ def send_payment_update_notification_with_callmebot(order, previous_status=None)
     Envia notificação específica para atualizações de pagamento via webhook.
     """
     callmebot = CallMeBot()
+    message = build_payment_update_message(order)
 
-    # Emojis para diferentes status
-    status_emoji = {"paid": "✅", "cancelled": "❌", "pending": "⏳"}.get(
-        order.payment_status, "⏳"
-    )
-    
-    payment_method_emoji = {"pix": "💳", "dinheiro": "💰", "cartao": "💳"}.get(
-        order.payment_method, "💳"
-    )
+    try:
+        callmebot.send_text_message(message)
+    except Exception as e:
+        print(f"Erro ao enviar notificação de atualização de pagamento: {e}")
+        raise
 
-    # Determinar o tipo de atualização
-    if order.payment_status == "paid":
-        update_type = "💰 *PAGAMENTO APROVADO!*"
-        status_text = "✅ Pago"
-    elif order.payment_status == "cancelled":
-        update_type = "❌ *PAGAMENTO CANCELADO*"
-        status_text = "❌ Cancelado"
-    else:
-        update_type = "⏳ *ATUALIZAÇÃO DE PAGAMENTO*"
-        status_text = f"{status_emoji} {order.get_payment_status_display()}"
 
-    # Mensagem para o admin
-    order_id = getattr(order, 'id', 'N/A') or 'N/A'
-    customer_name = getattr(order, 'customer_name', 'N/A') or 'N/A'
-    phone = getattr(order, 'phone', 'N/A') or 'N/A'
-    total_price = getattr(order, 'total_price', 0) or 0
-    
-    message = (
-        f"{update_type}\n\n"
-        f"*Pedido:* #{order_id}\n"
-        f"*Cliente:* {customer_name}\n"
-        f"*Telefone:* {phone}\n"
-        f"*Total:* R$ {total_price:.2f}\n\n"
-        f"*Pagamento:*\n"
-        f"{payment_method_emoji} {order.get_payment_method_display()}\n"
-        f"{status_text}\n\n"
-    )
+# --- Outbox (envio assíncrono pelo comando notification_worker) ---
+
+
+def queue_order_notifications(order, snapshot=None):
+    """
+    Enfileira a notificação de novo pedido. Chamar dentro da transação que
+    cria o pedido. Com o snapshot do checkout, a mensagem não consulta os itens.
+    """
+    message = build_order_message_for_callmebot(snapshot or order)
+    return NotificationOutbox.enqueue("callmebot", "new_order", message, order=order)
 
-    # Adicionar informações específicas baseadas no status
-    if order.payment_status == "paid":
-        message += (
-            "🎉 *O pedido está pronto para ser processado!*\n"
-        )
-    elif order.payment_status == "cancelled":
-        message += (
-            "⚠️ *Ação necessária:*\n"
-            "• Verificar motivo do cancelamento\n"
-            "• Não processar o pedido\n"
-            "• Entrar em contato se necessário\n\n"
-        )
 
-    message += "━━━━━━━━━━━━━━━━━━━━━━━━━━"
+def queue_payment_update_notification(order):
+    """
+    Enfileira a notificação de atualização de pagamento. Chamar dentro da
+    transação que altera o pedido.
+    """
+    return NotificationOutbox.enqueue(
+        "callmebot", "payment_update", build_payment_update_message(order), order=order
+    )
 
 
-    try:
-        callmebot.send_text_message(message)
-    except Exception as e:
-        print(f"Erro ao enviar notificação de atualização de pagamento: {e}")
-        raise
+def deliver_notification(notification):
+    """
+    Envia uma notificação do outbox pelo provedor correspondente.
+    Lança exceção em caso de falha para que o worker agende nova tentativa.
+    """
+    if notification.provider == "callmebot":
+        CallMeBot().send_text_message(notification.message)
+    elif notification.provider == "evolution":
+        EvolutionAPI().send_text_message(notification.recipient, notification.message)
+    else:
+        raise ValueError(f"Provedor desconhecido: {notification.provider}")
@@ -0,0 +1,58 @@
+"""
+Cache do status dos pagamentos no Mercado Pago, por payment_id.
+
+O webhook grava o status recebido (cache_payment_state) e o polling da página
+de aguardando pagamento lê daqui (get_payment_state). Só quando o valor vence
+(CACHE_TIMEOUTS["payment_state"]) um único processo consulta o Mercado Pago
+novamente; os demais continuam respondendo com o valor anterior.
+"""
+
+from core.cache import aget_or_compute, get_or_compute, get_timeout, set_value
+from services.mercadopago import mp_service
+
+PAYMENT_STATE_NAMESPACE = "payment_state"
+
+
+def payment_state_from_data(payment_data):
+    """Campos do pagamento usados pelo polling (serializáveis em JSON)"""
+    return {
+        "status": payment_data.get("status"),
+        "status_detail": payment_data.get("status_detail"),
+    }
+
+
+def cache_payment_state(payment_id, payment_data):
+    """Grava no cache o status recebido do Mercado Pago (ex.: pelo webhook)"""
+    set_value(
+        PAYMENT_STATE_NAMESPACE,
+        str(payment_id),
+        payment_state_from_data(payment_data),
+        get_timeout("payment_state", 30),
+    )
+
+
+def get_payment_state(payment_id):
+    """
+    Status do pagamento a partir do cache; consulta o Mercado Pago apenas
+    quando o valor está ausente ou vencido (um processo por vez).
+    """
+    return get_or_compute(
+        PAYMENT_STATE_NAMESPACE,
+        str(payment_id),
+        lambda: payment_state_from_data(mp_service.get_payment_info(str(payment_id))),
+        get_timeout("payment_state", 30),
+    )
+
+
+async def aget_payment_state(payment_id):
+    """Versão assíncrona de get_payment_state (consulta HTTP assíncrona)"""
+
+    async def compute():
+        return payment_state_from_data(await mp_service.aget_payment_info(str(payment_id)))
+
+    return await aget_or_compute(
+        PAYMENT_STATE_NAMESPACE,
+        str(payment_id),
+        compute,
+        get_timeout("payment_state", 30),
+    )
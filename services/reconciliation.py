@@ -0,0 +1,84 @@
+"""
+Conciliação dos pagamentos online pendentes com o Mercado Pago.
+
+Quando um webhook se perde, o pedido fica com payment_status="pending" até o
+cliente voltar à página de pagamento, e o dashboard continua contando o valor
+como receita pendente. O comando reconcile_payments seleciona esses pedidos
+(Order.objects.awaiting_reconciliation), consulta o Mercado Pago em paralelo e
+aplica cada resposta aqui, pelo mesmo update_order_status do webhook (origem
+"reconciliation" no histórico do pagamento).
+
+Cobranças PIX que continuam pendentes depois da data de expiração são
+canceladas (cancelled/expired): o QR Code não aceita mais pagamento.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .payment_state import cache_payment_state
+
+# Tolerância após a expiração do PIX (pagamento feito no último instante que o
+# Mercado Pago ainda não refletiu)
+EXPIRATION_GRACE = timedelta(minutes=5)
+
+# Ações do update_order_status que tiram o pedido da receita pendente
+SETTLED_ACTIONS = {"payment_approved", "payment_cancelled", "payment_expired"}
+
+
+def _parse_expiration(value):
+    if not value:
+        return None
+    try:
+        return parse_datetime(str(value))
+    except ValueError:
+        return None
+
+
+def pix_expired(order, payment_data, now=None):
+    """
+    PIX ainda pendente no Mercado Pago com a data de expiração (da resposta ou,
+    na falta dela, a gravada no Payment como order.expires_at) já vencida
+    """
+    if order.payment_method != "pix" or payment_data.get("status") != "pending":
+        return False
+    expires_at = _parse_expiration(payment_data.get("date_of_expiration")) or getattr(
+        order, "expires_at", None
+    )
+    now = now or timezone.now()
+    return expires_at is not None and expires_at + EXPIRATION_GRACE < now
+
+
+def reconcile_payment(order, payment_data, now=None):
+    """
+    Aplica ao pedido o status consultado no Mercado Pago. Retorna a ação do
+    update_order_status ("payment_approved", "payment_cancelled", "no_action"...)
+    ou "payment_expired" quando o PIX vencido foi cancelado.
+    Lança exceção se o pedido não pôde ser atualizado.
+    """
+    from .views import update_order_status
+
+    expired = pix_expired(order, payment_data, now)
+    if expired:
+        payment_data = {**payment_data, "status": "cancelled", "status_detail": "expired"}
+
+    # Polling da página de pagamento passa a responder com este status
+    cache_payment_state(order.payment_id, payment_data)
+
+    result = update_order_status(
+        payment_id=order.payment_id,
+        status=payment_data.get("status"),
+        status_detail=payment_data.get("status_detail"),
+        date_approved=payment_data.get("date_approved"),
+        external_reference=payment_data.get("external_reference"),
+        payment_data=payment_data,
+        source="reconciliation",
+    )
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+
+    action = result.get("action", "no_action")
+    if expired and action == "payment_cancelled":
+        return "payment_expired"
+    return action
@@ -0,0 +1,472 @@
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from checkout.models import Order, Payment
+from core.testing import in_memory_services
+from products.models import Product
+
+from . import http
+from .models import NotificationOutbox, WebhookEvent
+from .notifications import queue_order_notifications
+from .reconciliation import EXPIRATION_GRACE, pix_expired, reconcile_payment
+from .webhooks import parse_notification
+
+
+def create_order(**fields):
+    product = Product.objects.create(
+        name="Galão 20L", price=Decimal("12.50"), image="products/galao.jpg"
+    )
+    return Order.objects.create_with_items(
+        [(product, 2)],
+        **{
+            "customer_name": "Cliente Teste",
+            "phone": "11999999999",
+            "address": "Rua Teste, 1",
+            "payment_method": "pix",
+            **fields,
+        },
+    )
+
+
+@in_memory_services()
+class NotificationOutboxTests(TestCase):
+    def test_enqueue_commits_with_the_order(self):
+        with transaction.atomic():
+            order = create_order()
+            queue_order_notifications(order)
+
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual(notification.order, order)
+        self.assertEqual(notification.kind, "new_order")
+        self.assertEqual(notification.status, "pending")
+        self.assertIn("Cliente Teste", notification.message)
+        self.assertIn(notification, NotificationOutbox.objects.due())
+
+    def test_enqueue_rolls_back_with_the_order(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                queue_order_notifications(create_order())
+                raise RuntimeError("falha depois de gravar o pedido")
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=3, NOTIFICATION_RETRY_BASE_SECONDS=30)
+    def test_mark_failed_schedules_retries_then_dead_letter(self):
+        notification = NotificationOutbox.enqueue("callmebot", "new_order", "Oi")
+
+        # Backoff exponencial: 30s e 60s, mais até 50% de jitter
+        for attempt, base in ((1, 30), (2, 60)):
+            started = timezone.now()
+            notification.mark_failed(ConnectionError("CallMeBot fora do ar"))
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, "pending")
+            self.assertEqual(notification.attempts, attempt)
+            self.assertEqual(notification.last_error, "CallMeBot fora do ar")
+            self.assertGreaterEqual(
+                notification.next_attempt_at, started + timedelta(seconds=base)
+            )
+            self.assertLessEqual(
+                notification.next_attempt_at,
+                timezone.now() + timedelta(seconds=base * 1.5),
+            )
+            self.assertNotIn(notification, NotificationOutbox.objects.due())
+
+        notification.mark_failed(ConnectionError("CallMeBot fora do ar"))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "dead")
+        self.assertEqual(notification.attempts, 3)
+
+
+@in_memory_services()
+class NotificationWorkerTests(TransactionTestCase):
+    """Uma passada do notification_worker (--once); os envios rodam em threads"""
+
+    def run_worker(self):
+        call_command(
+            "notification_worker",
+            "--once",
+            "--concurrency",
+            "1",
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    def test_sends_pending_notification(self):
+        notification = NotificationOutbox.enqueue(
+            "callmebot", "new_order", "Novo pedido"
+        )
+
+        with patch(
+            "core.management.commands.notification_worker.deliver_notification"
+        ) as deliver:
+            self.run_worker()
+
+        deliver.assert_called_once()
+        self.assertEqual(deliver.call_args.args[0].message, "Novo pedido")
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "sent")
+        self.assertIsNotNone(notification.sent_at)
+
+    def test_failed_delivery_is_rescheduled(self):
+        notification = NotificationOutbox.enqueue(
+            "callmebot", "new_order", "Novo pedido"
+        )
+
+        with patch(
+            "core.management.commands.notification_worker.deliver_notification",
+            side_effect=ConnectionError("CallMeBot fora do ar"),
+        ):
+            self.run_worker()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, "pending")
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertIsNone(notification.locked_at)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """Toda chamada de teste do half-open termina com um resultado registrado"""
+
+    url = "https://api.exemplo.com/v1/recurso"
+
+    def setUp(self):
+        http._breakers.clear()
+        self.addCleanup(http._breakers.clear)
+        self.breaker = http.get_breaker(self.url)
+
+    def half_open(self):
+        self.breaker.opened_at = -self.breaker.reset_timeout
+        self.assertEqual(self.breaker.state, "half-open")
+
+    def test_other_request_exception_reopens(self):
+        self.half_open()
+        with patch.object(
+            requests.Session, "request", side_effect=requests.TooManyRedirects("loop")
+        ):
+            with self.assertRaises(requests.TooManyRedirects):
+                http.request("GET", self.url, retries=0)
+
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.trial_in_progress)
+        # Passado o reset_timeout, uma nova chamada de teste é liberada
+        self.half_open()
+        self.assertTrue(self.breaker.allow())
+
+    def test_async_other_error_reopens(self):
+        self.half_open()
+        with patch.object(
+            httpx.AsyncClient, "request", side_effect=httpx.TooManyRedirects("loop")
+        ):
+            with self.assertRaises(httpx.TooManyRedirects):
+                async_to_sync(http.arequest)("GET", self.url, retries=0)
+
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.trial_in_progress)
+
+    def test_async_cancelled_releases_trial(self):
+        self.half_open()
+        with patch.object(
+            httpx.AsyncClient, "request", side_effect=asyncio.CancelledError
+        ):
+            with self.assertRaises(asyncio.CancelledError):
+                async_to_sync(http.arequest)("GET", self.url, retries=0)
+
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.allow())
+
+
+class AsyncClientLifespanTests(SimpleTestCase):
+    """Clientes httpx fechados no lifespan.shutdown, ou ao fim da chamada"""
+
+    url = "https://api.exemplo.com/v1/recurso"
+
+    def test_shared_clients_closed_on_shutdown(self):
+        async def run_server():
+            messages = asyncio.Queue()
+            sent = []
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await messages.put({"type": "lifespan.startup"})
+            server = asyncio.create_task(
+                http.lifespan({"type": "lifespan"}, messages.get, send)
+            )
+            while not sent:
+                await asyncio.sleep(0)
+
+            client = http.get_async_client(self.url)
+            self.assertIs(http.get_async_client(self.url), client)
+            await messages.put({"type": "lifespan.shutdown"})
+            await server
+            return client, sent
+
+        client, sent = async_to_sync(run_server)()
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+        self.assertTrue(client.is_closed)
+
+    def test_client_closed_without_lifespan(self):
+        async def use_client():
+            self.assertIsNone(http.get_async_client(self.url))
+            async with http._async_client(self.url) as client:
+                self.assertFalse(client.is_closed)
+            return client
+
+        self.assertTrue(async_to_sync(use_client)().is_closed)
+
+
+TOPIC_NOTIFICATION = {"resource": "555", "topic": "payment"}
+ACTION_NOTIFICATION = {"action": "payment.updated", "data": {"id": "555"}, "id": 987}
+
+
+def record_notification(data):
+    payment_id, event_key, notification_id = parse_notification(data)
+    return WebhookEvent.record(payment_id, event_key, data, notification_id)
+
+
+class WebhookEventTests(TestCase):
+    """Um evento pendente por pagamento (constraint unique_pending_webhook_event)"""
+
+    def test_duplicate_notifications_are_absorbed(self):
+        event, created = record_notification(TOPIC_NOTIFICATION)
+        self.assertTrue(created)
+
+        # Reenvio e o mesmo aviso no outro formato
+        self.assertEqual(record_notification(TOPIC_NOTIFICATION), (None, False))
+        self.assertEqual(record_notification(ACTION_NOTIFICATION), (None, False))
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.payment_id, "555")
+        self.assertEqual(event.duplicates, 2)
+
+    def test_notification_while_processing_creates_new_event(self):
+        event, _ = record_notification(TOPIC_NOTIFICATION)
+        WebhookEvent.objects.filter(pk=event.pk).update(status="processing")
+
+        newer, created = record_notification(ACTION_NOTIFICATION)
+        self.assertTrue(created)
+        self.assertEqual(newer.status, "pending")
+        # Só é reservado depois que o evento em processamento terminar
+        self.assertNotIn(newer, WebhookEvent.objects.claimable())
+
+    def test_claimable_skips_payments_in_processing(self):
+        processing = WebhookEvent.objects.create(
+            payment_id="1", event_key="payment", payload={}, status="processing"
+        )
+        waiting = WebhookEvent.objects.create(
+            payment_id="1", event_key="payment", payload={}
+        )
+        other = WebhookEvent.objects.create(
+            payment_id="2", event_key="payment", payload={}
+        )
+
+        self.assertEqual(list(WebhookEvent.objects.claimable()), [other])
+
+        processing.mark_processed("approved/accredited", "paid")
+        self.assertCountEqual(WebhookEvent.objects.claimable(), [waiting, other])
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_RETRY_BASE_SECONDS=10)
+    def test_mark_failed_retries_then_dead_letter(self):
+        event, _ = record_notification(TOPIC_NOTIFICATION)
+
+        event.mark_failed(RuntimeError("Mercado Pago fora do ar"))
+        event.refresh_from_db()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertNotIn(event, WebhookEvent.objects.due())
+
+        event.mark_failed(RuntimeError("Mercado Pago fora do ar"))
+        event.refresh_from_db()
+        self.assertEqual(event.status, "dead")
+        self.assertEqual(event.last_error, "Mercado Pago fora do ar")
+
+    def test_failed_event_superseded_by_newer_notification(self):
+        event, _ = record_notification(TOPIC_NOTIFICATION)
+        WebhookEvent.objects.filter(pk=event.pk).update(status="processing")
+        event.refresh_from_db()
+        newer, _ = record_notification(ACTION_NOTIFICATION)
+
+        # Voltar para pendente violaria a constraint: o aviso novo já cobre este
+        event.mark_failed(RuntimeError("Pagamento não encontrado"))
+        event.refresh_from_db()
+        self.assertEqual(event.status, "processed")
+        self.assertEqual(event.result, "superseded")
+        newer.refresh_from_db()
+        self.assertEqual(newer.status, "pending")
+
+
+class WebhookWorkerTests(TransactionTestCase):
+    """Uma passada do webhook_worker (--once); process_event simulado"""
+
+    def run_worker(self, process_event):
+        with patch(
+            "core.management.commands.webhook_worker.process_event",
+            side_effect=process_event,
+        ) as mock:
+            call_command(
+                "webhook_worker",
+                "--once",
+                "--concurrency",
+                "2",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+        return mock
+
+    def test_processes_one_event_per_payment(self):
+        WebhookEvent.objects.create(
+            payment_id="1",
+            event_key="payment",
+            payload={},
+            status="processing",
+            locked_at=timezone.now(),
+        )
+        waiting = WebhookEvent.objects.create(
+            payment_id="1", event_key="payment", payload={}
+        )
+        other = WebhookEvent.objects.create(
+            payment_id="2", event_key="payment", payload={}
+        )
+
+        mock = self.run_worker(
+            lambda event: event.mark_processed("approved/accredited", "paid")
+        )
+
+        self.assertEqual([call.args[0].pk for call in mock.call_args_list], [other.pk])
+        other.refresh_from_db()
+        self.assertEqual(other.status, "processed")
+        self.assertEqual(other.result, "paid")
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, "pending")
+
+    def test_failed_event_is_rescheduled(self):
+        event, _ = record_notification(TOPIC_NOTIFICATION)
+
+        self.run_worker(RuntimeError("Pagamento 555 não encontrado"))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, "Pagamento 555 não encontrado")
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertIsNone(event.locked_at)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=1)
+    def test_last_attempt_goes_to_dead_letter(self):
+        event, _ = record_notification(TOPIC_NOTIFICATION)
+
+        self.run_worker(RuntimeError("Pagamento 555 não encontrado"))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "dead")
+        self.assertEqual(list(WebhookEvent.objects.dead()), [event])
+
+    def test_stale_processing_event_is_requeued(self):
+        event = WebhookEvent.objects.create(
+            payment_id="1",
+            event_key="payment",
+            payload={},
+            status="processing",
+            locked_at=timezone.now() - timedelta(minutes=30),
+        )
+
+        mock = self.run_worker(lambda event: None)
+
+        mock.assert_not_called()
+        event.refresh_from_db()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+
+
+def pending_pix(expires_in):
+    expiration = timezone.now() + expires_in
+    return {
+        "id": 777,
+        "status": "pending",
+        "status_detail": "pending_waiting_transfer",
+        "transaction_amount": 25.00,
+        "date_of_expiration": expiration.isoformat(),
+    }
+
+
+@in_memory_services()
+class ReconciliationTests(TestCase):
+    """Conciliação de pedidos pendentes, incluindo o PIX vencido"""
+
+    def setUp(self):
+        self.order = create_order(payment_id="777")
+
+    def test_pix_expired_after_grace(self):
+        margin = timedelta(minutes=1)
+        self.assertFalse(
+            pix_expired(self.order, pending_pix(-EXPIRATION_GRACE + margin))
+        )
+        self.assertTrue(
+            pix_expired(self.order, pending_pix(-EXPIRATION_GRACE - margin))
+        )
+
+    def test_pix_expired_only_for_pending_pix(self):
+        expired = pending_pix(-timedelta(hours=1))
+        self.assertFalse(pix_expired(self.order, {**expired, "status": "approved"}))
+        self.order.payment_method = "cartao"
+        self.assertFalse(pix_expired(self.order, expired))
+
+    def test_pix_expired_uses_recorded_expiration(self):
+        # Resposta sem date_of_expiration: vale a do Payment (order.expires_at)
+        payment_data = pending_pix(-timedelta(hours=1))
+        del payment_data["date_of_expiration"]
+        self.assertFalse(pix_expired(self.order, payment_data))
+
+        self.order.expires_at = timezone.now() - timedelta(hours=1)
+        self.assertTrue(pix_expired(self.order, payment_data))
+
+    def test_reconcile_cancels_expired_pix(self):
+        action = reconcile_payment(self.order, pending_pix(-timedelta(hours=1)))
+
+        self.assertEqual(action, "payment_expired")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "cancelled")
+        self.assertEqual(self.order.status, "cancelled")
+        payment = Payment.objects.get(order=self.order)
+        self.assertEqual(
+            (payment.status, payment.status_detail), ("cancelled", "expired")
+        )
+        self.assertEqual(payment.history.get().source, "reconciliation")
+
+    def test_reconcile_keeps_pix_pending_within_grace(self):
+        action = reconcile_payment(
+            self.order, pending_pix(-EXPIRATION_GRACE + timedelta(minutes=1))
+        )
+
+        # Pedido já pendente: nada a aplicar
+        self.assertEqual(action, "no_action")
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "pending")
+
+    def test_reconcile_applies_approved_payment(self):
+        payment_data = {
+            **pending_pix(timedelta(minutes=30)),
+            "status": "approved",
+            "status_detail": "accredited",
+        }
+        self.assertEqual(
+            reconcile_payment(self.order, payment_data), "payment_approved"
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, "paid")
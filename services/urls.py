@@ -6,4 +6,5 @@ app_name = 'services'
 
 urlpatterns = [
     path('webhook/mercadopago/', views.webhook_mercadopago, name='webhook_mercadopago'),
+    path('webhook/metrics/', views.webhook_metrics_view, name='webhook_metrics'),
 ]
@@ -1,14 +1,34 @@
 import json
 
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from checkout.models import Order
-from services.mercadopago import MercadoPagoService
-from services.notifications import send_payment_update_notification_with_callmebot
+from checkout.events import publish_payment_status
+from checkout.models import Order, Payment
+from services.models import WebhookEvent
+from services.notifications import queue_payment_update_notification
+from services.webhooks import (
+    InvalidNotification,
+    UnsupportedNotification,
+    parse_notification,
+    queue_metrics,
+)
 
 
-def update_order_status(payment_id, status, status_detail, date_approved=None, external_reference=None):
+def _already_applied(order, status, status_detail):
+    if status == 'approved' and status_detail == 'accredited':
+        return order.payment_status == 'paid'
+    if status == 'cancelled':
+        return order.payment_status == 'cancelled' and order.status == 'cancelled'
+    if status == 'pending':
+        return order.payment_status == 'pending'
+    return False
+
+
+def update_order_status(payment_id, status, status_detail, date_approved=None, external_reference=None,
+                        payment_data=None, source='webhook'):
     """
     Atualiza o status de um pedido baseado nas informações do pagamento.
     
@@ -18,15 +38,26 @@ def update_order_status(payment_id, status, status_detail, date_approved=None, e
         status_detail: Detalhe do status (accredited, expired, etc.)
         date_approved: Data de aprovação do pagamento
         external_reference: Referência externa (ID do pedido)
+        payment_data: Resposta completa do MercadoPago (gravada no Payment)
+        source: Origem da atualização, registrada no histórico do pagamento
     
     Returns:
         dict: Resultado da operação com sucesso/erro e mensagem
     """
     try:
         order = None
-        
-        # Primeiro, tentar encontrar o pedido pelo payment_id (PIX)
-        order = Order.objects.filter(payment_id=payment_id).first()
+
+        # Primeiro, buscar pelo pagamento já registrado (índice único no ID do provedor)
+        payment = (
+            Payment.objects.for_provider_id(payment_id)
+            .select_related('order')
+            .first()
+        )
+        if payment:
+            order = payment.order
+        else:
+            # Pedidos cujo pagamento ainda não foi registrado (PIX)
+            order = Order.objects.filter(payment_id=payment_id).first()
         
         # Se não encontrou e tem external_reference, buscar pelo ID do pedido (Cartão)
         if not order and external_reference:
@@ -45,19 +76,39 @@ def update_order_status(payment_id, status, status_detail, date_approved=None, e
                 'success': False,
                 'message': f'Pedido não encontrado para payment_id: {payment_id} ou external_reference: {external_reference}'
             }
+
+        # Histórico do pagamento: registrado mesmo quando o pedido não muda
+        Payment.record(
+            order,
+            payment_id,
+            payment_data or {
+                'status': status,
+                'status_detail': status_detail,
+                'date_approved': date_approved,
+                'external_reference': external_reference,
+            },
+            source=source,
+        )
         
+        # Notificação repetida (ou fora de ordem) de um status já aplicado:
+        # nada é salvo e nenhuma notificação é enviada de novo
+        if _already_applied(order, status, status_detail):
+            return {
+                'success': True,
+                'message': f'Status {status}/{status_detail} já aplicado ao pedido #{order.id}',
+                'order_id': order.id,
+                'action': 'no_action'
+            }
+
         # Mapear status do MercadoPago para status do pedido
         if status == 'approved' and status_detail == 'accredited':
             order.payment_status = 'paid'
-            order.save()
-            
-            # Enviar notificações WhatsApp para pagamentos aprovados
-            try:
-                send_payment_update_notification_with_callmebot(order)
-            except Exception as e:
-                print(f"Erro ao enviar notificação WhatsApp: {e}")
-                import traceback
-                traceback.print_exc()
+
+            # Notificação WhatsApp gravada na mesma transação (enviada pelo notification_worker)
+            with transaction.atomic():
+                order.save()
+                queue_payment_update_notification(order)
+                publish_payment_status(order)
             
             return {
                 'success': True,
@@ -69,13 +120,12 @@ def update_order_status(payment_id, status, status_detail, date_approved=None, e
         elif status == 'cancelled' or (status == 'cancelled' and status_detail == 'expired'):
             order.payment_status = 'cancelled'
             order.status = 'cancelled'
-            order.save()
-            
-            # Enviar notificações WhatsApp para pagamentos cancelados
-            try:
-                send_payment_update_notification_with_callmebot(order)
-            except Exception as e:
-                print(f"Erro ao enviar notificação WhatsApp: {e}")
+
+            # Notificação WhatsApp gravada na mesma transação (enviada pelo notification_worker)
+            with transaction.atomic():
+                order.save()
+                queue_payment_update_notification(order)
+                publish_payment_status(order)
             
             return {
                 'success': True,
@@ -111,10 +161,14 @@ def update_order_status(payment_id, status, status_detail, date_approved=None, e
 
 
 @csrf_exempt
-def webhook_mercadopago(request):
+async def webhook_mercadopago(request):
     """
     Webhook do MercadoPago para processar atualizações de pagamento.
     Suporta tanto o formato antigo (action/data) quanto o novo (resource/topic).
+
+    A notificação só é gravada (WebhookEvent) e respondida com 200; a consulta
+    ao MercadoPago e a atualização do pedido ficam com o comando webhook_worker.
+    View assíncrona: só a gravação no banco passa por uma thread.
     """
     if request.method != 'POST':
         return HttpResponse(status=405)  # Method Not Allowed
@@ -125,63 +179,36 @@ def webhook_mercadopago(request):
         print(f"Webhook MercadoPago recebido: {data}")
     except json.JSONDecodeError:
         return HttpResponse("Invalid JSON", status=400)
-    
-    # Verificar formato do webhook
-    payment_id = None
-    
-    # Novo formato: {"resource":"125381511429","topic":"payment"}
-    if 'topic' in data and 'resource' in data:
-        topic = data.get('topic')
-        if topic != 'payment':
-            return HttpResponse("Topic not supported", status=200)
-        payment_id = data.get('resource')
-    
-    # Formato antigo: {"action":"payment.updated","data":{"id":"123"}}
-    elif 'action' in data and 'data' in data:
-        action = data.get('action')
-        if action != 'payment.updated':
-            return HttpResponse("Action not supported", status=200)
-        payment_id = data.get('data', {}).get('id')
-    
-    else:
-        return HttpResponse("Invalid webhook format", status=400)
-    
-    if not payment_id:
-        return HttpResponse("No payment ID", status=400)
 
     try:
-        # Buscar detalhes do pagamento no MercadoPago
-        mercado_pago = MercadoPagoService()
-        payment_data = mercado_pago.get_payment_info(payment_id)
-        
-        if not payment_data:
-            return HttpResponse("Payment not found", status=404)
-        
-        # Extrair informações do pagamento
-        status = payment_data.get('status')
-        status_detail = payment_data.get('status_detail')
-        date_approved = payment_data.get('date_approved')
-        external_reference = payment_data.get('external_reference')
-        
-        # Log da operação (para debug)
-        print(f"Webhook MercadoPago - Payment ID: {payment_id}, Status: {status}/{status_detail}, External Ref: {external_reference}")
-        
-        # Atualizar status do pedido
-        update_result = update_order_status(
+        payment_id, event_key, notification_id = parse_notification(data)
+    except UnsupportedNotification as e:
+        return HttpResponse(str(e), status=200)
+    except InvalidNotification as e:
+        return HttpResponse(str(e), status=400)
+
+    try:
+        event, created = await sync_to_async(WebhookEvent.record)(
             payment_id=payment_id,
-            status=status,
-            status_detail=status_detail,
-            date_approved=date_approved,
-            external_reference=external_reference
+            event_key=event_key,
+            payload=data,
+            notification_id=notification_id,
         )
-        
-        if not update_result['success']:
-            print(f"Erro ao atualizar pedido: {update_result['message']}")
-            return HttpResponse(update_result['message'], status=400)
-        
-        print(f"Webhook processado com sucesso: {update_result['message']}")
-        return HttpResponse("OK", status=200)
-        
     except Exception as e:
-        print(f"Erro no webhook MercadoPago: {str(e)}")
+        # 500 faz o MercadoPago reenviar a notificação
+        print(f"Erro ao gravar webhook MercadoPago: {str(e)}")
         return HttpResponse(f"Internal error: {str(e)}", status=500)
+
+    if not created:
+        print(f"Webhook MercadoPago duplicado para o pagamento {payment_id}")
+    return HttpResponse("OK", status=200)
+
+
+def webhook_metrics_view(request):
+    """
+    Profundidade e atraso da fila de webhooks (apenas para admins)
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    return JsonResponse(queue_metrics())
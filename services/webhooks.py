@@ -0,0 +1,128 @@
+"""
+Fila de webhooks do Mercado Pago.
+
+O endpoint (services.views.webhook_mercadopago) apenas valida o formato,
+grava o evento (WebhookEvent.record) e responde 200. O comando webhook_worker
+reserva os eventos, consulta o pagamento no Mercado Pago e aplica o status ao
+pedido (update_order_status), um evento por pagamento de cada vez.
+"""
+
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .mercadopago import mp_service
+from .models import WebhookEvent
+from .payment_state import cache_payment_state
+
+# Resultados recentes usados no cálculo do atraso de processamento
+LAG_SAMPLE_SIZE = 500
+
+
+class UnsupportedNotification(Exception):
+    """Notificação válida de um tipo que não tratamos (responde 200)"""
+
+
+class InvalidNotification(Exception):
+    """Corpo que não é uma notificação do Mercado Pago (responde 400)"""
+
+
+def parse_notification(data):
+    """
+    Extrai (payment_id, event_key, notification_id) dos dois formatos:
+
+        {"resource": "125381511429", "topic": "payment"}
+        {"action": "payment.updated", "data": {"id": "123"}, "id": 987}
+
+    Os dois formatos do mesmo aviso têm a mesma event_key ("payment"), então
+    se tornam um único evento pendente.
+    """
+    if not isinstance(data, dict):
+        raise InvalidNotification("Invalid webhook format")
+
+    if "topic" in data and "resource" in data:
+        if data.get("topic") != "payment":
+            raise UnsupportedNotification("Topic not supported")
+        payment_id = data.get("resource")
+        notification_id = ""
+    elif "action" in data and "data" in data:
+        if data.get("action") != "payment.updated":
+            raise UnsupportedNotification("Action not supported")
+        payment_id = (data.get("data") or {}).get("id")
+        notification_id = data.get("id") or ""
+    else:
+        raise InvalidNotification("Invalid webhook format")
+
+    if not payment_id:
+        raise InvalidNotification("No payment ID")
+    # resource pode vir como URL (.../v1/payments/123)
+    payment_id = str(payment_id).rstrip("/").rsplit("/", 1)[-1]
+    return payment_id, "payment", str(notification_id)
+
+
+def process_event(event):
+    """
+    Busca o pagamento no Mercado Pago e aplica o status ao pedido. Lança
+    exceção para que o worker agende nova tentativa (inclusive quando o pedido
+    ainda não tem o payment_id gravado).
+    """
+    from .views import update_order_status
+
+    payment_data = mp_service.get_payment_info(event.payment_id)
+    if not payment_data:
+        raise RuntimeError(f"Pagamento {event.payment_id} não encontrado")
+
+    # Polling da página de pagamento passa a responder com este status
+    cache_payment_state(event.payment_id, payment_data)
+
+    status = payment_data.get("status")
+    status_detail = payment_data.get("status_detail")
+    result = update_order_status(
+        payment_id=event.payment_id,
+        status=status,
+        status_detail=status_detail,
+        date_approved=payment_data.get("date_approved"),
+        external_reference=payment_data.get("external_reference"),
+        payment_data=payment_data,
+        source="webhook",
+    )
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+
+    event.mark_processed(f"{status}/{status_detail}", result.get("action", ""))
+    return result
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def queue_metrics():
+    """
+    Profundidade e atraso da fila:
+    - pending/processing/dead: eventos em cada estado;
+    - oldest_pending_seconds: há quanto tempo o evento pendente mais antigo espera;
+    - lag_p50/p95_seconds: recebimento -> processamento dos últimos eventos.
+    """
+    now = timezone.now()
+    counts = WebhookEvent.objects.aggregate(
+        pending=Count("id", filter=Q(status="pending")),
+        processing=Count("id", filter=Q(status="processing")),
+        dead=Count("id", filter=Q(status="dead")),
+        oldest_pending=Min("received_at", filter=Q(status="pending")),
+    )
+    oldest = counts.pop("oldest_pending")
+
+    recent = WebhookEvent.objects.filter(processed_at__isnull=False).order_by(
+        "-processed_at"
+    ).values_list("received_at", "processed_at")[:LAG_SAMPLE_SIZE]
+    lags = [(processed - received).total_seconds() for received, processed in recent]
+
+    return {
+        **counts,
+        "oldest_pending_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+        "lag_p50_seconds": round(_percentile(lags, 50), 2),
+        "lag_p95_seconds": round(_percentile(lags, 95), 2),
+    }
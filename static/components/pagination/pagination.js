@@ -31,7 +31,7 @@ function initializePaginationScroll(targetSelector) {
 /**
  * Update URL parameters for pagination and search
  * @param {Object} params - Object containing URL parameters to update
- * @param {boolean} removePage - Whether to remove the page parameter (default: true)
+ * @param {boolean} removePage - Whether to remove the pagination cursors (default: true)
  */
 function updatePaginationURL(params, removePage = true) {
     const url = new URL(window.location.href);
@@ -45,9 +45,9 @@ function updatePaginationURL(params, removePage = true) {
         }
     });
     
-    // Remove page parameter when updating filters (to go back to page 1)
+    // Remove pagination cursors when updating filters (to go back to page 1)
     if (removePage) {
-        url.searchParams.delete('page');
+        clearPaginationParams(url);
     }
     
     window.location.href = url;
@@ -107,3 +107,13 @@ function initializePaginationSearch(inputSelector, additionalFilters = [], debou
         }
     });
 }
+
+/**
+ * Remove the pagination cursors from a URL (back to the first page)
+ * @param {URL} url - URL to update in place
+ */
+function clearPaginationParams(url) {
+    url.searchParams.delete('after');
+    url.searchParams.delete('before');
+    url.searchParams.delete('page');
+}